@@ -0,0 +1,163 @@
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("peacekeeper")
+
+
+class TTLCache:
+    """
+    Bounded in-process cache with LRU eviction and a per-entry TTL.
+
+    Thread-safe, so it can be shared between the event loop and the
+    threadpool that runs sync endpoints.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self._clock() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class WriteBehindWriter:
+    """
+    Moves persistence writes off the request path.
+
+    `submit()` only enqueues; a daemon thread drains the queue, coalesces
+    writes to the same key and hands them to `flush_fn` in batches. When the
+    queue is full the write is dropped and counted, since the value is already
+    served from the in-process cache.
+    """
+
+    def __init__(self, flush_fn: Callable[[Dict[str, Any]], None], max_pending: int = 1000,
+                 max_batch: int = 100, linger: float = 0.05):
+        self._flush_fn = flush_fn
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=max_pending)
+        self.max_batch = max_batch
+        self.linger = linger
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def submit(self, key: str, doc: Any) -> None:
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((key, doc))
+            self.submitted += 1
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Write-behind queue full, dropping write for key prefix: {key[:8]}")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Blocks until everything submitted so far has been written (or `timeout` elapses)."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._queue.unfinished_tasks
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="cache-write-behind", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            key, doc = self._queue.get()
+            pending = {key: doc}
+            taken = 1
+            deadline = time.monotonic() + self.linger
+            while taken < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    key, doc = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending[key] = doc
+                taken += 1
+            try:
+                self._flush_fn(pending)
+                self.written += len(pending)
+            except Exception as e:
+                self.failed += len(pending)
+                logger.error(f"Write-behind flush failed ({len(pending)} docs): {e}")
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self._queue.qsize(),
+            "submitted": self.submitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -0,0 +1,229 @@
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.cache import TTLCache
+
+# key -> (response, seconds it stays fresh)
+CacheHits = Dict[str, Tuple[Any, float]]
+
+
+class CacheBackend(abc.ABC):
+    """
+    Persistent tier behind the in-process L1 AI response cache.
+
+    Entries are `{"response": ..., "timestamp": <unix seconds>}` documents, the
+    shape written to Firestore's `cached_ai_responses`. Methods are blocking;
+    callers run them off the event loop unless `blocking` is False.
+    """
+
+    name = ""
+    blocking = True
+
+    @abc.abstractmethod
+    def get_many(self, keys: List[str], ttl: float) -> CacheHits:
+        """Returns the entries among `keys` written less than `ttl` seconds ago."""
+
+    @abc.abstractmethod
+    def set_many(self, docs: Dict[str, Dict[str, Any]]) -> None:
+        """Writes `docs` by key, replacing existing entries."""
+
+    def purge_expired(self, ttl: float) -> int:
+        """Deletes entries older than `ttl` seconds where the store can do so cheaply; returns how many."""
+        return 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+    def close(self) -> None:
+        pass
+
+
+def _fresh(doc: Optional[Dict[str, Any]], ttl: float, now: float) -> Optional[Tuple[Any, float]]:
+    if not doc:
+        return None
+    remaining = ttl - (now - doc.get("timestamp", 0))
+    return (doc.get("response"), remaining) if remaining > 0 else None
+
+
+class FirestoreCacheBackend(CacheBackend):
+    """
+    The `cached_ai_responses` collection. Shared by every instance, one billed
+    read per key. `client` is called on every use so a swapped client is picked up.
+    """
+
+    name = "firestore"
+
+    def __init__(self, client: Callable[[], Any], collection: str = "cached_ai_responses"):
+        self._client = client
+        self.collection = collection
+
+    def _ref(self, key: str):
+        return self._client().collection(self.collection).document(key)
+
+    def get_many(self, keys: List[str], ttl: float) -> CacheHits:
+        if not keys:
+            return {}
+        if len(keys) == 1:
+            docs = [(keys[0], self._ref(keys[0]).get())]
+        else:
+            # get_all doesn't preserve order, so match results up by document id
+            docs = [(doc.id, doc) for doc in self._client().get_all([self._ref(key) for key in keys])]
+        now = time.time()
+        hits = {}
+        for key, doc in docs:
+            hit = _fresh(doc.to_dict(), ttl, now) if doc.exists else None
+            if hit is not None:
+                hits[key] = hit
+        return hits
+
+    def set_many(self, docs: Dict[str, Dict[str, Any]]) -> None:
+        batch = self._client().batch()
+        for key, doc in docs.items():
+            batch.set(self._ref(key), doc)
+        batch.commit()
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    A local SQLite file in WAL mode.
+
+    WAL lets readers proceed while a writer commits, so every uvicorn worker
+    on the instance can open the same file and share one cache. Each thread
+    gets its own connection. Expired rows are skipped on read and purged every
+    `purge_every` writes.
+    """
+
+    name = "sqlite"
+    # SQLite's default limit on bound parameters per statement is 999 on older builds
+    MAX_PARAMS = 500
+
+    def __init__(self, path: str, purge_every: int = 1000, ttl: Optional[float] = None):
+        self.path = path
+        self.purge_every = purge_every
+        self.ttl = ttl
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._writes_since_purge = 0
+        self.reads = 0
+        self.writes = 0
+        self.purged = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, timestamp REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ai_cache_timestamp ON ai_cache (timestamp)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WAL + NORMAL only fsyncs at checkpoints; losing the last few cache writes on power loss is fine
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def get_many(self, keys: List[str], ttl: float) -> CacheHits:
+        now = time.time()
+        conn = self._connection()
+        hits = {}
+        for start in range(0, len(keys), self.MAX_PARAMS):
+            chunk = keys[start:start + self.MAX_PARAMS]
+            rows = conn.execute(
+                f"SELECT key, response, timestamp FROM ai_cache WHERE key IN ({','.join('?' * len(chunk))}) "
+                "AND timestamp > ?",
+                (*chunk, now - ttl),
+            ).fetchall()
+            for key, response, timestamp in rows:
+                hits[key] = (json.loads(response), ttl - (now - timestamp))
+        self.reads += len(keys)
+        return hits
+
+    def set_many(self, docs: Dict[str, Dict[str, Any]]) -> None:
+        rows = [(key, json.dumps(doc.get("response")), doc.get("timestamp", time.time())) for key, doc in docs.items()]
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR REPLACE INTO ai_cache (key, response, timestamp) VALUES (?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.writes += len(rows)
+        self._writes_since_purge += len(rows)
+        if self.ttl and self._writes_since_purge >= self.purge_every:
+            self._writes_since_purge = 0
+            self.purge_expired(self.ttl)
+
+    def purge_expired(self, ttl: float) -> int:
+        deleted = self._connection().execute("DELETE FROM ai_cache WHERE timestamp <= ?", (time.time() - ttl,)).rowcount
+        self.purged += deleted
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._connection().execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+        return {"backend": self.name, "path": self.path, "rows": rows, "reads": self.reads,
+                "writes": self.writes, "purged": self.purged}
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Process-local store. Nothing is shared between workers or survives a restart; meant for development and benchmarks."""
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, maxsize: int = 100000, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        # Expiry is checked against the stored timestamp, so the LRU only needs to bound memory
+        self._entries = TTLCache(maxsize=maxsize, ttl=float("inf"))
+
+    def get_many(self, keys: List[str], ttl: float) -> CacheHits:
+        now = self._clock()
+        hits = {}
+        for key in keys:
+            hit = _fresh(self._entries.get(key), ttl, now)
+            if hit is not None:
+                hits[key] = hit
+        return hits
+
+    def set_many(self, docs: Dict[str, Dict[str, Any]]) -> None:
+        for key, doc in docs.items():
+            self._entries.set(key, doc)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, **self._entries.stats()}
+
+
+CACHE_BACKENDS = ("firestore", "sqlite", "memory")
+
+
+def build_cache_backend(name: str, firestore_client: Callable[[], Any], sqlite_path: str,
+                        ttl: Optional[float] = None) -> CacheBackend:
+    """Creates the backend selected by name (one of CACHE_BACKENDS)."""
+    name = name.lower()
+    if name == "firestore":
+        return FirestoreCacheBackend(firestore_client)
+    if name == "sqlite":
+        return SQLiteCacheBackend(sqlite_path, ttl=ttl)
+    if name == "memory":
+        return MemoryCacheBackend()
+    raise ValueError(f"Unknown AI cache backend {name!r}, expected one of {', '.join(CACHE_BACKENDS)}")
@@ -0,0 +1,170 @@
+import re
+from typing import Dict, List, NamedTuple
+
+from app.safety import SafetyMatcher
+
+KIND_OBSERVATION = "observation"
+KIND_REQUEST = "request"
+
+
+def _compile_terms(terms: List[str]) -> "re.Pattern[str]":
+    ordered = sorted(terms, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(r"\s+".join(map(re.escape, t.split())) for t in ordered) + r")\b",
+                      re.IGNORECASE)
+
+
+# Words that judge rather than describe. Any of them sends the text to the model.
+EVALUATIVE = _compile_terms([
+    "rude", "selfish", "mean", "careless", "inconsiderate", "annoying", "ridiculous", "terrible", "awful",
+    "horrible", "unfair", "wrong", "bad", "messy", "disrespectful", "irresponsible", "immature", "childish",
+    "cold", "distant", "clingy", "needy", "controlling", "dramatic", "overreacting", "sloppy", "unreliable",
+    "thoughtless", "ungrateful", "disgusting", "pathetic", "embarrassing", "boring", "obsessed", "nagging",
+    "ignore", "ignored", "ignoring", "neglect", "neglected", "betray", "betrayed", "disrespect",
+])
+# Absolutes and mind-reading: claims about habits or intent a camera can't record.
+INTENT = _compile_terms([
+    "always", "never", "constantly", "every time", "all the time", "nothing", "everything", "no one",
+    "on purpose", "deliberately", "intentionally", "obviously", "clearly", "pretend", "pretending",
+    "don't care", "doesn't care", "trying to", "just want", "only care", "typical", "as usual", "of course",
+])
+# Insults and commands: name-calling and orders that an observation or request never contains.
+INSULTS = _compile_terms([
+    "coward", "liar", "lie", "lied", "lies", "lying", "drunk", "idiot", "stupid", "dumb", "loser", "jerk",
+    "crazy", "psycho", "useless", "worthless", "shut up", "shut your", "mouth", "get out", "go away",
+    "grow up", "leave me alone", "whatever",
+])
+# Thoughts dressed as feelings ("I feel like you...") are interpretations, not observations.
+OPINION = _compile_terms([
+    "feel like", "feels like", "felt like", "feel that", "felt that", "feel as if", "seems like",
+    "i think", "i bet",
+])
+INTENSIFIERS = _compile_terms(["so", "too", "very", "really", "totally", "completely", "extremely", "such a"])
+# Demands and vague asks that the request prompt would rewrite.
+DEMANDS = _compile_terms([
+    "must", "have to", "has to", "need to", "needs to", "should", "shouldn't", "stop", "quit", "don't ever",
+    "or else", "better", "nicer", "more", "less", "try", "respect", "care", "be there", "appreciate",
+])
+# The NVC form of a request, and a bare question that may still hide a demand ("Would you shut up")
+WILLINGNESS = re.compile(r"^\s*(?:(?:would|could|will)\s+you\s+be|are\s+you)\s+willing\b", re.IGNORECASE)
+ASK = re.compile(r"^\s*(?:would|could|can|will)\s+you\b", re.IGNORECASE)
+# Times and quantities a camera could record
+CONCRETE = re.compile(
+    r"\d|\b(?:today|tonight|tomorrow|yesterday|morning|afternoon|evening|weekend|minutes?|hours?|"
+    r"monday|tuesday|wednesday|thursday|friday|saturday|sunday|once|twice)\b",
+    re.IGNORECASE,
+)
+# An I-statement: the speaker describes what they saw or did
+FIRST_PERSON = re.compile(r"^\s*(?:i|we)\b", re.IGNORECASE)
+# "You" followed by what the listener did ("you walked away", "you lied"): a camera
+# can record that, but the wording around it is where judgments hide.
+YOU_ACTION = re.compile(r"\byou\s+(?!(?:at|in|on|with|from|to|by|for|and|or|when|while|after|before)\b)[a-z]",
+                        re.IGNORECASE)
+SHOUTING = re.compile(r"\b[A-Z]{3,}\b")
+SECOND_PERSON = re.compile(r"\byou(?:r|'re|rs)?\b", re.IGNORECASE)
+
+
+class Assessment(NamedTuple):
+    confidence: float
+    reasons: List[str]
+
+
+class NeutralityClassifier:
+    """
+    Rule-based pre-check that decides whether a text is confidently neutral.
+
+    Flags from the validation rules, the lexicons, "I feel like" and "you
+    <verb>" are hard stops (confidence 0). Otherwise softer signals adjust a
+    per-kind base score, and only texts at or above `threshold` skip the
+    model. The bases sit below the default threshold and no single signal
+    clears it: the lexicons can't list every judgment, so an observation
+    needs both concrete times or quantities and an I-statement about someone
+    other than "you", and a request needs the "would you be willing" form
+    with something concrete.
+    """
+
+    BASE = {KIND_OBSERVATION: 0.7, KIND_REQUEST: 0.45}
+    CONCRETE_BONUS = 0.1
+
+    def __init__(self, threshold: float = 0.85):
+        self.threshold = threshold
+        self.checked: Dict[str, int] = {KIND_OBSERVATION: 0, KIND_REQUEST: 0}
+        self.skipped: Dict[str, int] = {KIND_OBSERVATION: 0, KIND_REQUEST: 0}
+
+    def assess(self, text: str, kind: str, matcher: SafetyMatcher) -> Assessment:
+        text = text or ""
+        words = text.split()
+        if matcher.find(text):
+            return Assessment(0.0, ["validation_rules"])
+        if EVALUATIVE.search(text):
+            return Assessment(0.0, ["evaluative"])
+        if INTENT.search(text):
+            return Assessment(0.0, ["intent"])
+        if INSULTS.search(text):
+            return Assessment(0.0, ["insult"])
+        if OPINION.search(text):
+            return Assessment(0.0, ["opinion"])
+        if kind == KIND_REQUEST and DEMANDS.search(text):
+            return Assessment(0.0, ["demand"])
+        # The "would you" of a request's ask is not an action of the listener
+        ask = WILLINGNESS.match(text) or ASK.match(text) if kind == KIND_REQUEST else None
+        if YOU_ACTION.search(text, ask.end() if ask else 0):
+            return Assessment(0.0, ["you_action"])
+
+        confidence = self.BASE[kind]
+        reasons = []
+        if len(words) < 3:
+            confidence -= 0.3
+            reasons.append("too_short")
+        elif len(words) > 40:
+            confidence -= 0.2
+            reasons.append("too_long")
+        if INTENSIFIERS.search(text):
+            confidence -= 0.15
+            reasons.append("intensifier")
+        if "!" in text:
+            confidence -= 0.2
+            reasons.append("exclamation")
+        if SHOUTING.search(text):
+            confidence -= 0.3
+            reasons.append("shouting")
+        if CONCRETE.search(text):
+            confidence += self.CONCRETE_BONUS
+            reasons.append("concrete")
+
+        if kind == KIND_OBSERVATION:
+            if "?" in text:
+                confidence -= 0.2
+                reasons.append("question")
+            # Saying "I" doesn't make a sentence about "you" neutral, so the bonus never offsets the penalty
+            if SECOND_PERSON.search(text):
+                confidence -= 0.1
+                reasons.append("second_person")
+            elif FIRST_PERSON.search(text):
+                confidence += 0.1
+                reasons.append("first_person")
+        elif WILLINGNESS.search(text):
+            confidence += 0.3
+            reasons.append("willingness")
+        elif ASK.search(text):
+            confidence += 0.1
+            reasons.append("ask")
+
+        return Assessment(round(max(0.0, min(1.0, confidence)), 4), reasons)
+
+    def is_confidently_neutral(self, text: str, kind: str, matcher: SafetyMatcher) -> bool:
+        self.checked[kind] += 1
+        if self.assess(text, kind, matcher).confidence >= self.threshold:
+            self.skipped[kind] += 1
+            return True
+        return False
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "threshold": self.threshold,
+            "checked": dict(self.checked),
+            "skipped": dict(self.skipped),
+            "skip_rate": {
+                kind: round(self.skipped[kind] / self.checked[kind], 4) if self.checked[kind] else 0.0
+                for kind in self.checked
+            },
+        }
@@ -0,0 +1,106 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict
+
+
+class PoolSaturatedError(Exception):
+    """Raised when a generation pool has no free slot and its wait queue is full."""
+
+
+class GenerationPool:
+    """
+    Bounds the number of concurrent model calls on this instance.
+
+    Up to `max_concurrency` calls run at once; up to `max_queue` further callers
+    wait for a slot. Anything beyond that is rejected immediately so a burst
+    can't pile up unbounded work behind a slow upstream.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        self.max_concurrency = max_concurrency
+        self.max_queue = max(0, max_queue)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.completed = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Holds one generation slot for the duration of the block, or raises PoolSaturatedError."""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise PoolSaturatedError(
+                f"Generation pool saturated ({self.in_flight} running, {self.waiting} queued)"
+            )
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def run(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs `call()` once a slot is free, or raises PoolSaturatedError."""
+        async with self.slot():
+            return await call()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "completed": self.completed,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the call; callers arriving while it is
+    still running await the same result (or exception). The shared call is
+    shielded, so one caller disconnecting doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, "asyncio.Future[Any]"] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is None:
+            self.calls += 1
+            future = asyncio.ensure_future(call())
+            self._calls[key] = future
+            future.add_done_callback(lambda f: self._forget(key, f))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def _forget(self, key: str, future: "asyncio.Future[Any]") -> None:
+        if self._calls.get(key) is future:
+            del self._calls[key]
+        # Nobody may be left awaiting a failed call; mark its exception as retrieved
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+        }
@@ -0,0 +1,108 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+from app.vocabulary import VocabularySnapshot, VocabularyStore
+
+logger = logging.getLogger("peacekeeper")
+
+# The language the prompts, the fast-path classifier and the offline suggester
+# are written in. Its documents and AI cache keys carry no locale suffix, so
+# they are the ones that existed before locales did.
+DEFAULT_LOCALE = "en"
+
+LANGUAGE_NAMES = {"en": "English", "es": "Spanish", "fr": "French"}
+
+
+def normalize_locale(value: str) -> str:
+    """The primary language subtag of a locale, so 'es-MX', 'es_MX' and 'ES' are all 'es'."""
+    return value.strip().replace("_", "-").split("-")[0].lower()
+
+
+def localized_document_id(document: str, locale: str) -> str:
+    """Firestore document ID of a locale's copy of a document: 'feelings' for English, 'feelings_es' for Spanish."""
+    return document if locale == DEFAULT_LOCALE else f"{document}_{locale}"
+
+
+def localize_prompt(prompt: str, locale: str) -> str:
+    """Asks Gemini to answer in the locale's language while keeping the reply format the parsers rely on."""
+    if locale == DEFAULT_LOCALE:
+        return prompt
+    language = LANGUAGE_NAMES.get(locale, locale)
+    return (
+        f"{prompt}\n"
+        f"The user writes in {language}. Write your answer in {language}, "
+        "but keep any 'Judgment:' and 'Alternatives:' labels and the Yes/No answers in English."
+    )
+
+
+class LocaleRegistry:
+    """
+    Vocabulary stores and compiled matchers for the locales besides the default one.
+
+    A locale's store is created, and its documents read, the first time the
+    locale is asked for, so supported but unused languages cost nothing at
+    startup. Compiled matchers are kept for at most `max_compiled` locales,
+    least recently used first out, and rebuilt when the locale's snapshot
+    changes.
+    """
+
+    def __init__(self, make_store: Callable[[str], VocabularyStore], compile: Callable[[VocabularySnapshot], Any],
+                 max_compiled: int = 2):
+        if max_compiled < 1:
+            raise ValueError("max_compiled must be >= 1")
+        self._make_store = make_store
+        self._compile = compile
+        self.max_compiled = max_compiled
+        self._stores: Dict[str, VocabularyStore] = {}
+        # locale -> (snapshot version compiled from, compiled value)
+        self._compiled: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._create_lock = threading.Lock()
+        self.compilations = 0
+        self.evictions = 0
+
+    def store(self, locale: str) -> VocabularyStore:
+        store = self._stores.get(locale)
+        if store is None:
+            # Creating a store may read Firestore; locales already loaded don't wait for it
+            with self._create_lock:
+                store = self._stores.get(locale)
+                if store is None:
+                    store = self._make_store(locale)
+                    with self._lock:
+                        self._stores[locale] = store
+                    logger.info(f"Vocabulary store created for locale {locale}")
+        return store
+
+    def compiled(self, locale: str) -> Any:
+        """The locale's compiled matcher, loading the vocabulary and compiling on first use."""
+        # Loading may read Firestore, so it happens outside the lock
+        snapshot = self.store(locale).get()
+        with self._lock:
+            entry = self._compiled.get(locale)
+            if entry is not None and entry[0] == snapshot.version:
+                self._compiled.move_to_end(locale)
+                return entry[1]
+        # Two first requests may both compile; the result is the same either way
+        value = self._compile(snapshot)
+        with self._lock:
+            self.compilations += 1
+            self._compiled[locale] = (snapshot.version, value)
+            self._compiled.move_to_end(locale)
+            while len(self._compiled) > self.max_compiled:
+                evicted, _ = self._compiled.popitem(last=False)
+                self.evictions += 1
+                logger.info(f"Compiled matcher for locale {evicted} evicted")
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "loaded": sorted(self._stores),
+                "compiled": list(self._compiled),
+                "max_compiled": self.max_compiled,
+                "compilations": self.compilations,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,258 @@
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Callable, Dict, List, Optional
+
+# Set per request by RequestContextMiddleware; copied into tasks and to_thread calls with the context
+request_id_var: "contextvars.ContextVar[Optional[str]]" = contextvars.ContextVar("request_id", default=None)
+request_started_var: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar("request_started", default=None)
+
+# LogRecord attributes that aren't user-supplied `extra` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps records with the current request ID and time since the request started."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        started = request_started_var.get()
+        record.elapsed_ms = round((time.perf_counter() - started) * 1000, 1) if started is not None else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Thins out request-path records below WARNING.
+
+    A request is kept whole or dropped whole: the decision is made from its
+    request ID, keeping `rate` of requests. On top of that at most
+    `max_per_second` sampled records pass each second (0 = no cap), so log
+    volume stays flat however many requests arrive. Warnings, errors and
+    records logged outside a request are always kept.
+    """
+
+    def __init__(self, rate: float = 1.0, max_per_second: float = 0, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        if not 0 <= rate <= 1 or max_per_second < 0:
+            raise ValueError("rate must be within [0, 1] and max_per_second >= 0")
+        self.rate = rate
+        self.max_per_second = max_per_second
+        self._clock = clock
+        self._second = 0
+        self._passed = 0
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def _sampled(self, request_id: str) -> bool:
+        if self.rate >= 1:
+            return True
+        # Same answer for every record of the request, without keeping per-request state
+        return zlib.crc32(request_id.encode()) / 0x100000000 < self.rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = getattr(record, "request_id", None)
+        if record.levelno >= logging.WARNING or request_id is None:
+            return True
+        keep = self._sampled(request_id)
+        with self._lock:
+            if keep and self.max_per_second:
+                second = int(self._clock())
+                if second != self._second:
+                    self._second, self._passed = second, 0
+                keep = self._passed < self.max_per_second
+                self._passed += keep
+            if not keep:
+                self.dropped += 1
+        return keep
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line, in the shape Cloud Logging parses from stdout:
+    `severity`, `message` and `time`, plus the request fields and any
+    `extra` fields passed to the log call.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the listener thread without blocking the caller.
+
+    The message is rendered here (its arguments may not survive the thread
+    hop) but formatting is left to the listener. When the queue is full the
+    record is dropped and counted rather than waited for.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """The installed queue handler, its listener thread and their counters."""
+
+    def __init__(self, handler: DroppingQueueHandler, listener: logging.handlers.QueueListener,
+                 sampler: SamplingFilter, log_queue: "queue.Queue[logging.LogRecord]"):
+        self.handler = handler
+        self.listener = listener
+        self.sampler = sampler
+        self.queue = log_queue
+        self._stopped = False
+
+    def stop(self) -> None:
+        """Writes out queued records and stops the listener thread."""
+        if not self._stopped:
+            self._stopped = True
+            self.listener.stop()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "sample_rate": self.sampler.rate,
+            "max_per_second": self.sampler.max_per_second,
+            "dropped_sampled": self.sampler.dropped,
+            "dropped_queue_full": self.handler.dropped,
+        }
+
+
+def setup_logging(level: int = logging.INFO, json_output: bool = True, sample_rate: float = 1.0,
+                  max_per_second: float = 0, queue_size: int = 10000, stream=None) -> LogPipeline:
+    """
+    Routes all logging through a bounded queue to a background listener.
+
+    Request threads only stamp, sample and enqueue records; formatting and
+    writing to `stream` (stderr by default) happen on the listener thread.
+    Replaces the handlers on the root and uvicorn loggers, and stops (flushing
+    the queue) at interpreter exit.
+    """
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_output else logging.Formatter(
+        "%(asctime)s [%(levelname)s] %(request_id)s %(message)s", datefmt="%H:%M:%S"))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    sampler = SamplingFilter(sample_rate, max_per_second)
+    # Order matters: sampling reads the request ID the context filter sets
+    handler.addFilter(RequestContextFilter())
+    handler.addFilter(sampler)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    # Uvicorn installs its own synchronous handlers; send its records through the queue too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        server_logger = logging.getLogger(name)
+        server_logger.handlers = []
+        server_logger.propagate = True
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    pipeline = LogPipeline(handler, listener, sampler, log_queue)
+    atexit.register(pipeline.stop)
+    return pipeline
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware giving every request a correlation ID.
+
+    The ID comes from the `X-Request-ID` header, else the trace ID of Cloud
+    Run's `X-Cloud-Trace-Context`, else a new random one. It is set for
+    every record logged while handling the request, returned in the
+    `X-Request-ID` response header, and a `request finished` record with the
+    route, status and duration is logged at the end.
+    """
+
+    def __init__(self, app, logger: logging.Logger, skip_paths: List[str] = ("/metrics",)):
+        self.app = app
+        self.logger = logger
+        self.skip_paths = set(skip_paths)
+
+    @staticmethod
+    def _incoming_id(headers: List[tuple]) -> Optional[str]:
+        trace = None
+        for name, value in headers:
+            if name == b"x-request-id":
+                return value.decode("latin-1")[:64]
+            if name == b"x-cloud-trace-context":
+                trace = value.decode("latin-1").split("/", 1)[0][:64]
+        return trace or None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = self._incoming_id(scope.get("headers", [])) or new_request_id()
+        started = time.perf_counter()
+        id_token = request_id_var.set(request_id)
+        started_token = request_started_var.set(started)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if scope.get("path") not in self.skip_paths:
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                self.logger.info("request finished", extra={
+                    "method": scope.get("method", ""), "route": route, "status": status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                })
+            request_id_var.reset(id_token)
+            request_started_var.reset(started_token)
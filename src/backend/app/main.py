@@ -1,46 +1,220 @@
 import os
 import re
 import time
+
+from app.startup import StartupTimer, Lazy, ProcessState
+
+# Created before the heavy imports so the report covers them
+startup_timer = StartupTimer()
+
+import asyncio
 import hashlib
 import logging
-from typing import List, Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, Request, Depends, Security, status
+import datetime
+import json
+import math
+import random
+import secrets
+import tempfile
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Callable, NamedTuple, Literal
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, Security, BackgroundTasks, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 import firebase_admin
-from firebase_admin import credentials, firestore, auth
+from firebase_admin import auth
 from better_profanity import profanity
-import vertexai
-from vertexai.generative_models import GenerativeModel
+from app.concurrency import GenerationPool, PoolSaturatedError, SingleFlight
+from app.cache import TTLCache, WriteBehindWriter
+from app.cache_backends import build_cache_backend
+from app.safety import SafetyMatcher, BLOCKING_CATEGORIES, CATEGORY_PROFANITY, mask_spans
+from app.vocabulary import VocabularyStore, load_bundle
+from app.locales import DEFAULT_LOCALE, LocaleRegistry, localize_prompt, localized_document_id, normalize_locale
+from app.similarity import SimilarityCache
+from app.classifier import NeutralityClassifier, KIND_OBSERVATION, KIND_REQUEST
+from app.suggester import VocabularySuggester, build_suggester
+from app.metrics import Registry, MetricsMiddleware
+from app.logs import RequestContextMiddleware, setup_logging
+from app.ratelimit import RateLimiter, build_global_limit, parse_limits
+from app.prefetch import Prefetcher, PrefetchJob, COMPUTED, ALREADY_CACHED, SKIPPED
+from app.sessions import (SOLO, KeyedLocks, TransitionError, build_session_store, check_settled, new_session,
+                          plan_transition, session_view)
+from app.resilience import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, hedge, parse_durations
+
+startup_timer.record("imports", startup_timer.started)
+_setup_started = time.perf_counter()
 
 # --- Configuration ---
 # Global Debug Switch
 DEBUG_MODE = os.getenv("DEBUG_MODE", "false").lower() == "true"
 
-# Setup Logging
-logging.basicConfig(
+# Logging: records are queued and written by a background thread, as JSON lines
+# (LOG_FORMAT=json, what Cloud Logging parses) or plain text. LOG_SAMPLE_RATE keeps
+# that share of requests' INFO/DEBUG lines and LOG_MAX_PER_SECOND caps them (0 = no
+# cap); warnings and errors are always written.
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+LOG_MAX_PER_SECOND = float(os.getenv("LOG_MAX_PER_SECOND", "0"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+log_pipeline = setup_logging(
     level=logging.DEBUG if DEBUG_MODE else logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(message)s",
-    datefmt="%H:%M:%S"
+    json_output=LOG_FORMAT == "json",
+    sample_rate=LOG_SAMPLE_RATE,
+    max_per_second=LOG_MAX_PER_SECOND,
+    queue_size=LOG_QUEUE_SIZE,
 )
 logger = logging.getLogger("peacekeeper")
 
+# Clients, caches and limiters shared between requests. Each is registered with
+# the factory that builds it, so the load-test harness can run the app against
+# fakes and fresh state (`process_state.replaced(...)`) without listing them.
+process_state = ProcessState(globals())
+
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "peacekeeper-483320")
 REGION = "us-central1"
 
-# Initialize Firebase
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(options={'projectId': PROJECT_ID})
+# AI concurrency: how many Gemini calls may run at once on this instance,
+# and how many more may wait for a slot before we shed load with a 503.
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "32"))
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "64"))
+
+# Upper bound on tasks accepted by the /ai/expression-step batch endpoint
+BATCH_MAX_TASKS = 8
+
+# AI response cache: entries live for CACHE_TTL_SECONDS in Firestore and in the
+# per-instance L1 cache, which holds at most AI_CACHE_L1_MAX_ENTRIES responses.
+CACHE_TTL_SECONDS = 600
+AI_CACHE_L1_MAX_ENTRIES = int(os.getenv("AI_CACHE_L1_MAX_ENTRIES", "10000"))
+
+# Persistent tier behind the L1 cache: "firestore" (shared by all instances),
+# "sqlite" (a local WAL-mode file shared by the workers on one instance) or
+# "memory" (per process, for development and benchmarks).
+AI_CACHE_BACKEND = os.getenv("AI_CACHE_BACKEND", "firestore").lower()
+AI_CACHE_SQLITE_PATH = os.getenv("AI_CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "peacekeeper-ai-cache.sqlite3"))
+
+# Verified ID tokens are cached by hash until they expire, capped at
+# AUTH_TOKEN_CACHE_MAX_TTL seconds so revocations elsewhere are picked up.
+AUTH_TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_TOKEN_CACHE_MAX_ENTRIES", "10000"))
+AUTH_TOKEN_CACHE_MAX_TTL = int(os.getenv("AUTH_TOKEN_CACHE_MAX_TTL", "300"))
+# On a cache miss, also look the user up to reject revoked tokens and disabled accounts
+AUTH_CHECK_REVOKED = os.getenv("AUTH_CHECK_REVOKED", "true").lower() == "true"
+
+# Premium entitlements (premium_until per UID) are re-read from Firestore at
+# most every ENTITLEMENT_CACHE_TTL seconds, or sooner when invalidated.
+ENTITLEMENT_CACHE_MAX_ENTRIES = int(os.getenv("ENTITLEMENT_CACHE_MAX_ENTRIES", "10000"))
+ENTITLEMENT_CACHE_TTL = int(os.getenv("ENTITLEMENT_CACHE_TTL", "60"))
+
+# Opt-in shared cache for user-independent tasks (feelings/needs): near-duplicate
+# inputs from any user are answered from a local nearest-neighbour index.
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "false").lower() == "true"
+SHARED_CACHE_THRESHOLD = float(os.getenv("SHARED_CACHE_THRESHOLD", "0.95"))
+SHARED_CACHE_CAPACITY = int(os.getenv("SHARED_CACHE_CAPACITY", "5000"))
+SHARED_CACHE_TTL_SECONDS = int(os.getenv("SHARED_CACHE_TTL_SECONDS", "86400"))
+
+# Local fast path: observations/requests the rule-based classifier is at least
+# FAST_PATH_THRESHOLD confident are neutral skip Gemini and come back unchanged.
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_THRESHOLD = float(os.getenv("FAST_PATH_THRESHOLD", "0.85"))
+
+# Feelings/needs fall back to the local vocabulary suggester when Gemini fails,
+# is saturated, or takes longer than this many seconds.
+AI_FALLBACK_TIMEOUT_SECONDS = float(os.getenv("AI_FALLBACK_TIMEOUT_SECONDS", "6"))
+
+# Deadline in seconds for a Gemini call (including the wait for a pool slot) on
+# tasks without a fallback. AI_DEADLINES overrides single tasks, fallback tasks
+# included ("reflection=15,neutralize=5").
+AI_DEADLINE_SECONDS = float(os.getenv("AI_DEADLINE_SECONDS", "12"))
+AI_DEADLINES = parse_durations(os.getenv("AI_DEADLINES", ""))
+
+# Circuit breaker over Gemini: once AI_BREAKER_MIN_CALLS of the last
+# AI_BREAKER_WINDOW calls were seen, it opens when AI_BREAKER_FAILURE_RATE of
+# them failed or AI_BREAKER_SLOW_RATE took AI_BREAKER_SLOW_SECONDS or more. While
+# open, AI tasks are answered from the cache or the fallback without calling
+# Gemini; after AI_BREAKER_OPEN_SECONDS a few probe calls decide whether it closes.
+AI_BREAKER_WINDOW = int(os.getenv("AI_BREAKER_WINDOW", "50"))
+AI_BREAKER_MIN_CALLS = int(os.getenv("AI_BREAKER_MIN_CALLS", "20"))
+AI_BREAKER_FAILURE_RATE = float(os.getenv("AI_BREAKER_FAILURE_RATE", "0.5"))
+AI_BREAKER_SLOW_SECONDS = float(os.getenv("AI_BREAKER_SLOW_SECONDS", "8"))
+AI_BREAKER_SLOW_RATE = float(os.getenv("AI_BREAKER_SLOW_RATE", "0.8"))
+AI_BREAKER_OPEN_SECONDS = float(os.getenv("AI_BREAKER_OPEN_SECONDS", "30"))
+
+# Hedged requests: a Gemini call still running after its task's p95 latency
+# (measured once AI_HEDGE_MIN_SAMPLES calls succeeded, and at least
+# AI_HEDGE_MIN_DELAY seconds) gets an identical second call; the first answer wins.
+AI_HEDGE_ENABLED = os.getenv("AI_HEDGE_ENABLED", "false").lower() == "true"
+AI_HEDGE_MIN_DELAY = float(os.getenv("AI_HEDGE_MIN_DELAY", "0.5"))
+AI_HEDGE_MIN_SAMPLES = int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20"))
+
+# Per-user rate limits on the AI endpoints: every (uid, endpoint) pair gets a
+# token bucket holding RATE_LIMIT_BURST requests, refilled at RATE_LIMIT_PER_MINUTE.
+# RATE_LIMIT_ENDPOINTS overrides single endpoints ("neutralize=120/30,reflection=20/5").
+# A rate of 0 disables the per-user limits.
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+RATE_LIMIT_ENDPOINTS = parse_limits(os.getenv("RATE_LIMIT_ENDPOINTS", ""))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+
+# Global cap on Gemini calls, set below the Vertex AI quota so a burst is shed
+# here with a 429 instead of failing upstream for everyone. RATE_LIMIT_SYNC
+# decides its scope: "none" (per instance), "sqlite" (the workers on one
+# instance, through AI_RATE_LIMIT_SQLITE_PATH) or "firestore" (all instances).
+# A rate of 0 disables it.
+GEMINI_RATE_LIMIT_PER_MINUTE = float(os.getenv("GEMINI_RATE_LIMIT_PER_MINUTE", "600"))
+GEMINI_RATE_LIMIT_BURST = float(os.getenv("GEMINI_RATE_LIMIT_BURST", "30"))
+RATE_LIMIT_SYNC = os.getenv("RATE_LIMIT_SYNC", "none").lower()
+RATE_LIMIT_SQLITE_PATH = os.getenv("RATE_LIMIT_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "peacekeeper-rate-limits.sqlite3"))
+
+# Speculative prefetch: POST /ai/prefetch queues the feelings, needs and partner
+# reflection the session is about to ask for. At most PREFETCH_WORKERS prefetches run at once, only while the
+# generation pool has spare capacity; PREFETCH_MAX_QUEUE bounds the backlog.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "2"))
+PREFETCH_MAX_QUEUE = int(os.getenv("PREFETCH_MAX_QUEUE", "200"))
+
+# Session state machine behind /sessions: "firestore" (the `sessions` collection) or
+# "memory" (per process, for development and benchmarks). Each instance keeps the
+# last state it saw of up to SESSION_CACHE_MAX_ENTRIES sessions.
+SESSION_STORE = os.getenv("SESSION_STORE", "firestore").lower()
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
 
-db = firestore.client()
+# Prebuilt vocabulary written by seed_data.py, loaded at startup in place of the Firestore read ("" disables it)
+VOCABULARY_BUNDLE = os.getenv("VOCABULARY_BUNDLE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "vocabulary_bundle.json"))
 
-# Initialize Vertex AI
-try:
-    vertexai.init(project=PROJECT_ID, location=REGION)
-    logger.info(f"Vertex AI initialized for project {PROJECT_ID}")
-except Exception as e:
-    logger.error(f"Failed to initialize Vertex AI: {e}")
+# Keep the vocabulary snapshot current through Firestore real-time listeners
+VOCABULARY_LISTENER = os.getenv("VOCABULARY_LISTENER", "true").lower() == "true"
+
+# Locales accepted by /content/vocabulary, /analyze/safety and the AI endpoints. English is
+# always loaded; the others load on first use, and compiled safety matchers are kept for at
+# most LOCALE_MATCHERS_MAX of them at a time. Only list a locale once seed_data.py seeds its
+# documents: without them it is served the English vocabulary and rules.
+SUPPORTED_LOCALES = tuple(dict.fromkeys(
+    [DEFAULT_LOCALE] + [normalize_locale(l) for l in os.getenv("SUPPORTED_LOCALES", "en").split(",") if l.strip()]))
+LOCALE_MATCHERS_MAX = int(os.getenv("LOCALE_MATCHERS_MAX", "2"))
+
+# Expose GET /warmup, which opens the Firestore and Vertex AI connections ahead of the first real request
+WARMUP_ROUTE_ENABLED = os.getenv("WARMUP_ROUTE_ENABLED", "true").lower() == "true"
+
+# --- Clients ---
+# Firebase, Firestore and Vertex AI are created on first use rather than at
+# import: the Vertex SDK alone takes seconds to import, which every cold start
+# would otherwise pay before uvicorn accepts traffic.
+
+def _create_firebase_app():
+    if firebase_admin._apps:
+        return firebase_admin.get_app()
+    return firebase_admin.initialize_app(options={'projectId': PROJECT_ID})
+
+firebase_app = Lazy("firebase_app", _create_firebase_app, startup_timer)
+
+def _create_firestore_client():
+    from firebase_admin import firestore
+    firebase_app.get()
+    return firestore.client()
+
+db = process_state.register("db", lambda: Lazy("firestore", _create_firestore_client, startup_timer))
 
 system_instruction = (
     "You are an expert NVC (Non-Violent Communication) coach and mediator. "
@@ -53,12 +227,109 @@ system_instruction = (
     "Stay strictly within the context provided by the user."
 )
 
-model = GenerativeModel(
-    "gemini-2.5-flash-lite",
-    system_instruction=[system_instruction]
-)
+def _create_model():
+    import vertexai
+    from vertexai.generative_models import GenerativeModel
+
+    # Initialize Vertex AI
+    try:
+        vertexai.init(project=PROJECT_ID, location=REGION)
+        logger.info(f"Vertex AI initialized for project {PROJECT_ID}")
+    except Exception as e:
+        logger.error(f"Failed to initialize Vertex AI: {e}")
 
-app = FastAPI(title="Peacekeeper AI API")
+    return GenerativeModel(
+        "gemini-2.5-flash-lite",
+        system_instruction=[system_instruction]
+    )
+
+model = process_state.register("model", lambda: Lazy("vertex_ai", _create_model, startup_timer))
+
+def _load_profanity():
+    profanity.load_censor_words()
+    return profanity
+
+profanity_filter = Lazy("profanity", _load_profanity, startup_timer)
+
+generation_pool = process_state.register("generation_pool", lambda: GenerationPool(AI_MAX_CONCURRENCY, AI_MAX_QUEUE))
+gemini_breaker = process_state.register("gemini_breaker", lambda: CircuitBreaker(
+    "gemini",
+    window=AI_BREAKER_WINDOW,
+    min_calls=AI_BREAKER_MIN_CALLS,
+    failure_rate=AI_BREAKER_FAILURE_RATE,
+    slow_call_seconds=AI_BREAKER_SLOW_SECONDS,
+    slow_call_rate=AI_BREAKER_SLOW_RATE,
+    open_seconds=AI_BREAKER_OPEN_SECONDS,
+))
+
+# --- Metrics ---
+metrics = Registry(prefix="peacekeeper_")
+REQUEST_DURATION = metrics.histogram("http_request_duration_seconds", "HTTP request latency by route template", ["route", "method", "status"])
+REQUESTS_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests currently being served")
+CACHE_LOOKUP_DURATION = metrics.histogram("ai_cache_lookup_seconds", "AI response cache lookup latency", ["tier"])
+CACHE_LOOKUPS = metrics.counter("ai_cache_lookups_total", "AI response cache lookups", ["tier", "result"])
+CACHE_SAVE_DURATION = metrics.histogram("ai_cache_save_seconds", "Time spent on the request path saving an AI response")
+AUTH_DURATION = metrics.histogram("auth_verify_seconds", "Firebase ID token verification latency", ["cached"])
+GEMINI_DURATION = metrics.histogram("gemini_request_seconds", "Gemini generate_content latency", ["task", "outcome"])
+AI_RESPONSES = metrics.counter("ai_responses_total", "AI task responses", ["task", "engine", "from_cache"])
+AI_OFFENSIVE = metrics.counter("ai_offensive_total", "AI task inputs judged offensive", ["task"])
+AI_ERRORS = metrics.counter("ai_errors_total", "AI tasks that failed", ["task", "status"])
+STREAM_FIRST_TOKEN = metrics.histogram("reflection_stream_first_token_seconds", "Time to first streamed reflection token")
+AI_HEDGES = metrics.counter("ai_hedged_requests_total", "Hedged second Gemini attempts by which attempt answered", ["task", "winner"])
+AI_PREFETCHES = metrics.counter("ai_prefetch_total", "Speculative AI prefetches by outcome", ["task", "outcome"])
+SESSION_TRANSITIONS = metrics.counter("session_transitions_total", "Session events by outcome", ["event", "outcome"])
+RATE_LIMITED = metrics.counter("rate_limited_total", "Requests rejected with 429 by a rate limit", ["scope", "endpoint"])
+SAFETY_FLAGS = metrics.counter("safety_flags_total", "Safety matches by category", ["category"])
+metrics.gauge("generation_pool_in_flight", "Gemini calls running", collect=lambda: [({}, generation_pool.in_flight)])
+metrics.gauge("generation_pool_waiting", "AI requests waiting for a Gemini slot", collect=lambda: [({}, generation_pool.waiting)])
+metrics.gauge("gemini_circuit_open", "1 while the Gemini circuit breaker rejects calls", collect=lambda: [({}, int(gemini_breaker.state == OPEN))])
+metrics.gauge("log_queue_depth", "Log records waiting for the log writer thread", collect=lambda: [({}, log_pipeline.queue.qsize())])
+metrics.gauge("log_records_dropped", "Log records dropped since startup, by reason", ["reason"], collect=lambda: [
+    ({"reason": "sampled"}, log_pipeline.sampler.dropped), ({"reason": "queue_full"}, log_pipeline.handler.dropped)])
+metrics.gauge("ai_cache_l1_entries", "Entries in the in-process AI response cache", collect=lambda: [({}, len(ai_cache))])
+metrics.gauge("locale_matchers_compiled", "Locales besides English with a compiled safety matcher in memory",
+              collect=lambda: [({}, len(locale_registry.stats()["compiled"]))])
+
+def load_vocabulary_bundle() -> bool:
+    """Loads the snapshot from the prebuilt bundle, if there is a usable one."""
+    with startup_timer.phase("vocabulary_bundle"):
+        parts = load_bundle(VOCABULARY_BUNDLE) if VOCABULARY_BUNDLE else None
+        if parts is not None:
+            vocabulary_store.load(parts)
+    return parts is not None
+
+async def preload_vocabulary(watches: List[Any], refresh: bool = True):
+    started = time.perf_counter()
+    try:
+        if refresh:
+            await asyncio.to_thread(vocabulary_store.refresh)
+        if VOCABULARY_LISTENER:
+            watches.extend(await asyncio.to_thread(watch_vocabulary))
+        startup_timer.record("vocabulary_preload", started)
+    except Exception as e:
+        # Not fatal: the snapshot loads lazily on the first /content/vocabulary request instead
+        logger.error(f"Vocabulary preload failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Preload in the background so the instance starts accepting requests right away
+    watches: List[Any] = []
+    # With the bundle loaded the listeners alone bring in edits made since it was built
+    preload = asyncio.create_task(preload_vocabulary(watches, refresh=not load_vocabulary_bundle()))
+    logger.info(f"Startup phases: {startup_timer.summary()}")
+    yield
+    preload.cancel()
+    for watch in watches + locale_watches:
+        watch.unsubscribe()
+    # Drain pending write-behind cache writes before the instance goes away
+    await asyncio.to_thread(cache_writer.flush)
+    cache_backend.close()
+
+app = FastAPI(title="Peacekeeper AI API", lifespan=lifespan)
+
+app.add_middleware(MetricsMiddleware, duration=REQUEST_DURATION, in_flight=REQUESTS_IN_FLIGHT)
+# Wraps the metrics middleware, so the request ID is set for everything the request logs
+app.add_middleware(RequestContextMiddleware, logger=logger)
 
 # Configure CORS
 app.add_middleware(
@@ -69,25 +340,111 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-profanity.load_censor_words()
-
 # --- Security Dependencies ---
 security = HTTPBearer()
+auth = process_state.register("auth", lambda: firebase_admin.auth)
+
+# Verified tokens: sha256(token) -> (uid, issued_at)
+token_cache = process_state.register(
+    "token_cache", lambda: TTLCache(maxsize=AUTH_TOKEN_CACHE_MAX_ENTRIES, ttl=AUTH_TOKEN_CACHE_MAX_TTL))
+# uid -> revocation time; tokens issued before it are rejected. ID tokens live
+# at most an hour, so older revocations can be forgotten.
+tokens_revoked_at = process_state.register(
+    "tokens_revoked_at", lambda: TTLCache(maxsize=AUTH_TOKEN_CACHE_MAX_ENTRIES, ttl=3600))
+revoked_token_rejections = process_state.register("revoked_token_rejections", lambda: 0)
+
+def revoke_cached_tokens(uid: str, at: Optional[float] = None):
+    """Stops accepting cached or fresh ID tokens issued to `uid` before `at` (default now)."""
+    at = time.time() if at is None else at
+    previous = tokens_revoked_at.get(uid)
+    if previous is None or at > previous:
+        tokens_revoked_at.set(uid, at)
+
+def _is_revoked(uid: str, issued_at: float) -> bool:
+    revoked_at = tokens_revoked_at.get(uid)
+    return revoked_at is not None and issued_at < revoked_at
+
+def _auth_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired authentication token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def _verify_id_token(token: str) -> Dict[str, Any]:
+    firebase_app.get()
+    decoded_token = auth.verify_id_token(token)
+    if AUTH_CHECK_REVOKED:
+        # Checked here rather than with check_revoked=True, so a revocation found through
+        # one token also rejects the user's other cached tokens
+        user = auth.get_user(decoded_token['uid'])
+        valid_after = (user.tokens_valid_after_timestamp or 0) / 1000
+        if user.disabled:
+            revoke_cached_tokens(decoded_token['uid'])
+        elif decoded_token.get('iat', 0) < valid_after:
+            revoke_cached_tokens(decoded_token['uid'], valid_after)
+    return decoded_token
 
 async def verify_firebase_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> str:
     """Verifies the Firebase ID Token and returns the UID."""
+    global revoked_token_rejections
     token = credentials.credentials
+    key = hashlib.sha256(token.encode()).hexdigest()
+
+    started = time.perf_counter()
+    cached = token_cache.get(key)
+    if cached is not None:
+        AUTH_DURATION.observe(time.perf_counter() - started, cached="true")
+        uid, issued_at = cached
+        if not _is_revoked(uid, issued_at):
+            return uid
+        token_cache.invalidate(key)
+        revoked_token_rejections += 1
+        raise _auth_error()
+
     try:
-        decoded_token = auth.verify_id_token(token)
+        # Signature checks and public-key fetches are blocking, keep them off the event loop
+        with AUTH_DURATION.time(cached="false"):
+            decoded_token = await asyncio.to_thread(_verify_id_token, token)
         uid = decoded_token['uid']
-        return uid
     except Exception as e:
         logger.warning(f"Auth failed: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid or expired authentication token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+        raise _auth_error()
+
+    issued_at = decoded_token.get('iat', 0)
+    if _is_revoked(uid, issued_at):
+        revoked_token_rejections += 1
+        raise _auth_error()
+
+    expires_at = decoded_token.get('exp')
+    if expires_at:
+        token_cache.set(key, (uid, issued_at), ttl=min(expires_at - time.time(), AUTH_TOKEN_CACHE_MAX_TTL))
+    return uid
+
+# uid -> premium_until (None when the user has no entitlement)
+entitlement_cache = process_state.register(
+    "entitlement_cache", lambda: TTLCache(maxsize=ENTITLEMENT_CACHE_MAX_ENTRIES, ttl=ENTITLEMENT_CACHE_TTL))
+_NOT_CACHED = object()
+
+def invalidate_entitlement(uid: str):
+    """Drops the cached entitlement so the next AI call re-reads Firestore (gift code redeemed, RevenueCat sync)."""
+    entitlement_cache.invalidate(uid)
+
+async def get_premium_until(uid: str):
+    premium_until = entitlement_cache.get(uid, _NOT_CACHED)
+    if premium_until is not _NOT_CACHED:
+        return premium_until
+
+    user_doc = await asyncio.to_thread(db.collection('users').document(uid).get)
+    if not user_doc.exists:
+        # Check revenuecat status via a cloud function sync if we were advanced, 
+        # but here we rely on the client or gift codes synced to Firestore.
+        # Real-world: Use RevenueCat webhooks to sync premium status to Firestore.
+        premium_until = None
+    else:
+        premium_until = user_doc.to_dict().get('premium_until')
+    entitlement_cache.set(uid, premium_until)
+    return premium_until
 
 async def verify_premium_for_ai(uid: str = Depends(verify_firebase_token)) -> str:
     """
@@ -95,22 +452,12 @@ async def verify_premium_for_ai(uid: str = Depends(verify_firebase_token)) -> st
     For AI endpoints, we strictly require premium status to prevent cost abuse.
     """
     try:
-        user_doc = db.collection('users').document(uid).get()
-        if not user_doc.exists:
-            # Check revenuecat status via a cloud function sync if we were advanced, 
-            # but here we rely on the client or gift codes synced to Firestore.
-            # Real-world: Use RevenueCat webhooks to sync premium status to Firestore.
-            pass
-        
         # Check Firestore Premium Status (from Gift Codes or Sync)
-        if user_doc.exists:
-            data = user_doc.to_dict()
-            premium_until = data.get('premium_until')
-            if premium_until:
-                # Firestore timestamp to datetime
-                import datetime
-                if premium_until.replace(tzinfo=None) > datetime.datetime.now():
-                    return uid
+        premium_until = await get_premium_until(uid)
+        if premium_until:
+            # Firestore timestamp to datetime
+            if premium_until.replace(tzinfo=None) > datetime.datetime.now():
+                return uid
 
         # In v0.1, we might allow a 'free tier' for testing if not strictly enforcing yet, 
         # but the prompt asked to PROTECT Vertex AI.
@@ -131,6 +478,52 @@ async def verify_premium_for_ai(uid: str = Depends(verify_firebase_token)) -> st
         logger.error(f"Premium check error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error checking premium status")
 
+# --- Rate Limiting ---
+rate_limiter = process_state.register("rate_limiter", lambda: RateLimiter(
+    (RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST) if RATE_LIMIT_PER_MINUTE else None,
+    RATE_LIMIT_ENDPOINTS,
+    max_keys=RATE_LIMIT_MAX_KEYS,
+))
+gemini_limit = process_state.register("gemini_limit", lambda: build_global_limit(
+    GEMINI_RATE_LIMIT_PER_MINUTE, GEMINI_RATE_LIMIT_BURST, RATE_LIMIT_SYNC, lambda: db, RATE_LIMIT_SQLITE_PATH))
+
+def _rate_limit_error(retry_after: float, message: str) -> HTTPException:
+    seconds = max(1, math.ceil(retry_after))
+    # The app reads detail.retry_after to schedule its retry
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail={"message": message, "retry_after": seconds},
+        headers={"Retry-After": str(seconds)},
+    )
+
+def charge_rate_limits(uid: str, costs: Dict[str, float]) -> None:
+    """Spends `cost` of the user's requests on each endpoint, all or none, or raises a 429."""
+    endpoint, retry_after = rate_limiter.check_all(uid, costs)
+    if endpoint is not None:
+        RATE_LIMITED.inc(scope="user", endpoint=endpoint)
+        logger.info(f"Rate limited {uid} on {endpoint} for {retry_after:.1f}s")
+        raise _rate_limit_error(retry_after, "Too many requests, please slow down")
+
+def rate_limited(endpoint: str) -> Callable:
+    """Dependency that authenticates like verify_firebase_token, then spends one of the user's requests for `endpoint`."""
+    async def dependency(uid: str = Depends(verify_firebase_token)) -> str:
+        charge_rate_limits(uid, {endpoint: 1})
+        return uid
+    return dependency
+
+async def acquire_gemini_quota(task: str) -> None:
+    """Takes one call from the global Gemini limit, or raises a 429 when it is used up."""
+    if gemini_limit is None:
+        return
+    if gemini_limit.blocking:
+        retry_after = await asyncio.to_thread(gemini_limit.acquire)
+    else:
+        retry_after = gemini_limit.acquire()
+    if retry_after:
+        RATE_LIMITED.inc(scope="global", endpoint=task)
+        logger.warning(f"Global Gemini rate limit reached ({task}), retry in {retry_after:.1f}s")
+        raise _rate_limit_error(retry_after, "AI service is at capacity, please retry shortly")
+
 def parse_ai_alternatives(text: str) -> List[str]:
     """Robustly parse AI alternatives from response text."""
     if "Alternatives:" not in text:
@@ -149,55 +542,311 @@ def parse_ai_alternatives(text: str) -> List[str]:
             cleaned.append(line)
     return cleaned[:3]
 
+async def _call_gemini(prompt: str, on_call: Optional[Callable[[float], None]] = None):
+    """
+    One Gemini attempt in a pool slot; its outcome and latency feed the circuit breaker.
+    `on_call` is told when the attempt, having got its slot, calls the model.
+    """
+    async def call():
+        gemini_breaker.check()
+        started = time.perf_counter()
+        if on_call:
+            on_call(started)
+        try:
+            response = await model.generate_content_async(prompt)
+        except Exception:
+            gemini_breaker.record(False, time.perf_counter() - started)
+            raise
+        gemini_breaker.record(True, time.perf_counter() - started)
+        return response
+
+    return await generation_pool.run(call)
+
+def hedge_delay(task: str) -> Optional[float]:
+    """How long a call may run before a hedged second attempt starts, or None for no hedge."""
+    # Hedging adds load, so never while the pool has a queue or the breaker isn't healthy
+    if not AI_HEDGE_ENABLED or generation_pool.waiting or gemini_breaker.state != CLOSED:
+        return None
+    if GEMINI_DURATION.count(task=task, outcome="ok") < AI_HEDGE_MIN_SAMPLES:
+        return None
+    return max(AI_HEDGE_MIN_DELAY, GEMINI_DURATION.quantile(0.95, task=task, outcome="ok"))
+
+def ai_deadline(task_name: str) -> float:
+    if task_name in AI_DEADLINES:
+        return AI_DEADLINES[task_name]
+    task = AI_TASKS.get(task_name)
+    return AI_FALLBACK_TIMEOUT_SECONDS if task and task.fallback else AI_DEADLINE_SECONDS
+
+async def generate_content(prompt: str, timeout: Optional[float] = None, task: str = "unknown"):
+    """
+    Runs a Gemini generation without blocking the event loop, bounded by the generation pool.
+
+    `timeout` covers both waiting for a pool slot and the call itself; on expiry
+    the call is cancelled and asyncio.TimeoutError is raised. Only a deadline
+    that expires while Gemini is being called counts against the circuit
+    breaker: time spent queued for a slot says nothing about Gemini. A 429 is raised
+    when the global Gemini rate limit is used up, and CircuitOpenError while
+    the circuit breaker is open. With hedging enabled, a slow call gets a
+    second attempt (see hedge_delay).
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    attempts = 0
+    # When the first attempt to get a pool slot called the model
+    called_at: List[float] = []
+
+    async def attempt():
+        nonlocal attempts
+        attempts += 1
+        await acquire_gemini_quota(task)
+        return await _call_gemini(prompt, called_at.append)
+
+    try:
+        if gemini_breaker.state == OPEN:
+            raise CircuitOpenError(gemini_breaker.name, gemini_breaker.retry_after())
+        call = hedge(attempt, hedge_delay(task))
+        response, attempt_index = await (asyncio.wait_for(call, timeout) if timeout else call)
+        outcome = "ok"
+        if attempts > 1:
+            AI_HEDGES.inc(task=task, winner="hedge" if attempt_index else "primary")
+        return response
+    except asyncio.TimeoutError:
+        if not called_at:
+            # Still queued for a slot: local load, not a slow Gemini
+            outcome = "queue_timeout"
+            raise
+        outcome = "timeout"
+        # The cancelled attempt recorded nothing; a missed deadline counts against the breaker
+        gemini_breaker.record(False, time.perf_counter() - called_at[0])
+        raise
+    except CircuitOpenError:
+        outcome = "circuit_open"
+        raise
+    except HTTPException:
+        # Only the global Gemini limit raises HTTPException before the call
+        outcome = "rate_limited"
+        raise
+    except PoolSaturatedError as e:
+        outcome = "rejected"
+        logger.warning(f"AI pool saturated: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service is busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    finally:
+        GEMINI_DURATION.observe(time.perf_counter() - started, task=task, outcome=outcome)
+
+def ai_error(task_name: str, e: Exception) -> HTTPException:
+    """The HTTP error for a failed Gemini call. Upstream messages are logged, never returned to the client."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, CircuitOpenError):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service is temporarily unavailable, please retry shortly",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    if isinstance(e, asyncio.TimeoutError):
+        logger.warning(f"Gemini timed out ({task_name}) after {ai_deadline(task_name):.1f}s")
+        return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail="AI service timed out, please retry")
+    logger.error(f"Gemini Error ({task_name}): {e}")
+    return HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="AI service error, please retry")
+
 # --- Caching Logic ---
+def _cache_key(key_parts: List[str]) -> str:
+    return hashlib.sha256("".join(key_parts).encode()).hexdigest()
+
+def _write_cached_responses(docs: Dict[str, Any]):
+    """Persists a batch of cache entries to the cache backend (runs on the write-behind thread)."""
+    cache_backend.set_many(docs)
+
+cache_backend = process_state.register(
+    "cache_backend",
+    lambda: build_cache_backend(AI_CACHE_BACKEND, lambda: db, AI_CACHE_SQLITE_PATH, ttl=CACHE_TTL_SECONDS),
+    close=lambda backend: backend.close(),
+)
+ai_cache = process_state.register("ai_cache", lambda: TTLCache(maxsize=AI_CACHE_L1_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS))
+cache_writer = WriteBehindWriter(_write_cached_responses)
+
+async def _lookup_cache_backend(keys: List[str]) -> Dict[str, Any]:
+    with CACHE_LOOKUP_DURATION.time(tier=cache_backend.name if len(keys) == 1 else f"{cache_backend.name}_bulk"):
+        if cache_backend.blocking:
+            return await asyncio.to_thread(cache_backend.get_many, keys, CACHE_TTL_SECONDS)
+        return cache_backend.get_many(keys, CACHE_TTL_SECONDS)
+
 async def get_cached_response(key_parts: List[str]):
-    key = hashlib.sha256("".join(key_parts).encode()).hexdigest()
-    doc = db.collection('cached_ai_responses').document(key).get()
-    if doc.exists:
-        data = doc.to_dict()
-        if time.time() - data.get('timestamp', 0) < 600:
-            logger.debug(f"Cache HIT for key prefix: {key[:8]}")
-            return data.get('response')
+    key = _cache_key(key_parts)
+    with CACHE_LOOKUP_DURATION.time(tier="l1"):
+        cached = ai_cache.get(key)
+    if cached is not None:
+        CACHE_LOOKUPS.inc(tier="l1", result="hit")
+        logger.debug(f"L1 cache HIT for key prefix: {key[:8]}")
+        return cached
+    CACHE_LOOKUPS.inc(tier="l1", result="miss")
+
+    found = await _lookup_cache_backend([key])
+    if key in found:
+        response, remaining = found[key]
+        CACHE_LOOKUPS.inc(tier=cache_backend.name, result="hit")
+        logger.debug(f"Cache HIT for key prefix: {key[:8]}")
+        ai_cache.set(key, response, ttl=remaining)
+        return response
+    CACHE_LOOKUPS.inc(tier=cache_backend.name, result="miss")
     logger.debug(f"Cache MISS for key prefix: {key[:8]}")
     return None
 
+async def get_cached_responses(key_parts_list: List[List[str]]) -> List[Any]:
+    """Bulk form of get_cached_response: L1 first, then one backend lookup for the rest."""
+    keys = [_cache_key(parts) for parts in key_parts_list]
+    results = [ai_cache.get(key) for key in keys]
+    missing = [key for key, result in zip(keys, results) if result is None]
+    if not missing:
+        return results
+
+    found = {}
+    for key, (response, remaining) in (await _lookup_cache_backend(sorted(set(missing)))).items():
+        found[key] = response
+        ai_cache.set(key, response, ttl=remaining)
+    CACHE_LOOKUPS.inc(len(keys) - len(missing), tier="l1", result="hit")
+    CACHE_LOOKUPS.inc(len(missing), tier="l1", result="miss")
+    CACHE_LOOKUPS.inc(len(found), tier=cache_backend.name, result="hit")
+    CACHE_LOOKUPS.inc(len(set(missing)) - len(found), tier=cache_backend.name, result="miss")
+    logger.debug(f"Bulk cache lookup: {len(keys) - len(missing) + len(found)}/{len(keys)} hits")
+    return [result if result is not None else found.get(key) for key, result in zip(keys, results)]
+
 async def save_cached_response(key_parts: List[str], response: Any):
-    key = hashlib.sha256("".join(key_parts).encode()).hexdigest()
-    db.collection('cached_ai_responses').document(key).set({
-        'response': response,
-        'timestamp': time.time()
-    })
+    with CACHE_SAVE_DURATION.time():
+        key = _cache_key(key_parts)
+        ai_cache.set(key, response)
+        cache_writer.submit(key, {
+            'response': response,
+            'timestamp': time.time()
+        })
 
 # --- Models ---
 class AIRequest(BaseModel):
     user_id: str
     text: Optional[str] = None
     context: Optional[Dict[str, Any]] = None
+    # Language of the text and of the answer, e.g. "es"; English when omitted
+    locale: Optional[str] = None
 
 class AIResponse(BaseModel):
     result: Any
     alternatives: Optional[List[str]] = None
     is_offensive: bool = False
     from_cache: bool = False
+    # Which engine produced the result: "gemini", "rules" (local fast path) or "vocabulary" (offline fallback)
+    engine: str = "gemini"
 
-# --- Endpoints ---
+AITaskName = Literal["neutralize", "refine", "feelings", "needs", "reflection"]
 
-@app.post("/ai/neutralize-observation", response_model=AIResponse)
-async def neutralize_observation(req: AIRequest, uid: str = Depends(verify_firebase_token)):
-    # Verify the claimed user_id matches the token (prevents spoofing other users)
-    if req.user_id != uid:
-        logger.warning(f"User ID mismatch: Claimed {req.user_id} vs Token {uid}")
-        # We generally trust the token UID. We can either overwrite req.user_id or reject.
-        req.user_id = uid
+class AITaskRequest(BaseModel):
+    task: AITaskName
+    text: Optional[str] = None
+    context: Optional[Dict[str, Any]] = None
 
-    logger.info(f"Endpoint: neutralize-observation | User: {req.user_id} | Text: {req.text[:50]}...")
-    
-    cache_key = [req.user_id, "neutralize", req.text or ""]
-    cached = await get_cached_response(cache_key)
-    if cached:
-        return AIResponse(result=cached, from_cache=True)
+class BatchAIRequest(BaseModel):
+    user_id: str
+    tasks: List[AITaskRequest]
+    # Applies to every task in the batch
+    locale: Optional[str] = None
+
+class AITaskResult(BaseModel):
+    task: str
+    status_code: int = 200
+    response: Optional[AIResponse] = None
+    error: Optional[str] = None
+
+class BatchAIResponse(BaseModel):
+    results: List[AITaskResult]
+
+class PrefetchRequest(BaseModel):
+    user_id: str
+    # Parts of the message being composed, as the app will send them to the AI endpoints
+    observation: Optional[str] = None
+    feelings: Optional[str] = None
+    needs: Optional[str] = None
+    request: Optional[str] = None
+    is_calm: bool = True
+    # Session whose other participants will ask for the reflection of this message
+    session_id: Optional[str] = None
+    locale: Optional[str] = None
+
+class PrefetchResponse(BaseModel):
+    queued: List[str]
+
+class SessionCreateRequest(BaseModel):
+    mode: Literal["shared", "solo"] = "shared"
+
+class SessionMessage(BaseModel):
+    observation: str
+    emotions: List[str]
+    need: str
+    request: str
+
+class SessionEventRequest(BaseModel):
+    event: Literal["join", "regulation_complete", "listener_ready", "send_message", "confirm_reflection",
+                   "next_turn", "finish"]
+    # Session version the client's screen shows; events decided on an older one are rejected with 409
+    version: Optional[int] = None
+    message: Optional[SessionMessage] = None
+
+class SessionStateResponse(BaseModel):
+    session_id: str
+    version: int
+    status: str
+    mode: str
+    participants: List[str]
+    # Participants done with the regulation step
+    ready: List[str]
+    current_speaker: Optional[str] = None
+    listener_status: Optional[str] = None
+    turns_completed: int = 0
+
+class SafetyRequest(BaseModel):
+    text: str
+    # Selects the locale's validation rules; English when omitted
+    locale: Optional[str] = None
+
+class SafetyBatchRequest(BaseModel):
+    texts: List[str]
+    locale: Optional[str] = None
+
+class SafetyMatchResult(BaseModel):
+    category: str
+    start: int
+    end: int
+    text: str
+
+class SafetyResponse(BaseModel):
+    is_safe: bool
+    censored_text: str
+    flagged: bool
+    categories: List[str] = []
+    matches: List[SafetyMatchResult] = []
+
+class SafetyBatchResponse(BaseModel):
+    results: List[SafetyResponse]
 
-    prompt = (
+def resolve_locale(locale: Optional[str]) -> str:
+    """A request's locale as the documents and cache keys name it ('es-MX' -> 'es'); English when omitted."""
+    if not locale:
+        return DEFAULT_LOCALE
+    normalized = normalize_locale(locale)
+    if normalized not in SUPPORTED_LOCALES:
+        raise HTTPException(status_code=422,
+                            detail=f"Unsupported locale '{locale}', expected one of: {', '.join(SUPPORTED_LOCALES)}")
+    return normalized
+
+# --- AI Tasks ---
+# Each AI task is described by how it keys the cache, builds its prompt and
+# parses Gemini's reply, so the single endpoints and the batch endpoint share
+# one implementation.
+
+def build_neutralize_prompt(text: Optional[str], context: Dict[str, Any]) -> str:
+    return (
         "Analyze this observation: '{text}'.\n"
         "1. Is this statement judgmental, blaming, or offensive? (Yes/No)\n"
         "2. If Yes, provide 1 to 3 neutral, fact-based NVC alternatives. Do NOT use square brackets.\n"
@@ -205,38 +854,10 @@ async def neutralize_observation(req: AIRequest, uid: str = Depends(verify_fireb
         "Format your response as:\n"
         "Judgment: [Yes/No]\n"
         "Alternatives: alt1, alt2, ..."
-    ).format(text=req.text)
-    
-    try:
-        response = model.generate_content(prompt)
-        resp_text = response.text.strip()
-        logger.debug(f"Gemini Response: {resp_text}")
-    except Exception as e:
-        logger.error(f"Gemini Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    is_offensive = "Judgment: Yes" in resp_text
-    alts = parse_ai_alternatives(resp_text)
+    ).format(text=text)
 
-    if is_offensive and alts:
-        return AIResponse(result=alts[0], alternatives=alts, is_offensive=True)
-    
-    result = alts[0] if alts else req.text
-    await save_cached_response(cache_key, result)
-    return AIResponse(result=result)
-
-@app.post("/ai/refine-request", response_model=AIResponse)
-async def refine_request(req: AIRequest, uid: str = Depends(verify_firebase_token)):
-    if req.user_id != uid: req.user_id = uid
-    logger.info(f"Endpoint: refine-request | User: {req.user_id}")
-    
-    context = req.context or {}
-    cache_key = [req.user_id, "refine", req.text or "", str(context)]
-    cached = await get_cached_response(cache_key)
-    if cached:
-        return AIResponse(result=cached, from_cache=True)
-
-    prompt = (
+def build_refine_prompt(text: Optional[str], context: Dict[str, Any]) -> str:
+    return (
         "Analyze this request: '{text}'. Context: Feelings={feelings}, Needs={needs}.\n"
         "1. Is this request a demand, offensive, or vague? (Yes/No)\n"
         "2. If Yes, provide exactly 1 to 3 positive, actionable NVC alternatives starting with 'Would you be willing to...'. Do NOT use square brackets.\n"
@@ -244,85 +865,25 @@ async def refine_request(req: AIRequest, uid: str = Depends(verify_firebase_toke
         "Format your response as:\n"
         "Judgment: [Yes/No]\n"
         "Alternatives: alt1, alt2, ..."
-    ).format(text=req.text, feelings=context.get('feelings'), needs=context.get('needs'))
-    
-    try:
-        response = model.generate_content(prompt)
-        resp_text = response.text.strip()
-        logger.debug(f"Gemini Response: {resp_text}")
-    except Exception as e:
-        logger.error(f"Gemini Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-    
-    is_offensive = "Judgment: Yes" in resp_text
-    alts = parse_ai_alternatives(resp_text)
-
-    if is_offensive and alts:
-        return AIResponse(result=alts[0], alternatives=alts, is_offensive=True)
-    
-    result = alts[0] if alts else req.text
-    await save_cached_response(cache_key, result)
-    return AIResponse(result=result)
-
-@app.post("/ai/suggest-feelings", response_model=AIResponse)
-async def suggest_feelings(req: AIRequest, uid: str = Depends(verify_firebase_token)):
-    if req.user_id != uid: req.user_id = uid
-    logger.info(f"Endpoint: suggest-feelings | User: {req.user_id}")
-    
-    cache_key = [req.user_id, "feelings", req.text or ""]
-    cached = await get_cached_response(cache_key)
-    if cached:
-        return AIResponse(result=cached, from_cache=True)
+    ).format(text=text, feelings=context.get('feelings'), needs=context.get('needs'))
 
-    prompt = (
-        f"Based on this conflict observation: '{req.text}', suggest 3 core emotions (from EFT/NVC) the speaker might feel. "
+def build_feelings_prompt(text: Optional[str], context: Dict[str, Any]) -> str:
+    return (
+        f"Based on this conflict observation: '{text}', suggest 3 core emotions (from EFT/NVC) the speaker might feel. "
         "The speaker is the one sharing. The other person is the listener. "
         "Return ONLY a comma-separated list of 3 single words."
     )
-    
-    response = model.generate_content(prompt)
-    result = [w.strip().lower() for w in response.text.split(",") if w.strip()]
-    logger.debug(f"Generated Feelings: {result}")
-    
-    await save_cached_response(cache_key, result)
-    return AIResponse(result=result)
-
-@app.post("/ai/suggest-needs", response_model=AIResponse)
-async def suggest_needs(req: AIRequest, uid: str = Depends(verify_firebase_token)):
-    if req.user_id != uid: req.user_id = uid
-    logger.info(f"Endpoint: suggest-needs | User: {req.user_id}")
-    
-    feelings = req.context.get("feelings", "") if req.context else ""
-    cache_key = [req.user_id, "needs", req.text or "", feelings]
-    cached = await get_cached_response(cache_key)
-    if cached:
-        return AIResponse(result=cached, from_cache=True)
 
-    prompt = (
-        f"The speaker feels '{feelings}' about this observation: '{req.text}'. Suggest 3 universal human needs (NVC) "
+def build_needs_prompt(text: Optional[str], context: Dict[str, Any]) -> str:
+    feelings = context.get("feelings", "")
+    return (
+        f"The speaker feels '{feelings}' about this observation: '{text}'. Suggest 3 universal human needs (NVC) "
         "that might be unmet for the speaker. Return ONLY a comma-separated list of 3 words."
     )
-    
-    response = model.generate_content(prompt)
-    result = [w.strip().lower() for w in response.text.split(",") if w.strip()]
-    logger.debug(f"Generated Needs: {result}")
-    
-    await save_cached_response(cache_key, result)
-    return AIResponse(result=result)
-
-@app.post("/ai/generate-reflection", response_model=AIResponse)
-async def generate_reflection(req: AIRequest, uid: str = Depends(verify_firebase_token)):
-    if req.user_id != uid: req.user_id = uid
-    logger.info(f"Endpoint: generate-reflection | User: {req.user_id}")
-    
-    ctx = req.context or {}
-    cache_key = [req.user_id, "reflection", str(ctx)]
-    cached = await get_cached_response(cache_key)
-    if cached:
-        return AIResponse(result=cached, from_cache=True)
 
+def build_reflection_prompt(ctx: Dict[str, Any]) -> str:
     tone = "warm" if ctx.get("is_calm", True) else "objective and short"
-    prompt = (
+    return (
         "You are an NVC coach. Generate a reflection for the LISTENER to say to the SPEAKER. "
         "Context: The SPEAKER shared a message with the following parts: "
         "Observation: {observation}, Feelings: {feelings}, Needs: {needs}, Request: {request}. "
@@ -334,25 +895,764 @@ async def generate_reflection(req: AIRequest, uid: str = Depends(verify_firebase
         "2. State the listener's willingness to consider changing their behavior to meet the speaker's need. "
         f"Tone: {tone}. Format: Just the reflection text."
     ).format(observation=ctx.get('observation'), feelings=ctx.get('feelings'), needs=ctx.get('needs'), request=ctx.get('request'))
-    
+
+def parse_judgment_response(resp_text: str, text: Optional[str]) -> AIResponse:
+    is_offensive = "Judgment: Yes" in resp_text
+    alts = parse_ai_alternatives(resp_text)
+
+    if is_offensive and alts:
+        return AIResponse(result=alts[0], alternatives=alts, is_offensive=True)
+    return AIResponse(result=alts[0] if alts else text)
+
+def parse_word_list_response(resp_text: str, text: Optional[str]) -> AIResponse:
+    return AIResponse(result=[w.strip().lower() for w in resp_text.split(",") if w.strip()])
+
+def parse_text_response(resp_text: str, text: Optional[str]) -> AIResponse:
+    return AIResponse(result=resp_text)
+
+class AITask(NamedTuple):
+    cache_key: Callable[[str, Optional[str], Dict[str, Any]], List[str]]
+    build_prompt: Callable[[Optional[str], Dict[str, Any]], str]
+    parse: Callable[[str, Optional[str]], AIResponse]
+    # Set for tasks whose output carries no personal data; returns the context
+    # part an answer depends on besides the text, so it can be shared across users.
+    shared_scope: Optional[Callable[[Dict[str, Any]], str]] = None
+    # Classifier kind for tasks whose "Judgment: No" answer is the input itself
+    fast_path_kind: Optional[str] = None
+    # Local answer used when Gemini is failing, saturated or too slow
+    fallback: Optional[Callable[[VocabularySuggester, Optional[str], Dict[str, Any]], List[str]]] = None
+
+def _feelings_scope(ctx: Dict[str, Any]) -> str:
+    feelings = ctx.get("feelings", "")
+    if isinstance(feelings, list):
+        feelings = ",".join(sorted(str(f).strip().lower() for f in feelings))
+    return str(feelings).strip().lower()
+
+AI_TASKS: Dict[str, AITask] = {
+    "neutralize": AITask(
+        cache_key=lambda uid, text, ctx: [uid, "neutralize", text or ""],
+        build_prompt=build_neutralize_prompt,
+        parse=parse_judgment_response,
+        fast_path_kind=KIND_OBSERVATION,
+    ),
+    "refine": AITask(
+        cache_key=lambda uid, text, ctx: [uid, "refine", text or "", str(ctx)],
+        build_prompt=build_refine_prompt,
+        parse=parse_judgment_response,
+        fast_path_kind=KIND_REQUEST,
+    ),
+    "feelings": AITask(
+        cache_key=lambda uid, text, ctx: [uid, "feelings", text or ""],
+        build_prompt=build_feelings_prompt,
+        parse=parse_word_list_response,
+        shared_scope=lambda ctx: "",
+        fallback=lambda suggester, text, ctx: suggester.suggest_feelings(text or ""),
+    ),
+    "needs": AITask(
+        cache_key=lambda uid, text, ctx: [uid, "needs", text or "", ctx.get("feelings", "")],
+        build_prompt=build_needs_prompt,
+        parse=parse_word_list_response,
+        shared_scope=_feelings_scope,
+        fallback=lambda suggester, text, ctx: suggester.suggest_needs(text or "", ctx.get("feelings")),
+    ),
+    "reflection": AITask(
+        # Keys sorted, so the speaker's prefetch matches the listener's request whatever the field order
+        cache_key=lambda uid, text, ctx: [uid, "reflection", json.dumps(ctx, sort_keys=True, default=str)],
+        build_prompt=lambda text, ctx: build_reflection_prompt(ctx),
+        parse=parse_text_response,
+    ),
+}
+
+def ai_cache_key(task_name: str, user_id: str, text: Optional[str], context: Dict[str, Any],
+                 locale: str = DEFAULT_LOCALE) -> List[str]:
+    """The task's cache key; answers in other languages are kept apart from the English ones, whose keys predate locales."""
+    key = AI_TASKS[task_name].cache_key(user_id, text, context)
+    return key if locale == DEFAULT_LOCALE else [*key, f"locale={locale}"]
+
+_NOT_LOOKED_UP = object()
+ai_single_flight = process_state.register("ai_single_flight", SingleFlight)
+neutrality_classifier = process_state.register(
+    "neutrality_classifier", lambda: NeutralityClassifier(threshold=FAST_PATH_THRESHOLD))
+shared_cache = process_state.register("shared_cache", lambda: SimilarityCache(
+    threshold=SHARED_CACHE_THRESHOLD,
+    capacity=SHARED_CACHE_CAPACITY,
+    ttl=SHARED_CACHE_TTL_SECONDS,
+))
+
+fallback_count: Dict[str, int] = process_state.register("fallback_count", dict)
+
+def run_fallback(task_name: str, text: Optional[str], context: Dict[str, Any],
+                 locale: str = DEFAULT_LOCALE) -> Optional[AIResponse]:
+    """Answers a task from the local vocabulary suggester, or None if the task has no fallback or no vocabulary is loaded."""
+    task = AI_TASKS[task_name]
+    # The suggester's keyword tables are English
+    suggester = get_loaded_suggester() if task.fallback and locale == DEFAULT_LOCALE else None
+    if suggester is None:
+        return None
+    fallback_count[task_name] = fallback_count.get(task_name, 0) + 1
+    # Never cached: the next request should get a real model answer once it recovers
+    return AIResponse(result=task.fallback(suggester, text, context), engine="vocabulary")
+
+async def run_ai_task(task_name: str, user_id: str, text: Optional[str], context: Optional[Dict[str, Any]],
+                      cached: Any = _NOT_LOOKED_UP, locale: str = DEFAULT_LOCALE) -> AIResponse:
+    """
+    Answers one AI task from the cache or Gemini.
+
+    Pass `cached` when the cache was already consulted (e.g. a bulk lookup) to
+    skip the per-task lookup. Offensive results are never cached.
+    """
+    prefetcher.claim(_cache_key(ai_cache_key(task_name, user_id, text, context or {}, locale)))
     try:
-        response = model.generate_content(prompt)
-        result = response.text.strip()
+        result = await _resolve_ai_task(task_name, user_id, text, context, cached, locale)
+    except HTTPException as e:
+        AI_ERRORS.inc(task=task_name, status=str(e.status_code))
+        raise
+    AI_RESPONSES.inc(task=task_name, engine=result.engine, from_cache=str(result.from_cache).lower())
+    if result.is_offensive:
+        AI_OFFENSIVE.inc(task=task_name)
+    return result
+
+async def _resolve_ai_task(task_name: str, user_id: str, text: Optional[str], context: Optional[Dict[str, Any]],
+                           cached: Any, locale: str = DEFAULT_LOCALE) -> AIResponse:
+    task = AI_TASKS[task_name]
+    context = context or {}
+
+    # The classifier's term lists are English
+    if FAST_PATH_ENABLED and task.fast_path_kind and text and locale == DEFAULT_LOCALE:
+        matcher = get_loaded_safety_matcher()
+        if matcher and neutrality_classifier.is_confidently_neutral(text, task.fast_path_kind, matcher):
+            logger.debug(f"Fast path: {task_name} input judged neutral locally")
+            return AIResponse(result=text, engine="rules")
+
+    cache_key = ai_cache_key(task_name, user_id, text, context, locale)
+    if cached is _NOT_LOOKED_UP:
+        cached = await get_cached_response(cache_key)
+    if cached:
+        return AIResponse(result=cached, from_cache=True)
+
+    share = SHARED_CACHE_ENABLED and task.shared_scope is not None and bool(text)
+    if share:
+        scope = task.shared_scope(context)
+        if locale != DEFAULT_LOCALE:
+            scope = f"{locale}|{scope}"
+        similar = shared_cache.lookup(task_name, text, scope=scope)
+        if similar is not None:
+            logger.debug(f"Shared cache HIT ({task_name}, similarity {similar[1]:.3f})")
+            return AIResponse(result=similar[0], from_cache=True)
+
+    async def generate() -> AIResponse:
+        # An identical call may have finished while this request awaited the backend lookup above
+        # and left single-flight; what it saved is in the L1 already
+        finished = ai_cache.get(_cache_key(cache_key))
+        if finished is not None:
+            return AIResponse(result=finished, from_cache=True)
+        try:
+            response = await generate_content(localize_prompt(task.build_prompt(text, context), locale),
+                                              timeout=ai_deadline(task_name), task=task_name)
+            resp_text = response.text.strip()
+            logger.debug(f"Gemini Response ({task_name}): {resp_text}")
+        except Exception as e:
+            degraded = run_fallback(task_name, text, context, locale)
+            if degraded is not None:
+                logger.warning(f"Gemini unavailable for {task_name} ({type(e).__name__}: {e}), answered from vocabulary")
+                return degraded
+            raise ai_error(task_name, e)
+
+        result = task.parse(resp_text, text)
+        if not result.is_offensive:
+            await save_cached_response(cache_key, result.result)
+            if share:
+                shared_cache.add(task_name, text, result.result, scope=scope)
+        return result
+
+    # Identical requests still in flight (double taps, retries) share one Gemini call
+    return await ai_single_flight.do(_cache_key(cache_key), generate)
+
+# --- Prefetch ---
+# The session flow is predictable: feelings follow a vetted observation, needs
+# follow the chosen feelings, and the listener asks for a reflection of exactly
+# the message the speaker sent. Those results are computed into the cache in
+# the background so the next click is a cache hit.
+
+async def run_prefetch(job: PrefetchJob) -> str:
+    """Computes one prefetched result into the cache, unless it is there already or Gemini is busy."""
+    # Prefetches only use spare capacity: never queue behind user requests or probe a failing upstream
+    if (generation_pool.waiting or generation_pool.in_flight * 2 >= generation_pool.max_concurrency
+            or gemini_breaker.state != CLOSED):
+        return SKIPPED
+    if await get_cached_response(ai_cache_key(job.task, job.user_id, job.text, job.context, job.locale)):
+        return ALREADY_CACHED
+    result = await _resolve_ai_task(job.task, job.user_id, job.text, job.context, cached=None, locale=job.locale)
+    if result.from_cache:
+        return ALREADY_CACHED
+    # Vocabulary fallbacks are never cached, so the next request couldn't hit them
+    return COMPUTED if result.engine == "gemini" else SKIPPED
+
+prefetcher = process_state.register("prefetcher", lambda: Prefetcher(
+    run_prefetch,
+    workers=PREFETCH_WORKERS,
+    max_queue=PREFETCH_MAX_QUEUE,
+    ttl=CACHE_TTL_SECONDS,
+    on_outcome=lambda task, outcome: AI_PREFETCHES.inc(task=task, outcome=outcome),
+))
+
+def prefetch_job(task_name: str, user_id: str, text: Optional[str], context: Dict[str, Any],
+                 locale: str = DEFAULT_LOCALE) -> PrefetchJob:
+    key = _cache_key(ai_cache_key(task_name, user_id, text, context, locale))
+    return PrefetchJob(task_name, user_id, text, context, key, locale)
+
+def queue_prefetch(background: BackgroundTasks, jobs: List[PrefetchJob]) -> List[str]:
+    """Queues jobs to run once the response has been sent; returns the tasks actually queued."""
+    if not PREFETCH_ENABLED:
+        return []
+    queued = [job.task for job in jobs if prefetcher.submit(job)]
+    if queued:
+        background.add_task(prefetcher.drain)
+    return queued
+
+async def prefetch_reflections(session_id: str, speaker_id: str, context: Dict[str, Any],
+                               locale: str = DEFAULT_LOCALE):
+    """Prefetches the reflection every other participant of the session will ask for."""
+    current = await asyncio.to_thread(session_store.get, session_id)
+    participants = current[0].get("participants", []) if current else []
+    if speaker_id not in participants:
+        logger.warning(f"Reflection prefetch ignored: {speaker_id} is not in session {session_id}")
+        return
+    for listener_id in participants:
+        if listener_id != speaker_id:
+            prefetcher.submit(prefetch_job("reflection", listener_id, None, context, locale))
+    await prefetcher.drain()
+
+# --- Endpoints ---
+
+@app.post("/ai/neutralize-observation", response_model=AIResponse)
+async def neutralize_observation(req: AIRequest, uid: str = Depends(rate_limited("neutralize"))):
+    # Verify the claimed user_id matches the token (prevents spoofing other users)
+    if req.user_id != uid:
+        logger.warning(f"User ID mismatch: Claimed {req.user_id} vs Token {uid}")
+        # We generally trust the token UID. We can either overwrite req.user_id or reject.
+        req.user_id = uid
+
+    # User text stays out of INFO lines
+    logger.info(f"Endpoint: neutralize-observation | User: {req.user_id} | Chars: {len(req.text or '')}")
+    return await run_ai_task("neutralize", req.user_id, req.text, req.context, locale=resolve_locale(req.locale))
+
+@app.post("/ai/refine-request", response_model=AIResponse)
+async def refine_request(req: AIRequest, uid: str = Depends(rate_limited("refine"))):
+    if req.user_id != uid: req.user_id = uid
+    logger.info(f"Endpoint: refine-request | User: {req.user_id}")
+    return await run_ai_task("refine", req.user_id, req.text, req.context, locale=resolve_locale(req.locale))
+
+@app.post("/ai/suggest-feelings", response_model=AIResponse)
+async def suggest_feelings(req: AIRequest, uid: str = Depends(rate_limited("feelings"))):
+    if req.user_id != uid: req.user_id = uid
+    logger.info(f"Endpoint: suggest-feelings | User: {req.user_id}")
+    return await run_ai_task("feelings", req.user_id, req.text, req.context, locale=resolve_locale(req.locale))
+
+@app.post("/ai/suggest-needs", response_model=AIResponse)
+async def suggest_needs(req: AIRequest, uid: str = Depends(rate_limited("needs"))):
+    if req.user_id != uid: req.user_id = uid
+    logger.info(f"Endpoint: suggest-needs | User: {req.user_id}")
+    return await run_ai_task("needs", req.user_id, req.text, req.context, locale=resolve_locale(req.locale))
+
+@app.post("/ai/generate-reflection", response_model=AIResponse)
+async def generate_reflection(req: AIRequest, uid: str = Depends(rate_limited("reflection"))):
+    if req.user_id != uid: req.user_id = uid
+    logger.info(f"Endpoint: generate-reflection | User: {req.user_id}")
+    return await run_ai_task("reflection", req.user_id, req.text, req.context, locale=resolve_locale(req.locale))
+
+@app.post("/ai/expression-step", response_model=BatchAIResponse)
+async def expression_step(req: BatchAIRequest, uid: str = Depends(verify_firebase_token)):
+    """
+    Runs several AI tasks in one round trip.
+
+    Each task is charged to its own endpoint's rate limit, as if it had been
+    sent alone. Cache hits for all tasks are resolved with a single bulk
+    lookup; the misses run concurrently. A failing task reports its own error
+    without failing the others.
+    """
+    if req.user_id != uid: req.user_id = uid
+    logger.info(f"Endpoint: expression-step | User: {req.user_id} | Tasks: {[t.task for t in req.tasks]}")
+    if len(req.tasks) > BATCH_MAX_TASKS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_TASKS} tasks per batch")
+    locale = resolve_locale(req.locale)
+    costs: Dict[str, float] = {}
+    for item in req.tasks:
+        costs[item.task] = costs.get(item.task, 0) + 1
+    charge_rate_limits(uid, costs)
+
+    cache_keys = [ai_cache_key(t.task, req.user_id, t.text, t.context or {}, locale) for t in req.tasks]
+    cached = await get_cached_responses(cache_keys)
+
+    async def run(item: AITaskRequest, cached_result: Any) -> AITaskResult:
+        try:
+            response = await run_ai_task(item.task, req.user_id, item.text, item.context, cached=cached_result,
+                                         locale=locale)
+            return AITaskResult(task=item.task, response=response)
+        except HTTPException as e:
+            detail = e.detail["message"] if isinstance(e.detail, dict) else str(e.detail)
+            return AITaskResult(task=item.task, status_code=e.status_code, error=detail)
+        except Exception as e:
+            logger.error(f"Batch task {item.task} failed: {e}")
+            return AITaskResult(task=item.task, status_code=500, error="Internal error")
+
+    results = await asyncio.gather(*(run(item, hit) for item, hit in zip(req.tasks, cached)))
+    return BatchAIResponse(results=results)
+
+@app.post("/ai/prefetch", response_model=PrefetchResponse, status_code=status.HTTP_202_ACCEPTED)
+async def prefetch(req: PrefetchRequest, background: BackgroundTasks, uid: str = Depends(verify_firebase_token)):
+    """
+    Computes the AI results the session will ask for next, in the background.
+
+    With an observation, its feelings are prefetched; with feelings too, the
+    needs. With the whole message and a session_id, the reflection each other
+    participant will request. Fields must be exactly what the app will send
+    later, or the prefetched entries won't be hit.
+
+    The `prefetch` rate limit is charged one request per result it may
+    compute (at least one), since each can be a Gemini call.
+    """
+    if req.user_id != uid: req.user_id = uid
+    locale = resolve_locale(req.locale)
+    jobs = []
+    if req.observation:
+        jobs.append(prefetch_job("feelings", uid, req.observation, {}, locale))
+        if req.feelings:
+            jobs.append(prefetch_job("needs", uid, req.observation, {"feelings": req.feelings}, locale))
+    reflect = bool(req.session_id and all((req.observation, req.feelings, req.needs, req.request)))
+    # Shared sessions have two participants, so a message has one listener to prefetch for
+    charge_rate_limits(uid, {"prefetch": max(1, len(jobs) + reflect) if PREFETCH_ENABLED else 1})
+    queued = queue_prefetch(background, jobs)
+
+    if PREFETCH_ENABLED and reflect:
+        context = {"observation": req.observation, "feelings": req.feelings, "needs": req.needs,
+                   "request": req.request, "is_calm": req.is_calm}
+        background.add_task(prefetch_reflections, req.session_id, uid, context, locale)
+        queued.append("reflection")
+    logger.info(f"Endpoint: prefetch | User: {uid} | Tasks: {queued}")
+    return PrefetchResponse(queued=queued)
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/ai/generate-reflection/stream")
+async def generate_reflection_stream(req: AIRequest, uid: str = Depends(rate_limited("reflection"))):
+    """
+    Same as /ai/generate-reflection, relayed as Server-Sent Events while Gemini generates.
+
+    Emits `token` events with text deltas and a final `done` event carrying the
+    full result. A cached reflection is replayed as a single `done` event.
+    """
+    if req.user_id != uid: req.user_id = uid
+    logger.info(f"Endpoint: generate-reflection/stream | User: {req.user_id}")
+
+    ctx = req.context or {}
+    locale = resolve_locale(req.locale)
+    cache_key = ai_cache_key("reflection", req.user_id, req.text, ctx, locale)
+    prefetcher.claim(_cache_key(cache_key))
+    cached = await get_cached_response(cache_key)
+
+    async def events():
+        if cached:
+            yield sse_event("done", {"result": cached, "from_cache": True})
+            return
+
+        started = time.perf_counter()
+        deadline = started + ai_deadline("reflection")
+        first_token_at = None
+        parts = []
+        try:
+            if gemini_breaker.state == OPEN:
+                raise CircuitOpenError(gemini_breaker.name, gemini_breaker.retry_after())
+            await acquire_gemini_quota("reflection_stream")
+            async with generation_pool.slot():
+                gemini_breaker.check()
+                # The deadline covers the whole stream, so a stalled stream ends instead of hanging
+                stream = await asyncio.wait_for(
+                    model.generate_content_async(localize_prompt(build_reflection_prompt(ctx), locale), stream=True),
+                    deadline - time.perf_counter(),
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), max(0.0, deadline - time.perf_counter()))
+                    except StopAsyncIteration:
+                        break
+                    text = chunk.text
+                    if not text:
+                        continue
+                    if not parts:
+                        first_token_at = time.perf_counter()
+                        STREAM_FIRST_TOKEN.observe(first_token_at - started)
+                        logger.debug(f"Reflection stream first token after {(time.perf_counter() - started) * 1000:.0f}ms")
+                    parts.append(text)
+                    yield sse_event("token", {"text": text})
+        except CircuitOpenError as e:
+            GEMINI_DURATION.observe(time.perf_counter() - started, task="reflection_stream", outcome="circuit_open")
+            yield sse_event("error", {"detail": "AI service is temporarily unavailable, please retry shortly",
+                                      "retry_after": max(1, math.ceil(e.retry_after))})
+            return
+        except HTTPException as e:
+            GEMINI_DURATION.observe(time.perf_counter() - started, task="reflection_stream", outcome="rate_limited")
+            yield sse_event("error", {"detail": e.detail["message"], "retry_after": e.detail["retry_after"]})
+            return
+        except PoolSaturatedError as e:
+            logger.warning(f"AI pool saturated: {e}")
+            GEMINI_DURATION.observe(time.perf_counter() - started, task="reflection_stream", outcome="rejected")
+            yield sse_event("error", {"detail": "AI service is busy, please retry shortly"})
+            return
+        except asyncio.TimeoutError:
+            logger.warning(f"Reflection stream exceeded its {ai_deadline('reflection'):.1f}s deadline")
+            gemini_breaker.record(False, time.perf_counter() - started)
+            GEMINI_DURATION.observe(time.perf_counter() - started, task="reflection_stream", outcome="timeout")
+            yield sse_event("error", {"detail": "AI service timed out, please retry"})
+            return
+        except Exception as e:
+            logger.error(f"Reflection Stream Error: {e}")
+            gemini_breaker.record(False, time.perf_counter() - started)
+            GEMINI_DURATION.observe(time.perf_counter() - started, task="reflection_stream", outcome="error")
+            yield sse_event("error", {"detail": "Reflection generation failed"})
+            return
+        # Time to first token is what the breaker judges; a long reflection isn't a slow upstream
+        gemini_breaker.record(True, (first_token_at or time.perf_counter()) - started)
+        GEMINI_DURATION.observe(time.perf_counter() - started, task="reflection_stream", outcome="ok")
+
+        result = "".join(parts).strip()
         logger.debug(f"Generated Reflection: {result}")
         await save_cached_response(cache_key, result)
-        return AIResponse(result=result)
-    except Exception as e:
-        logger.error(f"Reflection Generation Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        yield sse_event("done", {"result": result, "from_cache": False})
 
-@app.get("/content/vocabulary")
-def get_vocabulary():
-    logger.info("Endpoint: get_vocabulary")
-    feelings_doc = db.collection('nvc_vocabulary').document('feelings').get()
-    needs_doc = db.collection('nvc_vocabulary').document('needs').get()
-    validation_doc = db.collection('config_metadata').document('validation_rules').get()
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# --- Vocabulary ---
+VOCABULARY_DOCUMENTS = {
+    "feelings": ('nvc_vocabulary', 'feelings'),
+    "needs": ('nvc_vocabulary', 'needs'),
+    "validation_rules": ('config_metadata', 'validation_rules'),
+}
+
+def _vocabulary_ref(name: str, locale: str = DEFAULT_LOCALE):
+    collection, document = VOCABULARY_DOCUMENTS[name]
+    return db.collection(collection).document(localized_document_id(document, locale))
+
+def fetch_vocabulary_parts(locale: str = DEFAULT_LOCALE) -> Dict[str, Dict[str, Any]]:
+    """
+    Reads all vocabulary documents of a locale in a single batched Firestore call.
+
+    A document the locale has no copy of yet is served in English, so a
+    language can go live before all of its content is translated.
+    """
+    refs = {(name, loc): _vocabulary_ref(name, loc)
+            for name in VOCABULARY_DOCUMENTS for loc in dict.fromkeys([locale, DEFAULT_LOCALE])}
+    keys_by_path = {ref.path: key for key, ref in refs.items()}
+    found = {}
+    for doc in db.get_all(list(refs.values())):
+        if doc.exists:
+            found[keys_by_path[doc.reference.path]] = doc.to_dict()
+    return {name: found.get((name, locale)) or found.get((name, DEFAULT_LOCALE)) or {} for name in VOCABULARY_DOCUMENTS}
+
+def _create_vocabulary_store() -> VocabularyStore:
+    store = VocabularyStore(fetch_vocabulary_parts)
+    # A new snapshot invalidates what was compiled from the previous one
+    store.on_change(lambda snapshot: _reset_compiled_vocabulary(snapshot))
+    return store
+
+vocabulary_store = process_state.register("vocabulary_store", _create_vocabulary_store)
+
+def watch_vocabulary(store: Optional[VocabularyStore] = None, locale: str = DEFAULT_LOCALE) -> list:
+    """Subscribes to every vocabulary document so edits land in the snapshot without a redeploy."""
+    watches = []
+    for name in VOCABULARY_DOCUMENTS:
+        def on_snapshot(docs, changes, read_time, name=name):
+            doc = docs[0] if docs else None
+            data = doc.to_dict() if doc is not None and doc.exists else None
+            if data is None and locale != DEFAULT_LOCALE:
+                # Untranslated parts fall back to the English copy, as in fetch_vocabulary_parts
+                english = vocabulary_store.peek()
+                data = english.data[name] if english is not None else None
+            (store or vocabulary_store).update_part(name, data)
+        watches.append(_vocabulary_ref(name, locale).on_snapshot(on_snapshot))
+    return watches
+
+# Listeners of the locales loaded since startup, closed on shutdown with the English ones
+locale_watches: List[Any] = []
+
+def _create_locale_store(locale: str) -> VocabularyStore:
+    store = VocabularyStore(lambda: fetch_vocabulary_parts(locale))
+    # Loaded before subscribing, so a listener never publishes a snapshot with only some parts
+    store.refresh()
+    if VOCABULARY_LISTENER:
+        locale_watches.extend(watch_vocabulary(store, locale))
+    return store
+
+def _compile_safety_matcher(snapshot) -> SafetyMatcher:
+    matcher = SafetyMatcher.from_rules(snapshot.data["validation_rules"])
+    logger.info(f"Safety matcher compiled with {matcher.rule_count} rules")
+    return matcher
+
+# English stays in the globals below, loaded at startup; other locales go through the registry
+locale_registry = process_state.register(
+    "locale_registry",
+    lambda: LocaleRegistry(_create_locale_store, _compile_safety_matcher, max_compiled=LOCALE_MATCHERS_MAX),
+)
+
+def vocabulary_store_for(locale: str) -> VocabularyStore:
+    return vocabulary_store if locale == DEFAULT_LOCALE else locale_registry.store(locale)
+
+# --- Safety ---
+SAFETY_BATCH_MAX_TEXTS = 100
+
+_safety_matcher: Optional[SafetyMatcher] = process_state.register("_safety_matcher", lambda: None)
+
+def get_safety_matcher(locale: str = DEFAULT_LOCALE) -> SafetyMatcher:
+    """Compiles the locale's current validation rules into a single matcher on first use."""
+    global _safety_matcher
+    if locale != DEFAULT_LOCALE:
+        return locale_registry.compiled(locale)
+    if _safety_matcher is None:
+        _safety_matcher = _compile_safety_matcher(vocabulary_store.get())
+    return _safety_matcher
+
+def get_loaded_safety_matcher() -> Optional[SafetyMatcher]:
+    """Like get_safety_matcher, but returns None instead of blocking on a first vocabulary load."""
+    if _safety_matcher is None and vocabulary_store.peek() is None:
+        return None
+    return get_safety_matcher()
+
+_suggester: Optional[VocabularySuggester] = process_state.register("_suggester", lambda: None)
+
+def get_loaded_suggester() -> Optional[VocabularySuggester]:
+    """The offline feelings/needs suggester for the current vocabulary; None until the vocabulary is loaded."""
+    global _suggester
+    if _suggester is None:
+        snapshot = vocabulary_store.peek()
+        if snapshot is None:
+            return None
+        _suggester = build_suggester(snapshot.data)
+    return _suggester
+
+def _reset_compiled_vocabulary(snapshot):
+    global _safety_matcher, _suggester
+    _safety_matcher = None
+    _suggester = None
+
+def check_safety(matcher: SafetyMatcher, text: str) -> SafetyResponse:
+    matches = matcher.find(text)
+    masked = mask_spans(text, matches)
+    censored = profanity_filter.censor(masked)
+    categories = sorted({m.category for m in matches})
+    if censored != masked:
+        # better_profanity's list is broader than ours; count anything it caught on top
+        categories.append(CATEGORY_PROFANITY)
+    for category in categories:
+        SAFETY_FLAGS.inc(category=category)
+    return SafetyResponse(
+        is_safe=not BLOCKING_CATEGORIES.intersection(categories),
+        censored_text=censored,
+        flagged=bool(categories),
+        categories=categories,
+        matches=[SafetyMatchResult(**m._asdict()) for m in matches],
+    )
+
+@app.post("/analyze/safety", response_model=SafetyResponse)
+def analyze_safety(req: SafetyRequest):
+    return check_safety(get_safety_matcher(resolve_locale(req.locale)), req.text)
+
+@app.post("/analyze/safety/batch", response_model=SafetyBatchResponse)
+def analyze_safety_batch(req: SafetyBatchRequest):
+    if len(req.texts) > SAFETY_BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=422, detail=f"At most {SAFETY_BATCH_MAX_TEXTS} texts per batch")
+    matcher = get_safety_matcher(resolve_locale(req.locale))
+    return SafetyBatchResponse(results=[check_safety(matcher, text) for text in req.texts])
+
+@app.post("/entitlements/refresh")
+async def refresh_entitlement(uid: str = Depends(verify_firebase_token)):
+    """Called by the client after redeeming a gift code so the new premium_until is seen immediately."""
+    invalidate_entitlement(uid)
+    return {"premium_until": await get_premium_until(uid)}
+
+# --- Sessions ---
+# The session state machine runs here rather than in the clients: each event is
+# validated against the current session and applied in one transaction, so two
+# phones acting at once can't both win, and a repeated event writes nothing.
+# The clients keep listening to `sessions/{id}` for the resulting state.
+
+session_store = process_state.register("session_store", lambda: build_session_store(SESSION_STORE, lambda: db))
+# session ID -> session_view() of the latest state this instance committed or read
+session_cache = process_state.register(
+    "session_cache", lambda: TTLCache(maxsize=SESSION_CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS))
+session_locks = process_state.register("session_locks", KeyedLocks)
+# Picks who speaks first in a shared session
+choose_first_speaker = random.choice
+
+def _session_error(e: TransitionError, session_id: str) -> HTTPException:
+    view = session_cache.get(session_id)
+    detail = {"message": e.message, "version": view["version"] if view else None} if e.status_code == 409 else e.message
+    return HTTPException(status_code=e.status_code, detail=detail)
+
+def _session_response(session_id: str, view: Dict[str, Any]) -> SessionStateResponse:
+    return SessionStateResponse(session_id=session_id, **view)
+
+@app.post("/sessions", response_model=SessionStateResponse, status_code=status.HTTP_201_CREATED)
+async def create_session(req: SessionCreateRequest, uid: str = Depends(verify_firebase_token)):
+    """Creates a session hosted by the caller. Shared sessions get a 6-digit code the partner joins with."""
+    session = new_session(uid, req.mode)
+    for _ in range(5):
+        if req.mode == SOLO:
+            session_id = f"solo_{uid}_{int(time.time() * 1000)}"
+        else:
+            session_id = str(100000 + secrets.randbelow(900000))
+        if await asyncio.to_thread(session_store.create, session_id, session):
+            view = session_view((session, {uid: {"status": "joined"}}))
+            session_cache.set(session_id, view)
+            logger.info(f"Endpoint: create-session | User: {uid} | Mode: {req.mode}")
+            return _session_response(session_id, view)
+    raise HTTPException(status_code=503, detail="Could not allocate a session code, please retry")
+
+@app.get("/sessions/{session_id}", response_model=SessionStateResponse)
+async def get_session(session_id: str, uid: str = Depends(verify_firebase_token)):
+    snapshot = await asyncio.to_thread(session_store.get, session_id)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+    view = session_view(snapshot)
+    session_cache.set(session_id, view)
+    if uid not in view["participants"]:
+        raise HTTPException(status_code=403, detail="Not a participant of this session")
+    return _session_response(session_id, view)
+
+@app.post("/sessions/{session_id}/events", response_model=SessionStateResponse)
+async def session_event(session_id: str, req: SessionEventRequest, uid: str = Depends(verify_firebase_token)):
+    """
+    Applies one state machine event (join, regulation_complete, listener_ready,
+    send_message, confirm_reflection, next_turn, finish) for the caller and
+    returns the resulting state. Repeating an event that already took effect
+    returns the current state without writing.
+    """
+    message = req.message.model_dump() if req.message else None
+    cached = session_cache.get(session_id)
+    # The state read by the transaction's last attempt, and whether it had anything to write
+    latest: Dict[str, Any] = {}
+
+    def plan(session, states):
+        latest["view"] = session_view((session, states)) if session is not None else None
+        if req.version is not None and session is not None and req.version < session.get("version", 0):
+            raise TransitionError(409, "Session has changed, refresh and try again")
+        transition = plan_transition(session, states, uid, req.event, message, choose_first_speaker)
+        latest["noop"] = transition.is_noop
+        return transition
+
+    try:
+        # Events this instance can decide from its cached state never reach Firestore
+        if cached is not None and check_settled(cached, uid, req.event, req.version):
+            SESSION_TRANSITIONS.inc(event=req.event, outcome="noop")
+            return _session_response(session_id, cached)
+        # Events for one session run one at a time on this instance instead of contending in transactions
+        async with session_locks.hold(session_id):
+            view = session_view(await asyncio.to_thread(session_store.transact, session_id, plan))
+    except TransitionError as e:
+        if latest.get("view"):
+            session_cache.set(session_id, latest["view"])
+        elif "view" in latest:
+            session_cache.invalidate(session_id)
+        SESSION_TRANSITIONS.inc(event=req.event, outcome="rejected")
+        raise _session_error(e, session_id)
+
+    session_cache.set(session_id, view)
+    SESSION_TRANSITIONS.inc(event=req.event, outcome="noop" if latest["noop"] else "applied")
+    logger.info(f"Endpoint: session-event | User: {uid} | Event: {req.event} | Status: {view['status']}")
+    return _session_response(session_id, view)
+
+@app.get("/cache/stats")
+def get_cache_stats():
     return {
-        "feelings": feelings_doc.to_dict() if feelings_doc.exists else {},
-        "needs": needs_doc.to_dict() if needs_doc.exists else {},
-        "validation_rules": validation_doc.to_dict() if validation_doc.exists else {}
+        "l1": ai_cache.stats(),
+        "write_behind": cache_writer.stats(),
+        "backend": cache_backend.stats(),
+        "generation_pool": generation_pool.stats(),
+        "single_flight": ai_single_flight.stats(),
+        "shared": {"enabled": SHARED_CACHE_ENABLED, **shared_cache.stats()},
+        "fast_path": {"enabled": FAST_PATH_ENABLED, **neutrality_classifier.stats()},
+        "fallbacks": dict(fallback_count),
+        "auth_tokens": {**token_cache.stats(), "revoked_rejections": revoked_token_rejections},
+        "entitlements": entitlement_cache.stats(),
+        "rate_limits": {
+            "users": rate_limiter.stats(),
+            "gemini": {"sync": RATE_LIMIT_SYNC, **gemini_limit.stats()} if gemini_limit else None,
+        },
+        "circuit_breaker": gemini_breaker.stats(),
+        "prefetch": {"enabled": PREFETCH_ENABLED, **prefetcher.stats()},
+        "logging": {"format": LOG_FORMAT, **log_pipeline.stats()},
+        "sessions": {"store": session_store.name, **session_cache.stats(), "locked": len(session_locks),
+                     "contended": session_locks.contended},
+        "locales": {"supported": list(SUPPORTED_LOCALES), **locale_registry.stats()},
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# --- Warm-up ---
+_warmup_lock = asyncio.Lock()
+_warmup_report: Optional[Dict[str, Any]] = None
+
+async def warm_up() -> Dict[str, Any]:
+    """
+    Creates every lazy client and opens the Firestore and Vertex AI channels.
+
+    Runs once per instance; later calls return the first report. Failures are
+    reported per step instead of raised, since the app still works cold.
+    """
+    global _warmup_report
+    async with _warmup_lock:
+        if _warmup_report is not None:
+            return _warmup_report
+        steps: Dict[str, str] = {}
+
+        async def step(name: str, call: Callable[[], Any]):
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(call)
+                steps[name] = "ok"
+                startup_timer.record(f"warmup_{name}", started)
+            except Exception as e:
+                steps[name] = f"error: {e}"
+                logger.warning(f"Warm-up step {name} failed: {e}")
+
+        await step("profanity", profanity_filter.get)
+        # Without a bundle, loading the vocabulary is a real Firestore read, so it also opens the gRPC channel
+        await step("firestore", vocabulary_store.get)
+        await step("vocabulary", lambda: (get_safety_matcher(), get_loaded_suggester()))
+        # count_tokens is a free Vertex call; it builds the prediction client and connects it
+        await step("vertex_ai", lambda: model.count_tokens("warmup"))
+        _warmup_report = {"steps": steps, **startup_timer.report()}
+        logger.info(f"Warm-up finished: {steps}")
+        return _warmup_report
+
+if WARMUP_ROUTE_ENABLED:
+    @app.get("/warmup")
+    async def warmup():
+        return await warm_up()
+
+@app.get("/content/vocabulary")
+def get_vocabulary(request: Request, locale: Optional[str] = None):
+    locale = resolve_locale(locale)
+    logger.info(f"Endpoint: get_vocabulary | Locale: {locale}")
+    snapshot = vocabulary_store_for(locale).get()
+    use_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "ETag": snapshot.gzip_etag if use_gzip else snapshot.etag,
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
     }
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+startup_timer.record("app_setup", _setup_started)
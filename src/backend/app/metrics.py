@@ -0,0 +1,260 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds: fine-grained below 100 ms for cache/auth, coarse up to 30 s for Gemini
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A settable gauge, or a callback gauge when `collect` is given (evaluated at scrape time)."""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 collect: Optional[Callable[[], Iterable[Tuple[Dict[str, str], float]]]] = None):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._collect = collect
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        values = dict(self._values)
+        if self._collect is not None:
+            for labels, value in self._collect():
+                values[self._key(labels)] = value
+        lines = self.header()
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_number(value)}")
+        return lines
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.total = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram in the Prometheus format.
+
+    `quantile()` estimates p50/p95/p99 by linear interpolation inside the
+    bucket that contains the rank, which is what `histogram_quantile` does
+    server-side; the estimates are also exported as `<name>_quantile`.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            series.counts[index] += 1
+            series.total += value
+            series.count += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(self._key(labels))
+        return series.count if series else 0
+
+    def quantile(self, q: float, **labels: str) -> Optional[float]:
+        series = self._series.get(self._key(labels))
+        return self._quantile(series, q) if series else None
+
+    def _quantile(self, series: _HistogramSeries, q: float) -> Optional[float]:
+        if not series.count:
+            return None
+        rank = q * series.count
+        cumulative = 0
+        for i, count in enumerate(series.counts):
+            if cumulative + count >= rank and count:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-2]
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        quantile_lines = []
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series.counts):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_number(series.total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {series.count}")
+            for q in QUANTILES:
+                estimate = self._quantile(series, q)
+                quantile = f'quantile="{q}"'
+                quantile_lines.append(
+                    f"{self.name}_quantile{_format_labels(self.label_names, key, quantile)} {_format_number(estimate)}"
+                )
+        if quantile_lines:
+            lines.append(f"# HELP {self.name}_quantile Estimated quantiles of {self.name}")
+            lines.append(f"# TYPE {self.name}_quantile gauge")
+            lines.extend(quantile_lines)
+        return lines
+
+
+class Registry:
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: List[_Metric] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self.prefix + name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = (), collect=None) -> Gauge:
+        return self._register(Gauge(self.prefix + name, help_text, labels, collect))
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency per route template and the in-flight gauge.
+
+    Implemented at the ASGI level (not BaseHTTPMiddleware) so it adds a couple
+    of dict lookups per request and leaves streaming responses untouched.
+    """
+
+    def __init__(self, app, duration: Histogram, in_flight: Gauge, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.duration = duration
+        self.in_flight = in_flight
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        self.in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.duration.observe(
+                time.perf_counter() - started,
+                route=route, method=scope.get("method", ""), status=str(status_code),
+            )
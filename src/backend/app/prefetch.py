@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, NamedTuple, Optional, Set, Tuple
+
+from app.locales import DEFAULT_LOCALE
+
+logger = logging.getLogger("peacekeeper")
+
+# Outcomes reported by a prefetch runner
+COMPUTED = "computed"
+ALREADY_CACHED = "already_cached"
+SKIPPED = "skipped"
+
+
+class PrefetchJob(NamedTuple):
+    task: str
+    user_id: str
+    text: Optional[str]
+    context: Dict[str, Any]
+    # Cache key the result will be stored under, used to dedupe and to match later hits
+    key: str
+    locale: str = DEFAULT_LOCALE
+
+
+class Prefetcher:
+    """
+    Computes AI results ahead of the request that will ask for them.
+
+    Jobs wait in a bounded FIFO queue (the oldest is dropped when it is full)
+    and are worked off by at most `workers` coroutines at a time; `drain()`
+    starts workers on the current event loop and returns once the queue is
+    empty. `run(job)` produces the result and returns one of COMPUTED,
+    ALREADY_CACHED or SKIPPED.
+
+    Computed keys are remembered for `ttl` seconds (the cache TTL). A request
+    that hits one of them calls `claim()` and the prefetch counts as used;
+    one that is never claimed before expiring counts as wasted.
+    """
+
+    def __init__(self, run: Callable[[PrefetchJob], Awaitable[str]], workers: int = 2, max_queue: int = 100,
+                 ttl: float = 600, on_outcome: Optional[Callable[[str, str], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if workers < 1 or max_queue < 1:
+            raise ValueError("workers and max_queue must be >= 1")
+        self._run = run
+        self.workers = workers
+        self.max_queue = max_queue
+        self.ttl = ttl
+        self._on_outcome = on_outcome
+        self._clock = clock
+        self._queue: Deque[PrefetchJob] = deque()
+        self._queued: Set[str] = set()
+        # key -> (expires_at, task), in expiry order since every entry has the same TTL
+        self._computed: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        # Jobs being computed right now, and those a request already joined
+        self._running: Dict[str, str] = {}
+        self._claimed: Set[str] = set()
+        self._lock = threading.Lock()
+        self._active = 0
+        self.counts: Dict[str, int] = {}
+
+    def _count(self, task: str, outcome: str) -> None:
+        self.counts[outcome] = self.counts.get(outcome, 0) + 1
+        if self._on_outcome:
+            self._on_outcome(task, outcome)
+
+    def _expire(self, now: float) -> None:
+        while self._computed:
+            key, (expires_at, task) = next(iter(self._computed.items()))
+            if expires_at > now:
+                break
+            del self._computed[key]
+            self._count(task, "wasted")
+
+    def submit(self, job: PrefetchJob) -> bool:
+        """Queues a job unless the same result is already queued or was recently computed."""
+        with self._lock:
+            self._expire(self._clock())
+            if job.key in self._queued or job.key in self._computed or job.key in self._running:
+                return False
+            if len(self._queue) >= self.max_queue:
+                dropped = self._queue.popleft()
+                self._queued.discard(dropped.key)
+                self._count(dropped.task, "dropped")
+            self._queue.append(job)
+            self._queued.add(job.key)
+            self._count(job.task, "queued")
+            return True
+
+    def claim(self, key: str) -> bool:
+        """
+        Marks a prefetched result as used by a real request; False if `key` wasn't prefetched.
+
+        A job still running counts too: the request joins the same in-flight call.
+        """
+        with self._lock:
+            self._expire(self._clock())
+            if key in self._running and key not in self._claimed:
+                self._claimed.add(key)
+                self._count(self._running[key], "used")
+                return True
+            entry = self._computed.pop(key, None)
+            if entry is None:
+                return False
+            self._count(entry[1], "used")
+            return True
+
+    async def drain(self) -> None:
+        """Works through the queue with at most `workers` jobs running at once across all callers."""
+        workers = []
+        with self._lock:
+            while self._active < self.workers and len(self._queue) > self._active:
+                self._active += 1
+                workers.append(asyncio.ensure_future(self._work()))
+        if workers:
+            await asyncio.gather(*workers)
+
+    def _next(self) -> Optional[PrefetchJob]:
+        with self._lock:
+            if not self._queue:
+                return None
+            job = self._queue.popleft()
+            self._queued.discard(job.key)
+            self._running[job.key] = job.task
+            return job
+
+    async def _work(self) -> None:
+        try:
+            while True:
+                job = self._next()
+                if job is None:
+                    return
+                try:
+                    outcome = await self._run(job)
+                except Exception as e:
+                    logger.debug(f"Prefetch of {job.task} failed: {e}")
+                    outcome = "failed"
+                with self._lock:
+                    del self._running[job.key]
+                    claimed = job.key in self._claimed
+                    self._claimed.discard(job.key)
+                    if outcome == COMPUTED and not claimed:
+                        self._computed[job.key] = (self._clock() + self.ttl, job.task)
+                    self._count(job.task, outcome)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(self._clock())
+            used, wasted = self.counts.get("used", 0), self.counts.get("wasted", 0)
+            return {
+                "workers": self.workers,
+                "active": self._active,
+                "queued": len(self._queue),
+                "pending_use": len(self._computed),
+                "hit_rate": round(used / (used + wasted), 3) if used + wasted else None,
+                **self.counts,
+            }
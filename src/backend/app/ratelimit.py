@@ -0,0 +1,343 @@
+import abc
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("peacekeeper")
+
+# (requests per minute, burst)
+Limit = Tuple[float, float]
+
+
+class TokenBucket:
+    """
+    Classic token bucket: holds up to `burst` tokens and refills at `rate` per second.
+
+    `acquire` never blocks; it returns 0 when the tokens were taken, otherwise
+    how many seconds until enough will have refilled (and takes nothing).
+    """
+
+    blocking = False
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate must be > 0 and burst >= 1")
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, cost: float = 1) -> float:
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= cost:
+                self._tokens -= cost
+                return 0.0
+            return (min(cost, self.burst) - self._tokens) / self.rate
+
+    def release(self, cost: float = 1) -> None:
+        """Gives back tokens taken by `acquire` for work that didn't go ahead."""
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + cost)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill(self._clock())
+            return {"scope": "instance", "rate_per_second": self.rate, "burst": self.burst,
+                    "tokens": round(self._tokens, 2)}
+
+
+class RateLimiter:
+    """
+    Per-user, per-endpoint token buckets kept in process.
+
+    Every (uid, endpoint) pair gets its own bucket sized by the endpoint's
+    entry in `limits`, or `default` for endpoints without one. At most
+    `max_keys` buckets are kept; the least recently used is dropped first,
+    which only resets that user's allowance. A `default` of None disables
+    limiting for endpoints not listed.
+    """
+
+    def __init__(self, default: Optional[Limit], limits: Optional[Dict[str, Limit]] = None,
+                 max_keys: int = 10000, clock: Callable[[], float] = time.monotonic):
+        if max_keys < 1:
+            raise ValueError("max_keys must be >= 1")
+        self.default = default
+        self.limits = dict(limits or {})
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected: Dict[str, int] = {}
+
+    def _limit(self, endpoint: str) -> Optional[Limit]:
+        return self.limits.get(endpoint, self.default)
+
+    def _bucket(self, uid: str, endpoint: str, limit: Limit) -> TokenBucket:
+        key = (uid, endpoint)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                per_minute, burst = limit
+                bucket = self._buckets[key] = TokenBucket(per_minute / 60.0, burst, self._clock)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket
+
+    def check(self, uid: str, endpoint: str, cost: float = 1) -> float:
+        """Takes `cost` tokens from the user's bucket; returns 0 if allowed, else seconds to wait."""
+        limit = self._limit(endpoint)
+        if limit is None:
+            return 0.0
+        retry_after = self._bucket(uid, endpoint, limit).acquire(cost)
+        with self._lock:
+            if retry_after:
+                self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+            else:
+                self.allowed += 1
+        return retry_after
+
+    def check_all(self, uid: str, costs: Dict[str, float]) -> Tuple[Optional[str], float]:
+        """
+        Takes tokens from several of the user's buckets, all or none.
+
+        Returns (None, 0) if allowed, else the endpoint that refused and the
+        seconds to wait; tokens already taken from the others are given back.
+        """
+        taken = []
+        for endpoint, cost in costs.items():
+            retry_after = self.check(uid, endpoint, cost)
+            if retry_after:
+                for done, done_cost in taken:
+                    self._bucket(uid, done, self._limit(done)).release(done_cost)
+                return endpoint, retry_after
+            if self._limit(endpoint) is not None:
+                taken.append((endpoint, cost))
+        return None, 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "default_per_minute": self.default[0] if self.default else None,
+                "default_burst": self.default[1] if self.default else None,
+                "endpoints": {name: {"per_minute": r, "burst": b} for name, (r, b) in sorted(self.limits.items())},
+                "buckets": len(self._buckets),
+                "allowed": self.allowed,
+                "rejected": dict(self.rejected),
+            }
+
+
+def parse_limits(spec: str) -> Dict[str, Limit]:
+    """Parses "neutralize=120/30,reflection=20/5" (requests per minute / burst) into a limits mapping."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            name, value = item.split("=", 1)
+            per_minute, _, burst = value.partition("/")
+            limits[name.strip()] = (float(per_minute), float(burst or per_minute))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit {item!r}, expected name=per_minute/burst")
+    return limits
+
+
+# --- Shared limits ---
+
+class WindowCounter(abc.ABC):
+    """
+    A counter shared between instances, bucketed into fixed time windows.
+
+    `add` increments the count for `key` and returns the new total. Windows
+    are named by the caller, so expired ones are simply never read again.
+    Methods are blocking.
+    """
+
+    name = ""
+
+    @abc.abstractmethod
+    def add(self, key: str, amount: int, expires_at: float) -> int:
+        """Adds `amount` to `key`, kept until at least `expires_at`, and returns the new total."""
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteWindowCounter(WindowCounter):
+    """Counters in a local SQLite file, shared by every worker process on the instance."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, clock: Callable[[], float] = time.time):
+        self.path = path
+        self._clock = clock
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_windows ("
+            "key TEXT PRIMARY KEY, count INTEGER NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def add(self, key: str, amount: int, expires_at: float) -> int:
+        conn = self._connection()
+        count = conn.execute(
+            "INSERT INTO rate_windows (key, count, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET count = count + excluded.count RETURNING count",
+            (key, amount, expires_at),
+        ).fetchone()[0]
+        conn.execute("DELETE FROM rate_windows WHERE expires_at < ?", (self._clock(),))
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+class FirestoreWindowCounter(WindowCounter):
+    """
+    Counters in the `rate_limits` collection, shared by every instance.
+
+    Each add is a read-modify-write transaction on the window's document, so
+    callers should add in chunks (see SharedWindowLimit) rather than per
+    request. Documents carry `expiresAt` for the expired-data sweeper.
+    """
+
+    name = "firestore"
+
+    def __init__(self, client: Callable[[], Any], collection: str = "rate_limits"):
+        self._client = client
+        self.collection = collection
+
+    def add(self, key: str, amount: int, expires_at: float) -> int:
+        from google.cloud import firestore
+
+        client = self._client()
+        ref = client.collection(self.collection).document(key)
+
+        @firestore.transactional
+        def increment(transaction) -> int:
+            snapshot = ref.get(transaction=transaction)
+            count = (snapshot.get("count") if snapshot.exists else 0) + amount
+            transaction.set(ref, {"count": count, "expiresAt": expires_at})
+            return count
+
+        return increment(client.transaction())
+
+
+class SharedWindowLimit:
+    """
+    A limit of `limit` requests per `window` seconds, enforced across instances.
+
+    Rather than touching the shared counter per request, each instance leases
+    `lease` requests at a time and spends them locally, so the counter sees
+    one write per lease. Leases are granted only up to the limit; once the
+    window is used up every instance rejects until the next one starts. As
+    with any fixed window, up to twice the limit can pass around a window
+    boundary, so set the limit with some headroom below the real quota.
+    """
+
+    blocking = True
+
+    def __init__(self, counter: WindowCounter, key: str, limit: int, window: float = 60.0, lease: int = 10,
+                 clock: Callable[[], float] = time.time):
+        if limit < 1 or window <= 0 or lease < 1:
+            raise ValueError("limit and lease must be >= 1 and window > 0")
+        self.counter = counter
+        self.key = key
+        self.limit = limit
+        self.window = window
+        self.lease = min(lease, limit)
+        self._clock = clock
+        self._window_index: Optional[int] = None
+        self._available = 0
+        self._exhausted = False
+        self._lock = threading.Lock()
+        self.leases = 0
+        self.counter_errors = 0
+
+    def acquire(self, cost: float = 1) -> float:
+        cost = math.ceil(cost)
+        with self._lock:
+            now = self._clock()
+            index = int(now // self.window)
+            window_ends = (index + 1) * self.window
+            if index != self._window_index:
+                self._window_index, self._available, self._exhausted = index, 0, False
+            while self._available < cost:
+                if self._exhausted:
+                    return window_ends - now
+                self._lease(index, window_ends)
+            self._available -= cost
+            return 0.0
+
+    def _lease(self, index: int, window_ends: float) -> None:
+        try:
+            total = self.counter.add(f"{self.key}-{index}", self.lease, window_ends + self.window)
+        except Exception as e:
+            # Fail open: losing the shared counter must not take the AI endpoints down with it
+            self.counter_errors += 1
+            logger.warning(f"Shared rate limit counter failed, granting a local lease: {e}")
+            total = self.lease
+        self.leases += 1
+        granted = min(self.lease, self.limit - (total - self.lease))
+        if granted < self.lease:
+            self._exhausted = True
+        self._available += max(0, granted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"scope": self.counter.name, "limit": self.limit, "window_seconds": self.window,
+                    "lease": self.lease, "available": self._available, "exhausted": self._exhausted,
+                    "leases": self.leases, "counter_errors": self.counter_errors}
+
+
+RATE_LIMIT_SYNC_MODES = ("none", "sqlite", "firestore")
+
+
+def build_global_limit(per_minute: float, burst: float, sync: str, firestore_client: Callable[[], Any],
+                       sqlite_path: str, lease: int = 10):
+    """
+    The limit on Gemini calls across the deployment: a local TokenBucket when
+    `sync` is "none", otherwise a SharedWindowLimit over the selected counter.
+    Returns None when `per_minute` is 0 (no global limit).
+    """
+    sync = sync.lower()
+    if not per_minute:
+        return None
+    if sync == "none":
+        return TokenBucket(per_minute / 60.0, burst)
+    if sync == "sqlite":
+        counter = SQLiteWindowCounter(sqlite_path)
+    elif sync == "firestore":
+        counter = FirestoreWindowCounter(firestore_client)
+    else:
+        raise ValueError(f"Unknown rate limit sync {sync!r}, expected one of {', '.join(RATE_LIMIT_SYNC_MODES)}")
+    return SharedWindowLimit(counter, "gemini", int(per_minute), window=60.0, lease=lease)
@@ -0,0 +1,183 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit {name} is open, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that is failing or too slow.
+
+    Outcomes of the last `window` calls are kept. Once at least `min_calls`
+    were seen, the circuit opens when the share of failures reaches
+    `failure_rate` or the share of calls slower than `slow_call_seconds`
+    reaches `slow_call_rate`. While open, `allow()` is False for
+    `open_seconds`; then up to `half_open_calls` probe calls are let through.
+    The circuit closes if they all succeed in time and reopens otherwise.
+    """
+
+    def __init__(self, name: str, window: int = 50, min_calls: int = 20, failure_rate: float = 0.5,
+                 slow_call_seconds: float = 8.0, slow_call_rate: float = 0.8, open_seconds: float = 30.0,
+                 half_open_calls: int = 3, clock: Callable[[], float] = time.monotonic):
+        if window < 1 or not 1 <= min_calls <= window or half_open_calls < 1:
+            raise ValueError("window >= min_calls >= 1 and half_open_calls >= 1 required")
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (succeeded, slow) per call
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._advance()
+            return self._state
+
+    def _advance(self) -> None:
+        now = self._clock()
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state, self._probes, self._probe_successes = HALF_OPEN, 0, 0
+            self._opened_at = now
+        elif self._state == HALF_OPEN and self._probes >= self.half_open_calls and now - self._opened_at >= self.open_seconds:
+            # Probes that never reported back (cancelled calls) are written off so the circuit can't get stuck
+            self._probes = self._probe_successes
+            self._opened_at = now
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._outcomes.clear()
+        self.opened += 1
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._state != OPEN:
+                return 0.0
+            return max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """True if a call may go ahead. In half-open state each True reserves one probe."""
+        with self._lock:
+            self._advance()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self) -> None:
+        """Like allow(), but raises CircuitOpenError when the call may not go ahead."""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after() or self.open_seconds)
+
+    def record(self, succeeded: bool, seconds: float) -> None:
+        slow = seconds >= self.slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if not succeeded or slow:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._state = CLOSED
+                return
+            if self._state == OPEN:
+                # A call started before the circuit opened; its outcome is already moot
+                return
+            self._outcomes.append((succeeded, slow))
+            calls = len(self._outcomes)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for ok, _ in self._outcomes if not ok)
+            slow_calls = sum(1 for _, is_slow in self._outcomes if is_slow)
+            if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+                self._open()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state, self._probes, self._probe_successes = CLOSED, 0, 0
+            self._outcomes.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._advance()
+            calls = len(self._outcomes)
+            return {
+                "state": self._state,
+                "calls": calls,
+                "failures": sum(1 for ok, _ in self._outcomes if not ok),
+                "slow_calls": sum(1 for _, slow in self._outcomes if slow),
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+async def hedge(call: Callable[[], Awaitable[Any]], delay: Optional[float]) -> Tuple[Any, int]:
+    """
+    Runs `call()`, and if it hasn't finished after `delay` seconds starts a
+    second `call()` alongside it. Returns the first successful result and the
+    index of the attempt that produced it (0 or 1); the other attempt is
+    cancelled. If both fail, the first attempt's error is raised (the other's
+    if the first was cancelled). With
+    `delay` None there is no second attempt.
+    """
+    attempts: List["asyncio.Future[Any]"] = [asyncio.ensure_future(call())]
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done:
+                attempts.append(asyncio.ensure_future(call()))
+        pending = set(attempts)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in attempts:
+                if attempt in done and not attempt.cancelled() and attempt.exception() is None:
+                    return attempt.result(), attempts.index(attempt)
+        for attempt in attempts:
+            if not attempt.cancelled():
+                raise attempt.exception()
+        raise asyncio.CancelledError()
+    finally:
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
+
+
+def parse_durations(spec: str) -> Dict[str, float]:
+    """Parses "reflection=15,neutralize=5" (seconds per name) into a mapping."""
+    durations = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        try:
+            name, value = item.split("=", 1)
+            durations[name.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Invalid duration {item!r}, expected name=seconds")
+    return durations
@@ -0,0 +1,358 @@
+import json
+import re
+import shutil
+import string
+import subprocess
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from app.safety import SafetyMatcher, scope_inline_flags
+
+ERROR = "error"
+WARNING = "warning"
+
+WORD_LISTS = ("violent_words", "pseudo_feelings")
+
+# Characters used to decide whether two repeated character classes can match the same text
+_PROBE_CHARS = string.printable + "éß ’"
+
+
+class RuleIssue(NamedTuple):
+    severity: str
+    field: str
+    rule: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.severity.upper():<8}{self.field}: {self.rule!r}: {self.message}"
+
+
+# --- Dart RegExp compatibility ---
+# The app's SafetyService strips a leading "(?i)" (turning it into caseSensitive: false)
+# and hands the rest to Dart's RegExp, which follows JavaScript syntax, not Python's.
+
+def dart_pattern(pattern: str) -> str:
+    """The pattern as the app compiles it, mirroring SafetyService.validateLocalRules."""
+    return pattern[4:] if pattern.startswith("(?i)") else pattern
+
+
+def dart_incompatibilities(pattern: str) -> List[str]:
+    """Python-only syntax in a blame pattern that Dart rejects or reads differently."""
+    body = dart_pattern(pattern)
+    problems = []
+    in_class = False
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if char == "\\":
+            escaped = body[i + 1:i + 2]
+            if not in_class and escaped in ("A", "Z"):
+                problems.append(f"\\{escaped} is a literal '{escaped}' in Dart; use {'^' if escaped == 'A' else '$'}")
+            i += 2
+            continue
+        if in_class:
+            if body.startswith("[:", i):
+                problems.append("POSIX classes like [:alpha:] are not supported in Dart")
+            elif char == "]":
+                in_class = False
+            i += 1
+            continue
+        if char == "[":
+            in_class = True
+            following = body[i + 1:i + 3]
+            if following.startswith("]") or following == "^]":
+                problems.append("a leading ']' in a class is literal in Python but closes an empty class in Dart")
+            i += 1
+            continue
+        if body.startswith("(?", i):
+            rest = body[i + 2:]
+            if rest.startswith(("P<", "P=", "P>")):
+                problems.append("Python named groups (?P...) are not supported in Dart; use (?<name>...)")
+            elif rest.startswith("#"):
+                problems.append("(?#...) comments are not supported in Dart")
+            elif rest.startswith(">"):
+                problems.append("atomic groups (?>...) are not supported in Dart")
+            elif rest.startswith("("):
+                problems.append("conditional groups (?(...)...) are not supported in Dart")
+            elif rest[:1] and rest[0] in "aiLmsux-":
+                problems.append("inline flags are only understood as a leading (?i) by the app")
+        elif char in "*+?}" and body[i + 1:i + 2] == "+" and not body.startswith("(?", i - 1):
+            problems.append("possessive quantifiers (*+, ++, ?+) are not supported in Dart")
+        elif char == "{" and re.match(r"\{,\d+\}", body[i:]):
+            problems.append("{,n} is a quantifier in Python but literal text in Dart; use {0,n}")
+        i += 1
+    return problems
+
+
+def node_regexp_errors(patterns: List[str], node: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """
+    Compiles the patterns the way the app does with Node's RegExp (the same
+    irregexp engine as the Dart VM), returning {pattern: error}. None when
+    Node isn't available.
+    """
+    node = node or shutil.which("node")
+    if not node:
+        return None
+    script = (
+        "const errors = {};"
+        "for (const p of JSON.parse(require('fs').readFileSync(0, 'utf8'))) {"
+        "  const insensitive = p.startsWith('(?i)');"
+        "  try { new RegExp(insensitive ? p.slice(4) : p, insensitive ? 'i' : ''); }"
+        "  catch (e) { errors[p] = e.message; }"
+        "}"
+        "process.stdout.write(JSON.stringify(errors));"
+    )
+    try:
+        result = subprocess.run([node, "-e", script], input=json.dumps(patterns), capture_output=True,
+                                text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout or "{}")
+
+
+# --- Backtracking ---
+# A small reader for the pattern source: just enough structure (groups,
+# alternatives, quantifiers) to spot the shapes that backtrack. The pattern
+# has already compiled, so the reader can assume it is well formed.
+
+_QUANTIFIER = re.compile(r"(?:[*+?]|\{(\d*)(,?)(\d*)\})[?+]?")
+_ZERO_WIDTH_ESCAPES = "AbBZ"
+
+
+class _Atom(NamedTuple):
+    text: str
+    branches: List[List["_Atom"]]  # alternatives inside a group, empty for anything else
+    zero_width: bool
+    quantified: bool
+    unbounded: bool
+
+
+def _read_escape(body: str, i: int) -> int:
+    """End of the escape starting at body[i] (a backslash)."""
+    kind = body[i + 1:i + 2]
+    if kind == "x":
+        return i + 4
+    if kind == "u":
+        return i + 6
+    if kind == "U":
+        return i + 10
+    if kind == "N" and body.startswith("{", i + 2):
+        return body.index("}", i) + 1
+    if kind.isdigit():
+        return re.match(r"\\\d{1,3}", body[i:]).end() + i
+    return i + 2
+
+
+def _read_class(body: str, i: int) -> int:
+    """End of the character class starting at body[i] (a '[')."""
+    i += 1
+    if body.startswith("^", i):
+        i += 1
+    if body.startswith("]", i):
+        i += 1
+    while body[i] != "]":
+        i = _read_escape(body, i) if body[i] == "\\" else i + 1
+    return i + 1
+
+
+def _read_group_prefix(body: str, i: int) -> Tuple[int, bool]:
+    """Skips a group's "(?..." prefix; returns (end, whether the group is a lookaround)."""
+    if not body.startswith("(?", i):
+        return i + 1, False
+    rest = body[i + 2:]
+    for prefix in ("<=", "<!", "=", "!"):
+        if rest.startswith(prefix):
+            return i + 2 + len(prefix), True
+    if rest.startswith("("):
+        return body.index(")", i) + 1, False  # conditional group: skip its condition
+    if rest.startswith(("P<", "<")):
+        return body.index(">", i) + 1, False
+    return body.index(":", i) + 1, False
+
+
+def _read_sequence(body: str, i: int, verbose: bool) -> Tuple[List[List[_Atom]], int]:
+    """Reads alternatives up to the closing ')' or the end of the pattern."""
+    branches: List[List[_Atom]] = [[]]
+    while i < len(body) and body[i] != ")":
+        char = body[i]
+        start = i
+        children: List[List[_Atom]] = []
+        zero_width = False
+        if char == "|":
+            branches.append([])
+            i += 1
+            continue
+        if verbose and char.isspace():
+            i += 1
+            continue
+        if verbose and char == "#":
+            newline = body.find("\n", i)
+            i = len(body) if newline < 0 else newline + 1
+            continue
+        if body.startswith("(?#", i):
+            i = body.index(")", i) + 1
+            continue
+        if re.match(r"\(\?[aiLmsux-]+\)", body[i:]):
+            # A global inline flag: it matches nothing and separates nothing
+            i = body.index(")", i) + 1
+            continue
+        if char == "(":
+            if body.startswith("(?P=", i):
+                i = body.index(")", i) + 1  # a named backreference, not a group
+            else:
+                i, zero_width = _read_group_prefix(body, i)
+                children, i = _read_sequence(body, i, verbose)
+                i += 1
+        elif char == "[":
+            i = _read_class(body, i)
+        elif char == "\\":
+            i = _read_escape(body, i)
+            zero_width = body[start + 1] in _ZERO_WIDTH_ESCAPES
+        else:
+            zero_width = char in "^$"
+            i += 1
+        text = body[start:i]
+        quantifier = _QUANTIFIER.match(body, i)
+        if quantifier and quantifier.group(0)[0] == "{" and not (quantifier.group(1) or quantifier.group(3)):
+            quantifier = None  # "{}" and "{,}" are literal text
+        unbounded = False
+        if quantifier:
+            i = quantifier.end()
+            first = quantifier.group(0)[0]
+            unbounded = first in "*+" or (first == "{" and bool(quantifier.group(2)) and not quantifier.group(3))
+        branches[-1].append(_Atom(text, children, zero_width, quantifier is not None, unbounded))
+    return branches, i
+
+
+def _atom_chars(atom: _Atom, flags: int) -> Optional[Set[str]]:
+    """Probe characters a single-character atom can match, or None if it isn't one."""
+    if atom.text.startswith("(") or atom.zero_width or re.match(r"\\\d", atom.text):
+        return None
+    compiled = re.compile(atom.text, flags)
+    return {c for c in _PROBE_CHARS if compiled.fullmatch(c)}
+
+
+def _has_unbounded_repeat(branches: List[List[_Atom]]) -> bool:
+    return any(atom.unbounded or _has_unbounded_repeat(atom.branches) for items in branches for atom in items)
+
+
+def _walk(branches: List[List[_Atom]], flags: int, risks: List[str]) -> None:
+    for items in branches:
+        previous: Optional[Set[str]] = None
+        for atom in items:
+            _walk(atom.branches, flags, risks)
+            if atom.quantified:
+                if atom.unbounded and _has_unbounded_repeat(atom.branches):
+                    risks.append("nested unbounded quantifiers (like (a+)+) can backtrack exponentially")
+                chars = _atom_chars(atom, flags) if atom.unbounded else None
+                if chars is not None and previous is not None and chars & previous:
+                    risks.append("adjacent unbounded quantifiers over overlapping characters (like \\s+\\s*) "
+                                 "backtrack polynomially on long runs")
+                previous = chars
+            elif not atom.zero_width or atom.branches:
+                # Anchors don't separate two repeats; anything else, lookarounds included, does
+                previous = None
+
+
+def backtracking_risks(pattern: str) -> List[str]:
+    """Static red flags for catastrophic backtracking. Heuristic: confirm with the benchmark."""
+    try:
+        flags = re.compile(pattern).flags
+    except re.error:
+        return []
+    branches, _ = _read_sequence(pattern, 0, bool(flags & re.VERBOSE))
+    risks: List[str] = []
+    _walk(branches, flags, risks)
+    return sorted(set(risks))
+
+
+# --- Word lists ---
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def word_entry_issues(field: str, word: str) -> List[RuleIssue]:
+    """
+    Problems with one word-list entry. The server matches entries as
+    \\b<words joined by \\s+>\\b (see safety._word_alternation); the app
+    matches violent words as \\b<escaped entry>\\b.
+    """
+    issues = []
+    stripped = word.strip()
+    if not stripped:
+        return [RuleIssue(ERROR, field, word, "blank entry")]
+    if stripped != word or "  " in stripped:
+        issues.append(RuleIssue(WARNING, field, word, "stray whitespace; the server and the app normalize it differently"))
+    for edge, char in (("starts", stripped[0]), ("ends", stripped[-1])):
+        if not _is_word_char(char):
+            issues.append(RuleIssue(ERROR, field, word, f"{edge} with {char!r}, so the \\b next to it only matches "
+                                                       "when a letter or digit touches it; the entry is almost never found"))
+        elif not char.isascii():
+            issues.append(RuleIssue(WARNING, field, word, f"{edge} with the non-ASCII {char!r}: Dart's \\b is ASCII-only, "
+                                                         "so the app never finds it where the server does"))
+    if len(stripped.split()) > 1 and field == "violent_words":
+        issues.append(RuleIssue(WARNING, field, word, "multi-word entry: the app only matches it with a single space "
+                                                     "between the words; the server allows any whitespace"))
+    return issues
+
+
+def _duplicates(field: str, words: Iterable[str]) -> List[RuleIssue]:
+    seen: Set[str] = set()
+    issues = []
+    for word in words:
+        key = " ".join(word.split()).casefold()
+        if key in seen:
+            issues.append(RuleIssue(WARNING, field, word, "duplicate entry"))
+        seen.add(key)
+    return issues
+
+
+# --- Rule set ---
+
+def lint_rules(rules: Dict[str, Any], check_engine: bool = True, node: Optional[str] = None) -> List[RuleIssue]:
+    """
+    Checks a validation_rules document: every blame pattern compiles for the
+    server (Python re, as authored and as combined by SafetyMatcher) and the
+    app (Dart RegExp syntax, and Node's RegExp when `node` is available),
+    doesn't match empty text and has no backtracking red flags; word lists
+    have no duplicates or entries \\b can't match.
+    """
+    issues: List[RuleIssue] = []
+    patterns = [str(p) for p in rules.get("blame_patterns", [])]
+
+    for pattern in patterns:
+        try:
+            compiled = re.compile(pattern)
+            re.compile(scope_inline_flags(pattern))
+        except re.error as e:
+            issues.append(RuleIssue(ERROR, "blame_patterns", pattern, f"doesn't compile in Python: {e}"))
+            continue
+        if compiled.search("") is not None:
+            issues.append(RuleIssue(ERROR, "blame_patterns", pattern, "matches empty text, so it flags every message"))
+        for problem in dart_incompatibilities(pattern):
+            issues.append(RuleIssue(ERROR, "blame_patterns", pattern, problem))
+        for risk in backtracking_risks(pattern):
+            issues.append(RuleIssue(WARNING, "blame_patterns", pattern, risk))
+    issues += _duplicates("blame_patterns", patterns)
+
+    engine_errors = node_regexp_errors(patterns, node) if patterns and check_engine else None
+    for pattern, error in (engine_errors or {}).items():
+        issues.append(RuleIssue(ERROR, "blame_patterns", pattern, f"doesn't compile in the app's RegExp: {error}"))
+
+    lists = {field: [str(w) for w in rules.get(field, [])] for field in WORD_LISTS}
+    for field, words in lists.items():
+        for word in words:
+            issues += word_entry_issues(field, word)
+        issues += _duplicates(field, words)
+    violent = {" ".join(w.split()).casefold() for w in lists["violent_words"]}
+    for word in lists["pseudo_feelings"]:
+        if " ".join(word.split()).casefold() in violent:
+            issues.append(RuleIssue(WARNING, "pseudo_feelings", word, "also a violent word; matches report it as violent"))
+
+    try:
+        SafetyMatcher.from_rules(rules)
+    except re.error as e:
+        issues.append(RuleIssue(ERROR, "validation_rules", "*", f"the combined matcher doesn't compile: {e}"))
+    return issues
@@ -0,0 +1,106 @@
+import logging
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("peacekeeper")
+
+# Categories that make a text unsafe to send. Pseudo-feelings are reported so
+# the client can coach the speaker, but they don't block the message.
+CATEGORY_BLAME = "blame"
+CATEGORY_VIOLENT = "violent"
+CATEGORY_PSEUDO_FEELING = "pseudo_feeling"
+CATEGORY_PROFANITY = "profanity"
+BLOCKING_CATEGORIES = {CATEGORY_BLAME, CATEGORY_VIOLENT, CATEGORY_PROFANITY}
+
+class SafetyMatch(NamedTuple):
+    category: str
+    start: int
+    end: int
+    text: str
+
+
+def scope_inline_flags(pattern: str) -> str:
+    """
+    Turns a leading global flag like `(?i)` into a scoped group `(?i:...)`.
+
+    The rules are authored for Dart and Python individually, where a leading
+    `(?i)` is fine; inside one combined alternation Python only accepts
+    global flags at the very start, so each pattern gets its own scope.
+    """
+    match = re.match(r"^\(\?([aiLmsux]+)\)", pattern)
+    if not match:
+        return f"(?:{pattern})"
+    return f"(?{match.group(1)}:{pattern[match.end():]})"
+
+
+def _word_alternation(words: Iterable[str]) -> Optional[str]:
+    """Builds a whole-word, case-insensitive alternation; multi-word entries tolerate any whitespace run."""
+    cleaned = {w.strip().lower() for w in words if w and w.strip()}
+    if not cleaned:
+        return None
+    # Longest first so "shut up" wins over a shorter entry sharing its prefix
+    ordered = sorted(cleaned, key=lambda w: (-len(w), w))
+    escaped = [r"\s+".join(re.escape(part) for part in w.split()) for w in ordered]
+    return r"(?i:\b(?:" + "|".join(escaped) + r")\b)"
+
+
+class SafetyMatcher:
+    """
+    The validation rules compiled into one regex per category.
+
+    Blame patterns, violent words and pseudo-feelings each become one
+    alternation, so checking a text is a `finditer` pass per category instead
+    of one search per rule. The categories are scanned separately because
+    matches of one regex can't overlap: a violent word inside a blame phrase
+    ("you should shut up") must still be reported, and masked.
+    """
+
+    def __init__(self, blame_patterns: List[str], violent_words: List[str], pseudo_feelings: List[str]):
+        valid_blame = []
+        for pattern in blame_patterns:
+            scoped = scope_inline_flags(pattern)
+            try:
+                re.compile(scoped)
+            except re.error as e:
+                logger.warning(f"Skipping invalid blame pattern {pattern!r}: {e}")
+                continue
+            valid_blame.append(scoped)
+
+        alternations = [
+            (CATEGORY_BLAME, "|".join(valid_blame) if valid_blame else None),
+            (CATEGORY_VIOLENT, _word_alternation(violent_words)),
+            (CATEGORY_PSEUDO_FEELING, _word_alternation(pseudo_feelings)),
+        ]
+        self.rule_count = len(valid_blame) + len(violent_words) + len(pseudo_feelings)
+        self._regexes: List[Tuple[str, "re.Pattern[str]"]] = [
+            (category, re.compile(alternation)) for category, alternation in alternations if alternation
+        ]
+
+    @classmethod
+    def from_rules(cls, rules: Optional[Dict[str, Any]]) -> "SafetyMatcher":
+        rules = rules or {}
+        return cls(
+            blame_patterns=[str(p) for p in rules.get("blame_patterns", [])],
+            violent_words=[str(w) for w in rules.get("violent_words", [])],
+            pseudo_feelings=[str(w) for w in rules.get("pseudo_feelings", [])],
+        )
+
+    def find(self, text: str) -> List[SafetyMatch]:
+        if not text:
+            return []
+        matches = [
+            SafetyMatch(category, m.start(), m.end(), m.group())
+            for category, regex in self._regexes for m in regex.finditer(text)
+        ]
+        return sorted(matches, key=lambda m: (m.start, m.end))
+
+
+def mask_spans(text: str, matches: List[SafetyMatch], categories=(CATEGORY_VIOLENT,), mask: str = "*") -> str:
+    """Replaces the characters of every match in `categories` with `mask`."""
+    chars = list(text)
+    for m in matches:
+        if m.category in categories:
+            for i in range(m.start, m.end):
+                if not chars[i].isspace():
+                    chars[i] = mask
+    return "".join(chars)
@@ -0,0 +1,388 @@
+import abc
+import asyncio
+import copy
+import datetime
+import random
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+# Session statuses, as stored in `sessions/{id}.status` and read by the app.
+# They implement the phases of the schema's state machine:
+# WAITING_FOR_PARTNER/ACTIVE -> REGULATION, EXPRESSION_PHASE/MESSAGE_SENT/TURN_COMPLETE -> TURN_A/TURN_B,
+# SHARED_CLOSING -> CLOSING.
+WAITING_FOR_PARTNER = "waiting_for_partner"
+ACTIVE = "active"
+EXPRESSION_PHASE = "expression_phase"
+MESSAGE_SENT = "message_sent"
+TURN_COMPLETE = "turn_complete"
+SHARED_CLOSING = "shared_closing"
+FINISHED = "finished"
+
+# Participant status once their regulation (breathing) step is done
+REGULATION_COMPLETE = "regulation_complete"
+
+SOLO = "solo"
+SHARED = "shared"
+
+# Turns per shared session: each participant speaks once
+MAX_TURNS = 2
+
+SESSION_EVENTS = ("join", "regulation_complete", "listener_ready", "send_message", "confirm_reflection",
+                  "next_turn", "finish")
+
+# A session document and its participant_states documents by uid
+SessionSnapshot = Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]
+
+
+class TransitionError(Exception):
+    """An event that isn't allowed in the session's current state."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+class Transition(NamedTuple):
+    # Fields to merge into the session document and into each participant's state
+    session: Dict[str, Any]
+    participants: Dict[str, Dict[str, Any]]
+
+    @property
+    def is_noop(self) -> bool:
+        return not self.session and not self.participants
+
+
+NOOP = Transition({}, {})
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def new_session(host_id: str, mode: str) -> Dict[str, Any]:
+    """The document for a new session: shared sessions wait for a partner, solo ones start right away."""
+    session = {"hostId": host_id, "createdAt": _now(), "mode": mode, "participants": [host_id], "version": 1}
+    if mode == SOLO:
+        session.update(status=ACTIVE, current_speaker=host_id)
+    else:
+        session.update(status=WAITING_FOR_PARTNER)
+    return session
+
+
+def plan_transition(session: Optional[Dict[str, Any]], states: Dict[str, Dict[str, Any]], uid: str, event: str,
+                    message: Optional[Dict[str, Any]] = None,
+                    choose: Callable[[Sequence[str]], str] = random.choice) -> Transition:
+    """
+    Validates `event` by `uid` against the current session and returns the writes it makes.
+
+    Repeating an event that already took effect (a double tap, a retry after a
+    lost response) returns NOOP instead of failing. Raises TransitionError for
+    a missing session (404), a caller who isn't a participant (403) or an
+    event the current status doesn't allow (409). `choose` picks the first
+    speaker of a shared session from its sorted participants.
+    """
+    if session is None:
+        raise TransitionError(404, "Session not found")
+    status = session.get("status")
+    participants: List[str] = list(session.get("participants", []))
+    solo = session.get("mode") == SOLO
+
+    if event == "join":
+        if uid in participants:
+            return NOOP
+        if solo or status != WAITING_FOR_PARTNER or len(participants) >= 2:
+            raise TransitionError(409, "This session is already full")
+        return Transition({"participants": participants + [uid], "status": ACTIVE}, {})
+
+    if uid not in participants:
+        raise TransitionError(403, "Not a participant of this session")
+    if event == "finish":
+        return NOOP if status == FINISHED else Transition({"status": FINISHED}, {})
+    if status == FINISHED:
+        raise TransitionError(409, "Session has ended")
+
+    speaker = session.get("current_speaker")
+    if event == "regulation_complete":
+        if status != ACTIVE:
+            if status in (EXPRESSION_PHASE, MESSAGE_SENT, TURN_COMPLETE, SHARED_CLOSING):
+                return NOOP
+            raise TransitionError(409, "Waiting for a partner to join")
+        if states.get(uid, {}).get("status") == REGULATION_COMPLETE:
+            return NOOP
+        update = {uid: {"status": REGULATION_COMPLETE, "updatedAt": _now()}}
+        ready = [p for p in participants if p == uid or states.get(p, {}).get("status") == REGULATION_COMPLETE]
+        if len(ready) < (1 if solo else 2):
+            return Transition({}, update)
+        return Transition({
+            "status": EXPRESSION_PHASE,
+            "current_speaker": uid if solo else choose(sorted(participants)),
+            "listener_status": "waiting",
+            "phase_start_time": _now(),
+        }, update)
+
+    if event == "listener_ready":
+        if status != EXPRESSION_PHASE or uid == speaker:
+            raise TransitionError(409, "Only the listener can get ready, before the message is sent")
+        return NOOP if session.get("listener_status") == "ready" else Transition({"listener_status": "ready"}, {})
+
+    if event == "send_message":
+        if status in (MESSAGE_SENT, SHARED_CLOSING) and uid == speaker:
+            return NOOP
+        if status != EXPRESSION_PHASE or uid != speaker:
+            raise TransitionError(409, "Only the speaker can send a message, once per turn")
+        if not message:
+            raise TransitionError(422, "A message is required")
+        sent = {**message, "senderId": uid, "timestamp": _now()}
+        # Solo sessions have nobody to reflect, so they close right away
+        return Transition({"current_message": sent, "status": SHARED_CLOSING if solo else MESSAGE_SENT},
+                          {uid: {"emotions": list(message.get("emotions", []))}})
+
+    if event == "confirm_reflection":
+        if status == TURN_COMPLETE and uid != speaker:
+            return NOOP
+        if status != MESSAGE_SENT or uid == speaker:
+            raise TransitionError(409, "Only the listener can confirm the reflection of a sent message")
+        return Transition({"status": TURN_COMPLETE}, {})
+
+    if event == "next_turn":
+        if status != TURN_COMPLETE:
+            raise TransitionError(409, "The current turn isn't complete")
+        turns = session.get("turns_completed", 0) + 1
+        if turns >= MAX_TURNS:
+            return Transition({"status": SHARED_CLOSING, "turns_completed": turns}, {})
+        return Transition({
+            "status": EXPRESSION_PHASE,
+            "current_speaker": next((p for p in participants if p != speaker), speaker),
+            "listener_status": "waiting",
+            "current_message": None,
+            "turns_completed": turns,
+        }, {})
+
+    raise TransitionError(422, f"Unknown session event {event!r}")
+
+
+def apply_transition(snapshot: SessionSnapshot, transition: Transition) -> SessionSnapshot:
+    """The snapshot after `transition`. The version only moves when the session document changes."""
+    session, states = copy.deepcopy(snapshot)
+    if transition.session:
+        session.update(transition.session)
+        session["version"] = session.get("version", 0) + 1
+    for uid, fields in transition.participants.items():
+        states.setdefault(uid, {}).update(fields)
+    return session, states
+
+
+def session_view(snapshot: SessionSnapshot) -> Dict[str, Any]:
+    """The compact state clients act on; also what the per-instance session cache holds."""
+    session, states = snapshot
+    participants = list(session.get("participants", []))
+    return {
+        "version": session.get("version", 0),
+        "status": session.get("status"),
+        "mode": session.get("mode", SHARED),
+        "participants": participants,
+        "ready": [uid for uid in participants if states.get(uid, {}).get("status") == REGULATION_COMPLETE],
+        "current_speaker": session.get("current_speaker"),
+        "listener_status": session.get("listener_status"),
+        "turns_completed": session.get("turns_completed", 0),
+    }
+
+
+def check_settled(view: Dict[str, Any], uid: str, event: str, version: Optional[int] = None) -> bool:
+    """
+    Decides an event from a possibly outdated view where no later write can change the answer.
+
+    Versions only grow, sessions never lose participants, and a finished
+    session stays finished, so these verdicts hold however stale `view` is.
+    Returns True when the event is a repeat with nothing to do, raises
+    TransitionError when it must be rejected, and returns False when only the
+    current session can tell.
+    """
+    participants = view["participants"]
+    if version is not None and version < view["version"]:
+        raise TransitionError(409, "Session has changed, refresh and try again")
+    if uid not in participants and (len(participants) >= 2 or view["mode"] == SOLO):
+        raise TransitionError(409, "This session is already full") if event == "join" else \
+            TransitionError(403, "Not a participant of this session")
+    if view["status"] == FINISHED:
+        if event == "finish" or (event == "join" and uid in participants):
+            return True
+        raise TransitionError(409, "Session has ended")
+    return False
+
+
+# --- Stores ---
+
+class SessionStore(abc.ABC):
+    """
+    Where sessions live. `transact` reads a session and its participant states,
+    lets `plan` decide the writes, and applies them atomically: either all of
+    them or, if the session changed meanwhile, none (and `plan` runs again).
+    Methods are blocking.
+    """
+
+    name = ""
+
+    @abc.abstractmethod
+    def create(self, session_id: str, session: Dict[str, Any]) -> bool:
+        """Stores a new session; False if the ID is taken."""
+
+    @abc.abstractmethod
+    def get(self, session_id: str) -> Optional[SessionSnapshot]:
+        """The session and its participant states, or None if there is no such session."""
+
+    @abc.abstractmethod
+    def transact(self, session_id: str,
+                 plan: Callable[[Optional[Dict[str, Any]], Dict[str, Dict[str, Any]]], Transition]) -> SessionSnapshot:
+        """Applies the writes `plan` returns and gives back the resulting snapshot."""
+
+
+class FirestoreSessionStore(SessionStore):
+    """
+    Sessions in the `sessions` collection with a `participant_states` subcollection.
+
+    Each transition is one transaction: it reads the session and its
+    participants' states, and commits every write in a single request. A
+    repeated event reads but writes nothing, so it fans out no snapshot
+    updates to the clients.
+    """
+
+    name = "firestore"
+
+    def __init__(self, client: Callable[[], Any], collection: str = "sessions"):
+        self._client = client
+        self.collection = collection
+
+    def _ref(self, session_id: str):
+        return self._client().collection(self.collection).document(session_id)
+
+    def create(self, session_id: str, session: Dict[str, Any]) -> bool:
+        from google.api_core.exceptions import Conflict
+
+        ref = self._ref(session_id)
+        batch = self._client().batch()
+        batch.create(ref, session)
+        batch.set(ref.collection("participant_states").document(session["participants"][0]), {"status": "joined"})
+        try:
+            batch.commit()
+        except Conflict:
+            return False
+        return True
+
+    def _read(self, ref, transaction=None) -> Optional[SessionSnapshot]:
+        snapshot = ref.get(transaction=transaction)
+        if not snapshot.exists:
+            return None
+        session = snapshot.to_dict()
+        state_refs = [ref.collection("participant_states").document(uid) for uid in session.get("participants", [])]
+        states = {}
+        if state_refs:
+            getter = transaction.get_all if transaction is not None else self._client().get_all
+            for doc in getter(state_refs):
+                if doc.exists:
+                    states[doc.id] = doc.to_dict()
+        return session, states
+
+    def get(self, session_id: str) -> Optional[SessionSnapshot]:
+        return self._read(self._ref(session_id))
+
+    def transact(self, session_id, plan):
+        from google.cloud import firestore
+
+        client = self._client()
+        ref = self._ref(session_id)
+
+        @firestore.transactional
+        def run(transaction) -> SessionSnapshot:
+            current = self._read(ref, transaction)
+            transition = plan(*(current or (None, {})))
+            if transition.is_noop:
+                return current
+            after = apply_transition(current, transition)
+            if transition.session:
+                transaction.set(ref, {**transition.session, "version": after[0]["version"]}, merge=True)
+            for uid, fields in transition.participants.items():
+                transaction.set(ref.collection("participant_states").document(uid), fields, merge=True)
+            return after
+
+        return run(client.transaction())
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local sessions. Nothing is shared between workers or survives a restart; meant for development and benchmarks."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._sessions: Dict[str, SessionSnapshot] = {}
+        self._lock = threading.Lock()
+
+    def create(self, session_id, session):
+        with self._lock:
+            if session_id in self._sessions:
+                return False
+            self._sessions[session_id] = (copy.deepcopy(session), {session["participants"][0]: {"status": "joined"}})
+            return True
+
+    def get(self, session_id):
+        with self._lock:
+            current = self._sessions.get(session_id)
+            return copy.deepcopy(current) if current else None
+
+    def transact(self, session_id, plan):
+        with self._lock:
+            current = self._sessions.get(session_id)
+            transition = plan(*(copy.deepcopy(current) if current else (None, {})))
+            if transition.is_noop:
+                return copy.deepcopy(current)
+            self._sessions[session_id] = apply_transition(current, transition)
+            return copy.deepcopy(self._sessions[session_id])
+
+
+SESSION_STORES = ("firestore", "memory")
+
+
+def build_session_store(name: str, firestore_client: Callable[[], Any]) -> SessionStore:
+    name = name.lower()
+    if name == "firestore":
+        return FirestoreSessionStore(firestore_client)
+    if name == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown session store {name!r}, expected one of {', '.join(SESSION_STORES)}")
+
+
+class KeyedLocks:
+    """
+    One asyncio.Lock per key, created on demand and dropped when nobody holds or waits for it.
+
+    Serializing a session's transitions on the instance means two taps landing
+    together queue for a moment instead of colliding in Firestore transactions
+    and retrying with backoff.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+        self.contended = 0
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        elif lock.locked():
+            self.contended += 1
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -0,0 +1,138 @@
+import re
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Upper edges of the similarity-score histogram buckets
+SCORE_BUCKETS = (0.5, 0.7, 0.8, 0.85, 0.9, 0.95, 0.99, 1.0)
+
+# Words that flip a sentence's meaning while changing only a few n-grams: "did
+# not come home" and "did come home" embed above any usable threshold
+NEGATIONS = re.compile(
+    r"\b(?:not|no|never|none|nobody|nothing|nowhere|neither|nor|without"
+    r"|(?P<contraction>cannot|\w+n['\u2019]t|(?:do|does|did|is|was|are|were|has|have|had|ca|wo|could|would|should)nt))\b",
+    re.IGNORECASE,
+)
+
+
+def negation_signature(text: str) -> str:
+    """The negations in `text`, contractions folded into "not", so "didn't" and "did not" agree."""
+    return " ".join(sorted("not" if m.group("contraction") else m.group(0).lower() for m in NEGATIONS.finditer(text)))
+
+
+def hashed_ngram_embedding(text: str, dim: int = 512, n: int = 3) -> np.ndarray:
+    """
+    Embeds text as a unit vector of hashed character n-gram counts.
+
+    Cheap, dependency-free and stable across processes (crc32, not `hash()`),
+    which is enough to catch rephrasings like "You never do the dishes!" vs
+    "you never do the dishes".
+    """
+    normalized = " " + re.sub(r"[^\w\s]", "", text.lower()).strip() + " "
+    normalized = re.sub(r"\s+", " ", normalized)
+    vector = np.zeros(dim, dtype=np.float32)
+    for i in range(max(1, len(normalized) - n + 1)):
+        h = zlib.crc32(normalized[i:i + n].encode())
+        # Use one hash bit for the sign so collisions cancel out instead of piling up
+        vector[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Index:
+    """Fixed-capacity ring buffer of embeddings with their scope, value and insertion time."""
+
+    def __init__(self, capacity: int, dim: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.scopes = np.zeros(capacity, dtype=np.int64)
+        self.added_at = np.zeros(capacity, dtype=np.float64)
+        self.values: List[Any] = [None] * capacity
+        self.count = 0
+        self.next = 0
+
+
+class SimilarityCache:
+    """
+    Shared, user-independent cache answered by nearest-neighbour lookup.
+
+    Entries are grouped per task namespace; within a namespace an entry only
+    matches queries with the same `scope` (e.g. the feelings a needs
+    suggestion was generated for) and the same negations, which the
+    embedding barely registers. A lookup hits when the best cosine
+    similarity reaches `threshold` and the entry is younger than `ttl`.
+    """
+
+    def __init__(self, threshold: float = 0.95, capacity: int = 5000, ttl: float = 86400,
+                 dim: int = 512, embed: Optional[Callable[[str], np.ndarray]] = None,
+                 clock: Callable[[], float] = time.time):
+        self.threshold = threshold
+        self.capacity = capacity
+        self.ttl = ttl
+        self.dim = dim
+        self._embed = embed or (lambda text: hashed_ngram_embedding(text, dim=dim))
+        self._clock = clock
+        self._indexes: Dict[str, _Index] = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.score_histogram = [0] * len(SCORE_BUCKETS)
+
+    @staticmethod
+    def _scope_id(scope: str, text: str) -> int:
+        return zlib.crc32(f"{scope}\0{negation_signature(text)}".encode())
+
+    def lookup(self, namespace: str, text: str, scope: str = "") -> Optional[Tuple[Any, float]]:
+        """Returns (value, similarity) of the closest fresh entry above the threshold, or None."""
+        query = self._embed(text)
+        with self._lock:
+            self.lookups += 1
+            index = self._indexes.get(namespace)
+            if index is None or index.count == 0:
+                return None
+
+            n = index.count
+            scores = index.vectors[:n] @ query
+            eligible = (index.scopes[:n] == self._scope_id(scope, text)) & (index.added_at[:n] > self._clock() - self.ttl)
+            if not eligible.any():
+                return None
+            scores = np.where(eligible, scores, -1.0)
+            best = int(np.argmax(scores))
+            score = float(scores[best])
+            self._record_score(score)
+            if score < self.threshold:
+                return None
+            self.hits += 1
+            return index.values[best], score
+
+    def add(self, namespace: str, text: str, value: Any, scope: str = "") -> None:
+        vector = self._embed(text)
+        with self._lock:
+            index = self._indexes.get(namespace)
+            if index is None:
+                index = self._indexes[namespace] = _Index(self.capacity, self.dim)
+            slot = index.next
+            index.vectors[slot] = vector
+            index.scopes[slot] = self._scope_id(scope, text)
+            index.added_at[slot] = self._clock()
+            index.values[slot] = value
+            index.next = (slot + 1) % self.capacity
+            index.count = min(index.count + 1, self.capacity)
+
+    def _record_score(self, score: float) -> None:
+        for i, edge in enumerate(SCORE_BUCKETS):
+            if score <= edge:
+                self.score_histogram[i] += 1
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold": self.threshold,
+            "entries": {ns: index.count for ns, index in self._indexes.items()},
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_ratio": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "best_score_histogram": {f"le_{edge}": count for edge, count in zip(SCORE_BUCKETS, self.score_histogram)},
+        }
@@ -0,0 +1,164 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("peacekeeper")
+
+
+class StartupTimer:
+    """
+    Records how long each initialization phase took, in the order they ran.
+
+    Import-time phases are recorded as the module loads; lazily created
+    clients add their phase whenever first used, so the report shows what a
+    cold instance actually paid and when.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self.started = clock()
+        self._phases: List[Tuple[str, float, float]] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, started)
+
+    def record(self, name: str, started: float) -> None:
+        """Records a phase that began at `started` (a value of the timer's clock) and ends now."""
+        ended = self._clock()
+        with self._lock:
+            self._phases.append((name, started - self.started, ended - started))
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = list(self._phases)
+        return {
+            "phases": [{"name": n, "at_ms": round(at * 1000, 1), "ms": round(d * 1000, 1)} for n, at, d in phases],
+            # Phases can nest (the Firestore client initializes the Firebase app), so report the span
+            "elapsed_ms": round(max((at + d for _, at, d in phases), default=0.0) * 1000, 1),
+        }
+
+    def summary(self) -> str:
+        return ", ".join(f"{p['name']}={p['ms']:.0f}ms" for p in self.report()["phases"])
+
+
+class Lazy:
+    """
+    Creates a client on first attribute access and delegates to it afterwards.
+
+    Lets module-level names such as `db` and `model` keep their call sites
+    (`db.collection(...)`) while the import and connection cost moves out of
+    module import. Creation is thread-safe and happens once, unless `override`
+    supplies the client or `reset` forgets it.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], timer: Optional[StartupTimer] = None):
+        self._name = name
+        self._factory = factory
+        self._timer = timer
+        self._value = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        return self._value is not None
+
+    def get(self) -> Any:
+        value = self._value
+        if value is None:
+            with self._lock:
+                if self._value is None:
+                    started = time.perf_counter()
+                    with self._timer.phase(self._name) if self._timer else nullcontext():
+                        self._value = self._factory()
+                    logger.info(f"Initialized {self._name} in {(time.perf_counter() - started) * 1000:.0f}ms")
+                value = self._value
+        return value
+
+    def override(self, value: Any) -> None:
+        """Uses `value` as the client without calling the factory, e.g. a fake in tests."""
+        with self._lock:
+            self._value = value
+
+    def reset(self) -> None:
+        """Forgets the client (created or overridden); the next use creates it again."""
+        with self._lock:
+            self._value = None
+
+    def __getattr__(self, attr: str) -> Any:
+        # Private names are never delegated, so introspection can't trigger creation
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __repr__(self) -> str:
+        return f"<Lazy {self._name} ({'initialized' if self.initialized else 'pending'})>"
+
+
+class ProcessState:
+    """
+    The module globals an app instance shares between requests, and how to build each.
+
+    `register` builds a global and remembers its factory. `replaced` swaps
+    every registered global for a fresh one (or a given override) and puts
+    the previous ones back afterwards, so a harness running the app against
+    fakes covers globals added later without listing them. Values swapped
+    out this way are released with the `close` they were registered with.
+    """
+
+    def __init__(self, namespace: Dict[str, Any]):
+        self._namespace = namespace
+        # name -> (factory, close); close releases a value once it is swapped out
+        self._factories: Dict[str, Tuple[Callable[[], Any], Optional[Callable[[Any], None]]]] = {}
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    def register(self, name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], None]] = None) -> Any:
+        """Records how to build global `name` and returns a first instance."""
+        self._factories[name] = (factory, close)
+        return factory()
+
+    def reset(self, *names: str, **overrides: Any) -> None:
+        """Rebuilds the named globals (or sets the overrides), closing the values they replace."""
+        self._check(list(names) + list(overrides))
+        for name in self._factories:
+            if name in names or name in overrides:
+                self._swap(name, overrides[name] if name in overrides else self._factories[name][0]())
+
+    @contextmanager
+    def replaced(self, **overrides: Any):
+        """Runs the block against fresh globals (and the overrides), restoring the previous ones afterwards."""
+        self._check(overrides)
+        previous = {name: self._namespace[name] for name in self._factories}
+        # In registration order, so a factory sees the fresh values registered before it
+        for name, (factory, _) in self._factories.items():
+            self._namespace[name] = overrides[name] if name in overrides else factory()
+        try:
+            yield self
+        finally:
+            for name, (_, close) in self._factories.items():
+                value = self._namespace[name]
+                if close and value is not previous[name]:
+                    close(value)
+            self._namespace.update(previous)
+
+    def _swap(self, name: str, value: Any) -> None:
+        close = self._factories[name][1]
+        old = self._namespace[name]
+        self._namespace[name] = value
+        if close and old is not value:
+            close(old)
+
+    def _check(self, names) -> None:
+        unknown = sorted(set(names) - set(self._factories))
+        if unknown:
+            raise KeyError(f"Not registered process state: {', '.join(unknown)}")
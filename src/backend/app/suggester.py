@@ -0,0 +1,206 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# Feeling categories (as named in nvc_vocabulary/feelings) suggested when the
+# text gives no clue, in order.
+DEFAULT_FEELING_CATEGORIES = ["Sad", "Angry", "Afraid"]
+DEFAULT_NEEDS = ["Understanding", "Empathy", "Respect"]
+
+# Situation keywords -> feeling categories they usually come with
+FEELING_KEYWORDS: Dict[str, List[str]] = {
+    "Angry": ["dishes", "chores", "mess", "clean", "again", "forgot", "forget", "interrupt", "interrupted",
+              "yell", "yelled", "shout", "shouted", "lie", "lied", "promise", "promised", "broke", "phone",
+              "late", "waited", "money", "spent"],
+    "Sad": ["alone", "lonely", "miss", "cry", "cried", "left", "birthday", "anniversary", "ignored", "rejected",
+            "hurt", "lost", "forgot", "plans", "cancelled", "canceled"],
+    "Afraid": ["late", "night", "drive", "drove", "bills", "money", "job", "doctor", "sick", "safe",
+               "didn't call", "didn't answer", "no answer", "worried", "future", "leave", "threatened"],
+    "Confused": ["why", "don't understand", "didn't understand", "changed", "suddenly", "mixed", "said",
+                 "told me", "different"],
+}
+
+# Gentler, everyday words to offer first for each category; only used if they
+# still exist in the seeded vocabulary.
+PREFERRED_FEELINGS: Dict[str, List[str]] = {
+    "Sad": ["Disappointed", "Heavy", "Dejected"],
+    "Angry": ["Irritated", "Annoyed", "Fed up"],
+    "Afraid": ["Worried", "Anxious", "Insecure"],
+    "Confused": ["Uncertain", "Puzzled", "Torn"],
+    "Happy": ["Glad", "Pleased", "Grateful"],
+    "Relaxed": ["Relieved", "Calm", "Comfortable"],
+    "Loving": ["Tender", "Warm", "Affectionate"],
+}
+
+# Feeling words the model commonly returns that aren't in the vocabulary
+FEELING_ALIASES: Dict[str, str] = {
+    "hurt": "Sad", "sad": "Sad", "lonely": "Sad", "ashamed": "Sad", "guilty": "Sad", "tired": "Sad",
+    "exhausted": "Sad", "angry": "Angry", "frustrated": "Angry", "disrespected": "Angry", "upset": "Angry",
+    "overwhelmed": "Afraid", "afraid": "Afraid", "jealous": "Afraid", "stressed": "Afraid", "confused": "Confused",
+}
+
+# Feeling category -> needs most often unmet behind it
+CATEGORY_NEEDS: Dict[str, List[str]] = {
+    "Angry": ["Respect", "Consideration", "Cooperation"],
+    "Sad": ["Empathy", "Support", "Appreciation"],
+    "Afraid": ["Safety", "Security", "Trust"],
+    "Confused": ["Clarity", "Understanding", "Communication"],
+    "Happy": ["Appreciation", "Celebration of life", "Connection"],
+    "Relaxed": ["Ease", "Rest", "Harmony"],
+    "Loving": ["Closeness", "Affection", "Intimacy"],
+    "Strong": ["Autonomy", "Competence", "Choice"],
+    "Inspired": ["Growth", "Creativity", "Purpose"],
+}
+
+# Pseudo-feelings (from validation_rules) -> the needs they usually point to
+PSEUDO_FEELING_NEEDS: Dict[str, List[str]] = {
+    "ignored": ["Consideration", "Inclusion", "To matter"],
+    "betrayed": ["Trust", "Integrity"],
+    "abandoned": ["Support", "Belonging"],
+    "manipulated": ["Choice", "Transparency"],
+    "rejected": ["Acceptance", "Belonging"],
+    "unappreciated": ["Appreciation", "To matter"],
+    "unheard": ["Understanding", "Empathy"],
+    "unwanted": ["Acceptance", "Belonging"],
+    "used": ["Mutuality", "Consideration"],
+    "attacked": ["Safety", "Respect"],
+    "blamed": ["Understanding", "Acceptance"],
+    "cheated": ["Trust", "Honesty"],
+    "cornered": ["Choice", "Space"],
+    "criticized": ["Acceptance", "Appreciation"],
+    "distrusted": ["Trust", "Integrity"],
+    "intimidated": ["Safety", "Equality"],
+    "let down": ["Trust", "Consistency"],
+    "misunderstood": ["Understanding", "Clarity"],
+    "neglected": ["Nurturing", "Consideration"],
+    "overworked": ["Rest", "Support", "Cooperation"],
+    "patronized": ["Respect", "Equality"],
+    "pressured": ["Choice", "Space"],
+    "provoked": ["Respect", "Peace"],
+    "put down": ["Respect", "Acceptance"],
+    "threatened": ["Safety", "Security"],
+    "unloved": ["Love", "Affection"],
+    "unseen": ["To see and be seen", "Appreciation"],
+}
+
+# Situation keywords -> needs
+NEED_KEYWORDS: Dict[str, List[str]] = {
+    "dishes": ["Cooperation", "Support", "Order"],
+    "chores": ["Cooperation", "Support", "Order"],
+    "clean": ["Cooperation", "Order"],
+    "mess": ["Order", "Cooperation"],
+    "late": ["Consideration", "Consistency"],
+    "waited": ["Consideration", "Consistency"],
+    "phone": ["Communication", "Closeness"],
+    "call": ["Communication", "Closeness"],
+    "text": ["Communication", "Closeness"],
+    "money": ["Security", "Stability"],
+    "bills": ["Security", "Stability"],
+    "tired": ["Rest", "Ease"],
+    "sleep": ["Rest", "Sleep"],
+    "alone": ["Companionship", "Closeness"],
+    "promise": ["Trust", "Consistency"],
+    "lied": ["Trust", "Honesty"],
+    "interrupted": ["Respect", "Understanding"],
+}
+
+
+def _keyword_regex(keywords: Iterable[str]) -> "re.Pattern[str]":
+    ordered = sorted({k.lower() for k in keywords}, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(r"\s+".join(map(re.escape, k.split())) for k in ordered) + r")\b",
+                      re.IGNORECASE)
+
+
+def _split_feelings(feelings: Any) -> List[str]:
+    if isinstance(feelings, (list, tuple)):
+        return [str(f).strip().lower() for f in feelings if str(f).strip()]
+    return [f.strip().lower() for f in str(feelings or "").split(",") if f.strip()]
+
+
+class VocabularySuggester:
+    """
+    Deterministic feelings/needs suggestions ranked from the seeded vocabulary.
+
+    Everything is precomputed at construction into dict lookups and one keyword
+    regex per table, so a suggestion costs well under a millisecond. Only
+    words present in the current vocabulary are ever suggested.
+    """
+
+    def __init__(self, feelings_doc: Dict[str, Any], needs_doc: Dict[str, Any]):
+        self.feeling_categories: Dict[str, List[str]] = {
+            c["name"]: list(c.get("words", [])) for c in feelings_doc.get("categories", [])
+        }
+        self.feeling_category_of: Dict[str, str] = {}
+        for name, words in self.feeling_categories.items():
+            for word in words:
+                self.feeling_category_of.setdefault(word.lower(), name)
+        self.need_words: Dict[str, str] = {}
+        for category in needs_doc.get("categories", []):
+            for word in category.get("words", []):
+                self.need_words.setdefault(word.lower(), word)
+
+        self._feeling_keywords = _keyword_regex(k for ks in FEELING_KEYWORDS.values() for k in ks)
+        self._feeling_keyword_index: Dict[str, List[str]] = {}
+        for category, keywords in FEELING_KEYWORDS.items():
+            for keyword in keywords:
+                self._feeling_keyword_index.setdefault(keyword, []).append(category)
+        self._need_keywords = _keyword_regex(list(NEED_KEYWORDS) + list(PSEUDO_FEELING_NEEDS))
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.feeling_categories) and bool(self.need_words)
+
+    @staticmethod
+    def _normalize(match: str) -> str:
+        return re.sub(r"\s+", " ", match.lower())
+
+    def suggest_feelings(self, text: str, count: int = 3) -> List[str]:
+        scores: Dict[str, int] = {}
+        for match in self._feeling_keywords.findall(text or ""):
+            for category in self._feeling_keyword_index.get(self._normalize(match), []):
+                scores[category] = scores.get(category, 0) + 1
+        ranked = sorted(scores, key=lambda c: -scores[c])
+        ranked += [c for c in DEFAULT_FEELING_CATEGORIES if c not in ranked]
+
+        # Interleave the ranked categories so the suggestions cover more than one feeling family
+        pools = [self._feeling_candidates(c) for c in ranked]
+        result: List[str] = []
+        for depth in range(3):
+            for pool in pools:
+                if depth < len(pool) and pool[depth].lower() not in result:
+                    result.append(pool[depth].lower())
+                if len(result) == count:
+                    return result
+        return result
+
+    def _feeling_candidates(self, category: str) -> List[str]:
+        words = self.feeling_categories.get(category, [])
+        available = {w.lower() for w in words}
+        preferred = [w for w in PREFERRED_FEELINGS.get(category, []) if w.lower() in available]
+        return preferred + [w for w in words if w not in preferred]
+
+    def suggest_needs(self, text: str, feelings: Any = None, count: int = 3) -> List[str]:
+        scores: Dict[str, int] = {}
+
+        def vote(needs: Iterable[str], weight: int):
+            for need in needs:
+                if need.lower() in self.need_words:
+                    scores[need] = scores.get(need, 0) + weight
+
+        for match in self._need_keywords.findall(text or ""):
+            key = self._normalize(match)
+            vote(PSEUDO_FEELING_NEEDS.get(key, []), 3)
+            vote(NEED_KEYWORDS.get(key, []), 1)
+        for feeling in _split_feelings(feelings):
+            category = self.feeling_category_of.get(feeling) or FEELING_ALIASES.get(feeling)
+            if category:
+                vote(CATEGORY_NEEDS.get(category, []), 2)
+        vote(DEFAULT_NEEDS, 0)
+
+        ranked = sorted(scores, key=lambda n: -scores[n])
+        return [self.need_words[n.lower()].lower() for n in ranked[:count]]
+
+
+def build_suggester(vocabulary: Dict[str, Any]) -> Optional[VocabularySuggester]:
+    """Builds a suggester from a vocabulary snapshot's data, or None if it has no words yet."""
+    suggester = VocabularySuggester(vocabulary.get("feelings") or {}, vocabulary.get("needs") or {})
+    return suggester if suggester.ready else None
@@ -0,0 +1,175 @@
+import datetime
+import logging
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+logger = logging.getLogger("peacekeeper")
+
+# Firestore rejects write batches with more than 500 operations
+MAX_BATCH_WRITES = 500
+
+
+class SweepTarget(NamedTuple):
+    name: str
+    collection: str
+    # Field compared against the cutoff; may be a dotted path such as "config.expiresAt"
+    field: str
+    # Maps "now" (unix seconds) to the value below which a document is expired
+    cutoff: Callable[[float], Any]
+    # Subcollections deleted along with each document (Firestore doesn't cascade)
+    subcollections: Tuple[str, ...] = ()
+
+
+class SweepResult(NamedTuple):
+    target: str
+    scanned: int
+    deleted: int
+    pages: int
+    complete: bool
+    seconds: float
+
+
+def _utc(timestamp: float) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+def default_targets(cache_ttl_seconds: float, session_retention_seconds: float) -> List[SweepTarget]:
+    """
+    - `ai_cache`: cached AI responses past their TTL (`timestamp` is unix seconds).
+    - `conflict_sessions`: sessions past `config.expiresAt`, as in docs/architecture/database-schema.md.
+    - `sessions`: the collection the app writes today, which has no expiry field;
+      sessions are dropped `session_retention_seconds` after `createdAt`.
+    - `rate_limits`: shared rate limit windows past `expiresAt` (unix seconds).
+    """
+    return [
+        SweepTarget("ai_cache", "cached_ai_responses", "timestamp", lambda now: now - cache_ttl_seconds),
+        SweepTarget("conflict_sessions", "conflict_sessions", "config.expiresAt", lambda now: _utc(now)),
+        SweepTarget("sessions", "sessions", "createdAt", lambda now: _utc(now - session_retention_seconds),
+                    subcollections=("participant_states",)),
+        SweepTarget("rate_limits", "rate_limits", "expiresAt", lambda now: now),
+    ]
+
+
+def _nested(field: str, value: Any) -> Dict[str, Any]:
+    """{"config.expiresAt": v} as the nested mapping Firestore cursors expect."""
+    for part in reversed(field.split(".")):
+        value = {part: value}
+    return value
+
+
+class FirestoreCheckpoints:
+    """
+    Sweep progress kept in Firestore (`gc_state/<target>`), so an interrupted
+    sweep resumes from its cursor on the next run, from any machine.
+    """
+
+    def __init__(self, db, collection: str = "gc_state"):
+        self._db = db
+        self.collection = collection
+
+    def _ref(self, name: str):
+        return self._db.collection(self.collection).document(name)
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        doc = self._ref(name).get()
+        return doc.to_dict() if doc.exists else None
+
+    def save(self, name: str, state: Dict[str, Any]) -> None:
+        self._ref(name).set(state)
+
+    def clear(self, name: str) -> None:
+        self._ref(name).delete()
+
+
+class Sweeper:
+    """
+    Deletes expired documents page by page.
+
+    Each page is a `where(field < cutoff).order_by(field).limit(batch_size)`
+    query continued with `start_after` the last value seen, and is deleted in
+    one batched write (split at 500 operations). Deletes are paced to at most
+    `max_deletes_per_second`, and the cursor is checkpointed after every page.
+    The cutoff is fixed when a sweep starts and kept in the checkpoint, so a
+    resumed sweep finishes the same pass.
+    """
+
+    def __init__(self, db, checkpoints: Optional[FirestoreCheckpoints] = None, batch_size: int = 200,
+                 max_deletes_per_second: float = 200.0, dry_run: bool = False,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
+        if not 1 <= batch_size <= MAX_BATCH_WRITES:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_WRITES}")
+        self._db = db
+        self.checkpoints = checkpoints
+        self.batch_size = batch_size
+        self.max_deletes_per_second = max_deletes_per_second
+        self.dry_run = dry_run
+        self._clock = clock
+        self._sleep = sleep
+
+    def sweep(self, target: SweepTarget, max_documents: Optional[int] = None) -> SweepResult:
+        """Sweeps one target until nothing expired is left, or pauses after about `max_documents`."""
+        started = self._clock()
+        state = (self.checkpoints.load(target.name) if self.checkpoints else None) or {}
+        if state:
+            logger.info(f"Resuming sweep of {target.collection} ({state.get('deleted', 0)} deleted so far)")
+        cutoff = state.get("cutoff", target.cutoff(started))
+        cursor = state.get("cursor")
+        deleted_before = state.get("deleted", 0)
+        scanned = deleted = pages = 0
+        complete = checkpointed = False
+
+        collection = self._db.collection(target.collection)
+        while True:
+            query = collection.where(filter=FieldFilter(target.field, "<", cutoff)).order_by(target.field)
+            if cursor is not None:
+                # Ties on the cursor value are skipped; they are picked up by the next sweep
+                query = query.start_after(_nested(target.field, cursor))
+            page = list(query.limit(self.batch_size).stream())
+            scanned += len(page)
+            if page:
+                if not self.dry_run:
+                    deleted += self._delete(page, target.subcollections)
+                cursor = page[-1].get(target.field)
+                pages += 1
+            if len(page) < self.batch_size:
+                complete = True
+                break
+            if self.checkpoints and not self.dry_run:
+                self.checkpoints.save(target.name, {
+                    "cutoff": cutoff, "cursor": cursor, "deleted": deleted_before + deleted,
+                    "updatedAt": _utc(self._clock()),
+                })
+                checkpointed = True
+            if max_documents is not None and scanned >= max_documents:
+                break
+            self._throttle(deleted, started)
+
+        if complete and self.checkpoints and (state or checkpointed) and not self.dry_run:
+            self.checkpoints.clear(target.name)
+        seconds = self._clock() - started
+        logger.info(f"Swept {target.collection}: {deleted} deleted, {scanned} scanned in {pages} pages "
+                    f"({'complete' if complete else 'paused'}, {seconds:.1f}s)")
+        return SweepResult(target.name, scanned, deleted, pages, complete, seconds)
+
+    def _delete(self, page: List[Any], subcollections: Tuple[str, ...]) -> int:
+        batch, ops = self._db.batch(), 0
+        for snapshot in page:
+            refs = [child.reference for name in subcollections for child in snapshot.reference.collection(name).stream()]
+            for ref in refs + [snapshot.reference]:
+                if ops == MAX_BATCH_WRITES:
+                    batch.commit()
+                    batch, ops = self._db.batch(), 0
+                batch.delete(ref)
+                ops += 1
+        if ops:
+            batch.commit()
+        return len(page)
+
+    def _throttle(self, deleted: int, started: float) -> None:
+        if not self.max_deletes_per_second or not deleted:
+            return
+        ahead = deleted / self.max_deletes_per_second - (self._clock() - started)
+        if ahead > 0:
+            self._sleep(ahead)
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger("peacekeeper")
+
+# Document names that make up the public vocabulary payload
+VOCABULARY_PARTS = ("feelings", "needs", "validation_rules")
+
+# Layout of the prebuilt bundle seed_data.py writes; bumped on incompatible changes
+BUNDLE_FORMAT = 1
+
+
+def content_hash(data: Any) -> str:
+    """Hash of a document's canonical JSON form, independent of key order."""
+    body = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def build_bundle(parts: Dict[str, Dict[str, Any]], version: int) -> Dict[str, Any]:
+    parts = {name: parts[name] for name in VOCABULARY_PARTS}
+    return {"format": BUNDLE_FORMAT, "version": version, "content_hash": content_hash(parts), "parts": parts}
+
+
+def load_bundle(path: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Reads the vocabulary parts from a bundle written by seed_data.py.
+
+    Returns None (and logs why) when the file is missing, of another format,
+    incomplete or doesn't match its content hash, so the caller can fall
+    back to Firestore.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            bundle = json.load(f)
+    except FileNotFoundError:
+        logger.info(f"No vocabulary bundle at {path}")
+        return None
+    except (OSError, ValueError) as e:
+        logger.error(f"Unreadable vocabulary bundle {path}: {e}")
+        return None
+
+    if not isinstance(bundle, dict):
+        bundle = {}
+    parts = bundle.get("parts")
+    if bundle.get("format") != BUNDLE_FORMAT or not isinstance(parts, dict) or set(parts) != set(VOCABULARY_PARTS):
+        logger.error(f"Ignoring vocabulary bundle {path}: unsupported format or missing parts")
+        return None
+    if content_hash(parts) != bundle.get("content_hash"):
+        logger.error(f"Ignoring vocabulary bundle {path}: content hash mismatch")
+        return None
+    logger.info(f"Loaded vocabulary bundle v{bundle.get('version')} from {path}")
+    return parts
+
+
+class VocabularySnapshot:
+    """An immutable, pre-serialized copy of the vocabulary payload."""
+
+    def __init__(self, data: Dict[str, Any], version: int):
+        self.data = data
+        self.version = version
+        self.loaded_at = time.time()
+        self.body = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode()
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        # Strong validators are per representation, so the gzip body gets its own tag
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """True if an If-None-Match header names either representation of this snapshot."""
+        if not if_none_match:
+            return False
+        tags = {t.strip() for t in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+
+class VocabularyStore:
+    """
+    Holds the current vocabulary snapshot in memory.
+
+    The snapshot is loaded once with `refresh()` and then kept current by
+    `update_part()`, which a Firestore listener calls whenever one of the
+    source documents changes. Readers never touch Firestore once loaded.
+    """
+
+    def __init__(self, fetch_parts: Callable[[], Dict[str, Dict[str, Any]]]):
+        self._fetch_parts = fetch_parts
+        self._parts: Dict[str, Dict[str, Any]] = {}
+        self._snapshot: Optional[VocabularySnapshot] = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[VocabularySnapshot], None]] = []
+
+    def get(self) -> VocabularySnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
+
+    def peek(self) -> Optional[VocabularySnapshot]:
+        """The current snapshot, or None if nothing has been loaded yet (never triggers a load)."""
+        return self._snapshot
+
+    def refresh(self) -> VocabularySnapshot:
+        """Reloads every part from the source in one go."""
+        return self.load(self._fetch_parts())
+
+    def load(self, parts: Dict[str, Dict[str, Any]]) -> VocabularySnapshot:
+        """Replaces every part with the given ones, e.g. from a prebuilt bundle, without reading the source."""
+        with self._lock:
+            self._parts = {name: parts.get(name) or {} for name in VOCABULARY_PARTS}
+            return self._rebuild()
+
+    def update_part(self, name: str, data: Optional[Dict[str, Any]]) -> VocabularySnapshot:
+        with self._lock:
+            self._parts[name] = data or {}
+            return self._rebuild()
+
+    def on_change(self, callback: Callable[[VocabularySnapshot], None]) -> None:
+        self._listeners.append(callback)
+
+    def _rebuild(self) -> VocabularySnapshot:
+        current = self._snapshot
+        data = {name: self._parts.get(name, {}) for name in VOCABULARY_PARTS}
+        candidate = VocabularySnapshot(data, version=(current.version + 1) if current else 1)
+        if current is not None and candidate.etag == current.etag:
+            return current
+
+        self._snapshot = candidate
+        logger.info(f"Vocabulary snapshot v{candidate.version} ready ({len(candidate.body)} bytes, "
+                    f"{len(candidate.gzip_body)} gzipped)")
+        for callback in self._listeners:
+            try:
+                callback(candidate)
+            except Exception as e:
+                logger.error(f"Vocabulary change listener failed: {e}")
+        return candidate
@@ -0,0 +1,400 @@
+"""
+In-process stand-ins for Firestore, Firebase Auth and Gemini used by the benchmarks.
+
+They implement only the client surface the backend calls, keep everything in
+memory, and inject latency drawn from a seeded `Latency` distribution so runs
+are reproducible and need no network or credentials.
+"""
+import asyncio
+import copy
+import random
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+
+class Latency:
+    """
+    A latency distribution in milliseconds, parsed from a spec string:
+
+    - `fixed:MS`
+    - `uniform:LOW:HIGH`
+    - `normal:MEAN:STDDEV` (clamped at 0)
+    - `lognormal:MEDIAN:SIGMA` (long right tail, closest to real API latency)
+    """
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, seed: Optional[int] = None):
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {kind}")
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: Optional[int] = None) -> "Latency":
+        kind, *args = spec.split(":")
+        values = [float(v) for v in args] + [0.0, 0.0]
+        return cls(kind, values[0], values[1], seed=seed)
+
+    def sample_ms(self) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                return self.a
+            if self.kind == "uniform":
+                return self._random.uniform(self.a, self.b)
+            if self.kind == "normal":
+                return max(0.0, self._random.gauss(self.a, self.b))
+            return self.a * self._random.lognormvariate(0.0, self.b)
+
+    def sample(self) -> float:
+        return self.sample_ms() / 1000
+
+    def __repr__(self) -> str:
+        return f"{self.kind}:{self.a:g}:{self.b:g}"
+
+
+# --- Firestore ---
+
+class FakeSnapshot:
+    def __init__(self, reference: "FakeDocumentReference", data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field: str) -> Any:
+        return _field_value(self._data or {}, field)
+
+
+def _field_value(data: Dict[str, Any], field: str) -> Any:
+    """Resolves a dotted field path ("config.expiresAt") the way Firestore does."""
+    value: Any = data
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+class FakeWatch:
+    def unsubscribe(self):
+        pass
+
+
+class FakeDocumentReference:
+    def __init__(self, store: "FakeFirestore", collection: str, doc_id: str):
+        self._store = store
+        self.id = doc_id
+        self.path = f"{collection}/{doc_id}"
+
+    def get(self) -> FakeSnapshot:
+        self._store._pause(self._store.read_latency)
+        self._store.reads += 1
+        return self._store._snapshot(self)
+
+    def set(self, data: Dict[str, Any], merge: bool = False):
+        self._store._pause(self._store.write_latency)
+        self._store._write(self.path, data, merge)
+
+    def update(self, data: Dict[str, Any]):
+        self._store._pause(self._store.write_latency)
+        if self._store._get(self.path) is None:
+            raise KeyError(f"No document to update: {self.path}")
+        self._store._write(self.path, data, merge=True)
+
+    def delete(self):
+        self._store._pause(self._store.write_latency)
+        self._store._delete(self.path)
+
+    def on_snapshot(self, callback) -> FakeWatch:
+        callback([self._store._snapshot(self)], [], None)
+        return FakeWatch()
+
+    def collection(self, name: str) -> "FakeCollectionReference":
+        return FakeCollectionReference(self._store, f"{self.path}/{name}")
+
+
+_OPERATORS = {
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    "==": lambda a, b: a == b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+class FakeQuery:
+    """Supports the subset used by the backend: where (FieldFilter or positional), order_by, start_after, limit."""
+
+    def __init__(self, collection: "FakeCollectionReference", filters=(), order=None, cursor=None, limit=None):
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._order = order
+        self._cursor = cursor
+        self._limit = limit
+
+    def _replace(self, **changes) -> "FakeQuery":
+        fields = {"filters": self._filters, "order": self._order, "cursor": self._cursor, "limit": self._limit}
+        fields.update(changes)
+        return FakeQuery(self._collection, **fields)
+
+    def where(self, field: Optional[str] = None, op: Optional[str] = None, value: Any = None, filter=None) -> "FakeQuery":
+        if filter is not None:
+            field, op, value = filter.field_path, filter.op_string, filter.value
+        return self._replace(filters=self._filters + ((field, op, value),))
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> "FakeQuery":
+        return self._replace(order=field)
+
+    def start_after(self, values: Dict[str, Any]) -> "FakeQuery":
+        return self._replace(cursor=_field_value(values, self._order))
+
+    def limit(self, count: int) -> "FakeQuery":
+        return self._replace(limit=count)
+
+    def stream(self) -> Iterable[FakeSnapshot]:
+        store = self._collection._store
+        store._pause(store.read_latency)
+        matches = []
+        for snapshot in self._collection._all():
+            values = [snapshot.get(field) for field, _, _ in self._filters]
+            if all(v is not None and _OPERATORS[op](v, value) for v, (_, op, value) in zip(values, self._filters)):
+                matches.append(snapshot)
+        if self._order:
+            matches.sort(key=lambda snap: (snap.get(self._order), snap.id))
+            if self._cursor is not None:
+                matches = [snap for snap in matches if snap.get(self._order) > self._cursor]
+        if self._limit is not None:
+            matches = matches[:self._limit]
+        store.reads += max(1, len(matches))
+        return iter(matches)
+
+    def get(self) -> List[FakeSnapshot]:
+        return list(self.stream())
+
+
+class FakeCollectionReference:
+    def __init__(self, store: "FakeFirestore", path: str):
+        self._store = store
+        self._path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, doc_id: str) -> FakeDocumentReference:
+        return FakeDocumentReference(self._store, self._path, doc_id)
+
+    def _all(self) -> List[FakeSnapshot]:
+        prefix = self._path + "/"
+        return [self._store._snapshot(self.document(path[len(prefix):])) for path in self._store._paths(prefix)]
+
+    def stream(self) -> Iterable[FakeSnapshot]:
+        return iter(self._all())
+
+    def where(self, *args, **kwargs) -> FakeQuery:
+        return FakeQuery(self).where(*args, **kwargs)
+
+    def order_by(self, field: str, direction: str = "ASCENDING") -> FakeQuery:
+        return FakeQuery(self).order_by(field, direction)
+
+    def limit(self, count: int) -> FakeQuery:
+        return FakeQuery(self).limit(count)
+
+
+class FakeWriteBatch:
+    def __init__(self, store: "FakeFirestore"):
+        self._store = store
+        self._ops: List[tuple] = []
+
+    def set(self, reference: FakeDocumentReference, data: Dict[str, Any], merge: bool = False):
+        self._ops.append(("set", reference, data, merge))
+
+    def update(self, reference: FakeDocumentReference, data: Dict[str, Any]):
+        self._ops.append(("set", reference, data, True))
+
+    def delete(self, reference: FakeDocumentReference):
+        self._ops.append(("delete", reference, None, False))
+
+    def commit(self):
+        self._store._pause(self._store.write_latency)
+        self._store.batches += 1
+        for op, reference, data, merge in self._ops:
+            if op == "set":
+                self._store._write(reference.path, data, merge)
+            else:
+                self._store._delete(reference.path)
+        self._ops = []
+
+
+class FakeFirestore:
+    """Dict-backed Firestore client: documents are stored by path, reads and writes sleep for a sampled latency."""
+
+    def __init__(self, read_latency: Optional[Latency] = None, write_latency: Optional[Latency] = None):
+        self.read_latency = read_latency or Latency()
+        self.write_latency = write_latency or Latency()
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self.batches = 0
+
+    @staticmethod
+    def _pause(latency: Latency):
+        delay = latency.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _get(self, path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._docs.get(path)
+
+    def _snapshot(self, reference: FakeDocumentReference) -> FakeSnapshot:
+        return FakeSnapshot(reference, self._get(reference.path))
+
+    def _write(self, path: str, data: Dict[str, Any], merge: bool):
+        with self._lock:
+            current = self._docs.get(path) if merge else None
+            self._docs[path] = {**(current or {}), **copy.deepcopy(data)}
+            self.writes += 1
+
+    def _delete(self, path: str):
+        with self._lock:
+            self._docs.pop(path, None)
+            self.writes += 1
+
+    def _paths(self, prefix: str) -> List[str]:
+        with self._lock:
+            return sorted(p for p in self._docs if p.startswith(prefix) and "/" not in p[len(prefix):])
+
+    def collection(self, name: str) -> FakeCollectionReference:
+        return FakeCollectionReference(self, name)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self)
+
+    def get_all(self, references: Iterable[FakeDocumentReference]) -> Iterable[FakeSnapshot]:
+        references = list(references)
+        self._pause(self.read_latency)
+        self.reads += len(references)
+        return [self._snapshot(ref) for ref in references]
+
+    def clear_collection(self, name: str):
+        """Drops every document in a top-level collection (test helper, not a Firestore API)."""
+        prefix = name + "/"
+        with self._lock:
+            for path in [p for p in self._docs if p.startswith(prefix)]:
+                del self._docs[path]
+
+    def stats(self) -> Dict[str, int]:
+        return {"documents": len(self._docs), "reads": self.reads, "writes": self.writes, "batches": self.batches}
+
+
+# --- Firebase Auth ---
+
+class FakeUser(NamedTuple):
+    uid: str
+    disabled: bool = False
+    tokens_valid_after_timestamp: int = 0
+
+
+class FakeAuth:
+    """Accepts any token and returns it as the UID, after a sampled verification latency."""
+
+    def __init__(self, latency: Optional[Latency] = None, lifetime: int = 3600):
+        self.latency = latency or Latency()
+        self.lifetime = lifetime
+        self.verifications = 0
+
+    def verify_id_token(self, token: str) -> Dict[str, Any]:
+        FakeFirestore._pause(self.latency)
+        self.verifications += 1
+        now = time.time()
+        return {"uid": token, "iat": now, "exp": now + self.lifetime}
+
+    def get_user(self, uid: str) -> FakeUser:
+        FakeFirestore._pause(self.latency)
+        return FakeUser(uid)
+
+
+# --- Gemini ---
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeStream:
+    def __init__(self, chunks: List[str], delay: float):
+        self._chunks = chunks
+        self._delay = delay
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self._chunks:
+            if self._delay > 0:
+                await asyncio.sleep(self._delay)
+            yield FakeResponse(chunk)
+
+
+class FakeGemini:
+    """
+    Answers generate_content_async() with canned text chosen from the prompt.
+
+    The whole latency sample is spent before a normal reply; for `stream=True`
+    a fifth of it is time-to-first-token and the rest is spread over the chunks.
+    `error_rate` makes that fraction of calls raise, as quota errors would.
+    """
+
+    REPLIES = {
+        "core emotions": "Hurt, Tired, Lonely",
+        "universal human needs": "Support, Rest, Connection",
+        "reflection for the LISTENER": (
+            "I hear that you feel tired and hurt because you need support. "
+            "I am willing to talk about how we share the chores."
+        ),
+        "Analyze this request": (
+            "Judgment: Yes\nAlternatives: Would you be willing to wash the dishes after dinner tonight?, "
+            "Would you be willing to agree on a chore schedule this weekend?"
+        ),
+    }
+    DEFAULT_REPLY = (
+        "Judgment: Yes\nAlternatives: The dishes from dinner are still in the sink, "
+        "I washed the dishes three times this week"
+    )
+
+    def __init__(self, latency: Optional[Latency] = None, error_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def reply_for(self, prompt: str) -> str:
+        for marker, reply in self.REPLIES.items():
+            if marker in prompt:
+                return reply
+        return self.DEFAULT_REPLY
+
+    async def generate_content_async(self, prompt: str, stream: bool = False):
+        self.calls += 1
+        delay = self.latency.sample()
+        if self.error_rate and self._random.random() < self.error_rate:
+            await asyncio.sleep(delay)
+            self.errors += 1
+            raise RuntimeError("429 Resource exhausted (simulated)")
+        text = self.reply_for(prompt)
+        if not stream:
+            await asyncio.sleep(delay)
+            return FakeResponse(text)
+        await asyncio.sleep(delay / 5)
+        words = text.split(" ")
+        chunks = [" ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "") for i in range(0, len(words), 4)]
+        return FakeStream(chunks, (delay * 4 / 5) / max(1, len(chunks)))
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "errors": self.errors}
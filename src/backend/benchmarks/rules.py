@@ -0,0 +1,188 @@
+"""
+Throughput and worst-case benchmark for the validation rules.
+
+Compiles a validation_rules document into the server's SafetyMatcher, runs
+it over a generated corpus of realistic messages (texts/s, matches/s) and
+over pathological inputs built to provoke backtracking (worst-case time per
+input). check_rules.py runs it and compares with benchmarks/rules_baseline.json.
+
+Matching runs in child processes that are killed after a timeout, since a
+regex stuck backtracking can't be interrupted.
+"""
+import multiprocessing
+import random
+import time
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from app.safety import SafetyMatcher
+from app.vocabulary import content_hash
+
+RULES_BASELINE_PATH = __file__.rsplit(".", 1)[0] + "_baseline.json"
+
+# Sentences the corpus is assembled from: neutral, judgmental and borderline
+SENTENCES = [
+    "When I came home the dishes from dinner were still in the sink.",
+    "You never help with the dishes and you always leave your clothes on the floor.",
+    "I felt lonely when you were on your phone during the whole dinner.",
+    "You made me late again, this is your fault.",
+    "Would you be willing to call me when you are going to be late?",
+    "You should have asked me before spending 300 dollars.",
+    "I need some rest after this week, can we talk tomorrow?",
+    "Why can't you just listen to me for once?",
+    "You are so lazy about the chores, it's pathetic.",
+    "I feel ignored and unappreciated when my messages go unanswered.",
+    "If you loved me you would remember my birthday.",
+    "Shut up and let me finish my sentence.",
+    "I was hurt and disappointed when the plans changed last minute.",
+    "The kids were waiting at school for twenty minutes.",
+    "You don't care about anything I say, you idiot.",
+    "I would like us to take turns choosing the restaurant.",
+    "Honestly I feel let down and misunderstood by how that went.",
+    "We agreed on Sunday, and on Sunday nobody was there.",
+    "Can you help me understand what happened at the party?",
+    "I'm worried about money and I need some clarity on the budget.",
+]
+
+
+class RuleBenchConfig(NamedTuple):
+    # Corpus texts, each 1-4 sentences, matched `rounds` times
+    corpus_texts: int = 2000
+    rounds: int = 3
+    # Characters per pathological input, and timed runs per input (the fastest counts, as with timeit)
+    input_chars: int = 20000
+    repeat: int = 5
+    timeout_ms: float = 2000
+    corpus_timeout_s: float = 60
+    seed: int = 1
+
+
+def build_corpus(config: RuleBenchConfig) -> List[str]:
+    rng = random.Random(config.seed)
+    return [" ".join(rng.choice(SENTENCES) for _ in range(rng.randint(1, 4))) for _ in range(config.corpus_texts)]
+
+
+def _fill(unit: str, size: int) -> str:
+    return (unit * (size // max(1, len(unit)) + 1))[:size]
+
+
+def pathological_inputs(rules: Dict[str, Any], size: int) -> Dict[str, str]:
+    """Long inputs that make regex engines work hardest, including near misses of this rule set's entries."""
+    words = [str(w) for field in ("violent_words", "pseudo_feelings") for w in rules.get(field, []) if str(w).strip()]
+    near_misses = " ".join(w[:-1] for w in words if len(w) > 1) or "x"
+    multi_word = [w.split() for w in words if len(w.split()) > 1]
+    # The words of multi-word entries pulled apart by long whitespace runs
+    split_words = "".join(f"{parts[0]}{' ' * 500}{parts[-1][:-1]} " for parts in multi_word) or "x "
+    return {
+        "whitespace_run": "you" + " " * size + "x",
+        "repeated_you": _fill("you ", size),
+        "near_miss_blame": _fill("you alway your faul why can you don car ", size),
+        "near_miss_words": _fill(near_misses + " ", size),
+        "split_multi_word": _fill(split_words, size),
+        "no_word_boundaries": "a" * size,
+        "punctuation": _fill("!?.,;:'\"-()", size),
+        "non_ascii": _fill("éñü 😡 ", size),
+    }
+
+
+def _in_child(target, args: tuple, timeout: float) -> Optional[Any]:
+    """Runs target(*args, sender) in a child process; its sent result, or None if none came within `timeout` seconds."""
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    child = multiprocessing.Process(target=target, args=(*args, sender), daemon=True)
+    child.start()
+    try:
+        # Allow for the child's startup on top of the work itself
+        return receiver.recv() if receiver.poll(timeout + 1) else None
+    finally:
+        child.kill()
+        child.join()
+
+
+def _match_corpus(rules: Dict[str, Any], corpus: List[str], rounds: int, results) -> None:
+    matcher = SafetyMatcher.from_rules(rules)
+    matches = 0
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            matches += len(matcher.find(text))
+    results.send((matches, time.perf_counter() - started))
+
+
+def _time_input(rules: Dict[str, Any], text: str, repeat: int, results) -> None:
+    matcher = SafetyMatcher.from_rules(rules)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        matcher.find(text)
+        timings.append(time.perf_counter() - started)
+    results.send(min(timings))
+
+
+def time_pathological_input(rules: Dict[str, Any], text: str, repeat: int, timeout_ms: float) -> Optional[float]:
+    """Best-of-`repeat` milliseconds to match `text`, or None if the runs didn't finish within `timeout_ms` each."""
+    seconds = _in_child(_time_input, (rules, text, repeat), timeout_ms / 1000 * repeat)
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def run_rule_benchmark(rules: Dict[str, Any], config: RuleBenchConfig = RuleBenchConfig()) -> Dict[str, Any]:
+    started = time.perf_counter()
+    matcher = SafetyMatcher.from_rules(rules)
+    compile_ms = (time.perf_counter() - started) * 1000
+
+    corpus = build_corpus(config)
+    texts = len(corpus) * config.rounds
+    matches, elapsed = _in_child(_match_corpus, (rules, corpus, config.rounds), config.corpus_timeout_s) or (None, None)
+
+    pathological = {name: time_pathological_input(rules, text, config.repeat, config.timeout_ms)
+                    for name, text in pathological_inputs(rules, config.input_chars).items()}
+    timed_out = sorted(name for name, ms in pathological.items() if ms is None)
+    if elapsed is None:
+        timed_out.insert(0, "corpus")
+    return {
+        "config": config._asdict(),
+        "rules": {"content_hash": content_hash(rules), "count": matcher.rule_count},
+        "compile_ms": round(compile_ms, 2),
+        "corpus": {
+            "texts": texts,
+            "matches": matches,
+            "texts_per_second": round(texts / elapsed, 1) if elapsed else 0.0,
+            "matches_per_second": round(matches / elapsed, 1) if elapsed else 0.0,
+            "mean_us": round(elapsed / texts * 1e6, 2) if elapsed and texts else 0.0,
+        },
+        "pathological_ms": pathological,
+        "timed_out": timed_out,
+        "worst_case_ms": None if timed_out else max(pathological.values(), default=0.0),
+    }
+
+
+def compare_rule_reports(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.5,
+                         slack_ms: float = 2.0) -> List[str]:
+    """
+    Lists regressions against a baseline report: corpus throughput more than
+    `tolerance` below it, or any pathological input more than `tolerance`
+    (plus `slack_ms` of noise) slower.
+    """
+    regressions = [f"{name}: timed out" for name in report["timed_out"]]
+    base_rate = baseline.get("corpus", {}).get("texts_per_second")
+    rate = report["corpus"]["texts_per_second"]
+    if base_rate and rate and rate < base_rate * (1 - tolerance):
+        regressions.append(f"corpus: {rate} texts/s (baseline {base_rate})")
+    for name, ms in report["pathological_ms"].items():
+        base = baseline.get("pathological_ms", {}).get(name)
+        if ms is not None and base is not None and ms > base * (1 + tolerance) + slack_ms:
+            regressions.append(f"{name}: {ms} ms (baseline {base} ms)")
+    return regressions
+
+
+def format_rule_report(report: Dict[str, Any]) -> str:
+    corpus = report["corpus"]
+    lines = [
+        f"rules: {report['rules']['count']} (compiled in {report['compile_ms']} ms)",
+        f"corpus: {corpus['texts']} texts, {corpus['matches']} matches, {corpus['texts_per_second']} texts/s, "
+        f"{corpus['matches_per_second']} matches/s, {corpus['mean_us']} us/text",
+        f"{'pathological input':<24}{'ms':>10}",
+    ]
+    for name, ms in report["pathological_ms"].items():
+        lines.append(f"{name:<24}{'timeout' if ms is None else ms:>10}")
+    worst = report["worst_case_ms"]
+    lines.append(f"{'worst case':<24}{'timeout' if worst is None else worst:>10}")
+    return "\n".join(lines)
@@ -0,0 +1,371 @@
+"""
+Offline load test for the backend API.
+
+Drives every /ai/* route and /content/vocabulary in-process (no sockets, no
+network) against in-memory Firestore, Auth and Gemini stand-ins, and reports
+requests/s and p50/p99 latency per scenario.
+
+Usage (from src/backend):
+    python -m benchmarks.run                  # run and compare with benchmarks/baseline.json
+    python -m benchmarks.run --save           # run and overwrite the baseline
+    python -m benchmarks.run --scenario feelings --concurrency 64 --requests 2000
+    python -m benchmarks.run --gemini-latency fixed:0   # measure backend overhead only
+    python -m benchmarks.run --cache-backend sqlite      # compare AI cache backends
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import math
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from unittest.mock import patch
+
+import httpx
+
+from benchmarks.fakes import FakeAuth, FakeFirestore, FakeGemini, Latency
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# A realistic mix: mostly judgmental inputs that need the model, plus a few neutral ones the fast path answers
+OBSERVATIONS = [
+    "You never help with the dishes",
+    "You always leave your clothes on the floor",
+    "You are so lazy about the chores",
+    "You ignored me all evening at the party",
+    "You came home at 11pm without calling",
+    "You were on your phone during the whole dinner",
+    "You forgot my birthday again",
+    "You don't care about what I say",
+    "I saw the dishes from dinner in the sink this morning",
+    "You spent 300 dollars without telling me",
+    "You interrupted me twice while I was talking",
+    "You said you would call at 6 and called at 9",
+]
+REQUESTS = [
+    "Help more around the house",
+    "Stop being on your phone",
+    "Would you be willing to wash the dishes after dinner tonight?",
+    "Be nicer to my parents",
+    "Call me when you are going to be late",
+    "Respect my time",
+]
+FEELINGS = ["tired, hurt, lonely", "frustrated, disappointed", "worried, anxious"]
+
+
+class Scenario(NamedTuple):
+    name: str
+    method: str
+    path: str
+    # Builds the JSON body for request number i (None for GET)
+    body: Optional[Callable[[int, str, int], Optional[Dict[str, Any]]]] = None
+    headers: Optional[Callable[[Dict[str, Any]], Dict[str, str]]] = None
+
+
+def _observation(i: int, distinct: int) -> str:
+    text = OBSERVATIONS[i % distinct % len(OBSERVATIONS)]
+    variant = (i % distinct) // len(OBSERVATIONS)
+    return f"{text} ({variant})" if variant else text
+
+
+def _request(i: int, distinct: int) -> str:
+    text = REQUESTS[i % distinct % len(REQUESTS)]
+    variant = (i % distinct) // len(REQUESTS)
+    return f"{text} ({variant})" if variant else text
+
+
+def _context(i: int, distinct: int) -> Dict[str, Any]:
+    return {
+        "observation": _observation(i, distinct),
+        "feelings": FEELINGS[i % len(FEELINGS)],
+        "needs": "support, rest",
+        "request": _request(i, distinct),
+    }
+
+
+SCENARIOS: List[Scenario] = [
+    Scenario("neutralize", "POST", "/ai/neutralize-observation",
+             lambda i, uid, d: {"user_id": uid, "text": _observation(i, d)}),
+    Scenario("refine", "POST", "/ai/refine-request",
+             lambda i, uid, d: {"user_id": uid, "text": _request(i, d),
+                                "context": {"feelings": FEELINGS[i % len(FEELINGS)], "needs": "support"}}),
+    Scenario("feelings", "POST", "/ai/suggest-feelings",
+             lambda i, uid, d: {"user_id": uid, "text": _observation(i, d)}),
+    Scenario("needs", "POST", "/ai/suggest-needs",
+             lambda i, uid, d: {"user_id": uid, "text": _observation(i, d),
+                                "context": {"feelings": FEELINGS[i % len(FEELINGS)]}}),
+    Scenario("reflection", "POST", "/ai/generate-reflection",
+             lambda i, uid, d: {"user_id": uid, "context": _context(i, d)}),
+    Scenario("reflection_stream", "POST", "/ai/generate-reflection/stream",
+             lambda i, uid, d: {"user_id": uid, "context": _context(i, d)}),
+    Scenario("expression_step", "POST", "/ai/expression-step",
+             lambda i, uid, d: {"user_id": uid, "tasks": [
+                 {"task": "neutralize", "text": _observation(i, d)},
+                 {"task": "feelings", "text": _observation(i, d)},
+                 {"task": "needs", "text": _observation(i, d), "context": {"feelings": FEELINGS[i % len(FEELINGS)]}},
+             ]}),
+    Scenario("vocabulary", "GET", "/content/vocabulary",
+             headers=lambda state: {"Accept-Encoding": "gzip"}),
+    Scenario("vocabulary_revalidate", "GET", "/content/vocabulary",
+             headers=lambda state: {"Accept-Encoding": "gzip", "If-None-Match": state.get("etag", "")}),
+]
+SCENARIOS_BY_NAME = {s.name: s for s in SCENARIOS}
+
+
+class BenchConfig(NamedTuple):
+    requests: int = 300
+    concurrency: int = 32
+    # Distinct inputs cycled through per scenario; repeats are served from the cache
+    distinct: int = 60
+    users: int = 20
+    gemini_latency: str = "lognormal:450:0.35"
+    gemini_error_rate: float = 0.0
+    firestore_read_latency: str = "lognormal:8:0.3"
+    firestore_write_latency: str = "lognormal:15:0.3"
+    auth_latency: str = "lognormal:5:0.3"
+    # AI response cache backend behind the L1 (see app/cache_backends.py)
+    cache_backend: str = "firestore"
+    seed: int = 1
+
+
+# --- Setup ---
+
+def _quiet_import(module: str, db: FakeFirestore):
+    """Imports a module that builds its Firestore client at import time, handing it the fake instead."""
+    with patch("firebase_admin.firestore.client", return_value=db), patch("firebase_admin.initialize_app"), \
+            contextlib.redirect_stdout(io.StringIO()):
+        __import__(module)
+    return sys.modules[module]
+
+
+def seed_firestore(db: FakeFirestore):
+    """Writes the production seed data (seed_data.py) into the fake Firestore."""
+    seed_data = _quiet_import("seed_data", db)
+    with contextlib.redirect_stdout(io.StringIO()):
+        # The shipped bundle stays as it is
+        seed_data.seed_database(db, bundle_path=None)
+
+
+def load_app(db: FakeFirestore):
+    if "app.main" in sys.modules:
+        return sys.modules["app.main"]
+    return _quiet_import("app.main", db)
+
+
+@contextmanager
+def using_fakes(main, db: FakeFirestore, auth: FakeAuth, gemini: FakeGemini):
+    """Points the app at the fakes with fresh process state, and restores the previous state afterwards."""
+    from app.ratelimit import RateLimiter
+
+    # Load generation, not the rate limits, is what's being measured
+    with main.process_state.replaced(db=db, auth=auth, model=gemini, rate_limiter=RateLimiter(None),
+                                     gemini_limit=None):
+        try:
+            main.vocabulary_store.refresh()
+            yield main
+        finally:
+            main.cache_writer.flush()
+
+
+# --- Measurement ---
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, config: BenchConfig,
+                       gemini: FakeGemini) -> Dict[str, Any]:
+    state: Dict[str, Any] = {}
+    if scenario.name == "vocabulary_revalidate":
+        state["etag"] = (await client.get(scenario.path, headers={"Accept-Encoding": "gzip"})).headers.get("etag")
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    indices = iter(range(config.requests))
+    calls_before = gemini.calls
+
+    async def worker():
+        for i in indices:
+            uid = f"bench-user-{i % config.users}"
+            headers = {"Authorization": f"Bearer {uid}"}
+            if scenario.headers:
+                headers.update(scenario.headers(state))
+            body = scenario.body(i, uid, config.distinct) if scenario.body else None
+            started = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path, json=body, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            key = str(response.status_code)
+            statuses[key] = statuses.get(key, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(config.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    errors = sum(count for status, count in statuses.items() if not status.startswith(("2", "3")))
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "gemini_calls": gemini.calls - calls_before,
+    }
+
+
+async def _run(main, scenarios: List[Scenario], config: BenchConfig, gemini: FakeGemini,
+               new_cache_backend: Callable[[str], Any]) -> Dict[str, Any]:
+    transport = httpx.ASGITransport(app=main.app)
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for scenario in scenarios:
+            # Each scenario starts with cold AI caches so results don't depend on run order
+            await asyncio.to_thread(main.cache_writer.flush)
+            main.db.clear_collection("cached_ai_responses")
+            main.process_state.reset("ai_cache", "ai_single_flight", "shared_cache",
+                                     cache_backend=new_cache_backend(scenario.name))
+            results[scenario.name] = await run_scenario(client, scenario, config, gemini)
+    return results
+
+
+def run_benchmarks(config: BenchConfig = BenchConfig(), scenario_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Runs the selected scenarios (all by default) and returns the report."""
+    scenarios = [SCENARIOS_BY_NAME[name] for name in scenario_names] if scenario_names else SCENARIOS
+
+    db = FakeFirestore()
+    seed_firestore(db)
+    main = load_app(db)
+    # Latency only applies once seeding is done
+    db.read_latency = Latency.parse(config.firestore_read_latency, seed=config.seed)
+    db.write_latency = Latency.parse(config.firestore_write_latency, seed=config.seed + 1)
+    auth = FakeAuth(Latency.parse(config.auth_latency, seed=config.seed + 2))
+    gemini = FakeGemini(Latency.parse(config.gemini_latency, seed=config.seed + 3),
+                        error_rate=config.gemini_error_rate, seed=config.seed + 4)
+
+    from app.cache_backends import build_cache_backend
+
+    with tempfile.TemporaryDirectory() as tmp, using_fakes(main, db, auth, gemini):
+        def new_cache_backend(name: str):
+            return build_cache_backend(config.cache_backend, lambda: main.db,
+                                       os.path.join(tmp, f"{name}.sqlite3"), ttl=main.CACHE_TTL_SECONDS)
+
+        results = asyncio.run(_run(main, scenarios, config, gemini, new_cache_backend))
+    return {
+        "config": config._asdict(),
+        "environment": {"python": platform.python_version(), "machine": platform.machine()},
+        "scenarios": results,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25,
+            slack_ms: float = 2.0) -> List[str]:
+    """
+    Lists regressions against a baseline report: throughput more than `tolerance`
+    below it, or p99 more than `tolerance` (plus `slack_ms` of noise) above it.
+    """
+    regressions = []
+    for name, result in report["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if result["errors"] > base.get("errors", 0):
+            regressions.append(f"{name}: {result['errors']} errors (baseline {base.get('errors', 0)})")
+        if result["requests_per_second"] < base["requests_per_second"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['requests_per_second']} req/s "
+                               f"(baseline {base['requests_per_second']})")
+        if result["p99_ms"] > base["p99_ms"] * (1 + tolerance) + slack_ms:
+            regressions.append(f"{name}: p99 {result['p99_ms']} ms (baseline {base['p99_ms']} ms)")
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'scenario':<24}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}{'gemini':>8}"]
+    for name, r in report["scenarios"].items():
+        lines.append(f"{name:<24}{r['requests_per_second']:>10}{r['p50_ms']:>10}{r['p99_ms']:>10}"
+                     f"{r['max_ms']:>10}{r['errors']:>8}{r['gemini_calls']:>8}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = BenchConfig()
+    parser = argparse.ArgumentParser(description="Offline load test for the Peacekeeper backend")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS_BY_NAME),
+                        help="Scenario to run (repeatable, default: all)")
+    parser.add_argument("--requests", type=int, default=defaults.requests, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency, help="Concurrent clients")
+    parser.add_argument("--distinct", type=int, default=defaults.distinct,
+                        help="Distinct inputs per scenario (lower means more cache hits)")
+    parser.add_argument("--users", type=int, default=defaults.users, help="Distinct user IDs")
+    parser.add_argument("--gemini-latency", default=defaults.gemini_latency,
+                        help="fixed:MS | uniform:LO:HI | normal:MEAN:SD | lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--gemini-error-rate", type=float, default=defaults.gemini_error_rate)
+    parser.add_argument("--firestore-read-latency", default=defaults.firestore_read_latency)
+    parser.add_argument("--firestore-write-latency", default=defaults.firestore_write_latency)
+    parser.add_argument("--auth-latency", default=defaults.auth_latency)
+    parser.add_argument("--cache-backend", default=defaults.cache_backend, choices=("firestore", "sqlite", "memory"),
+                        help="AI response cache backend behind the L1")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="Overwrite the baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression (default 0.25)")
+    parser.add_argument("--output", help="Also write this run's report to a JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's per-request INFO logging")
+    args = parser.parse_args(argv)
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if not args.verbose:
+        logging.getLogger("peacekeeper").setLevel(logging.WARNING)
+
+    config = BenchConfig(
+        requests=args.requests, concurrency=args.concurrency, distinct=args.distinct, users=args.users,
+        gemini_latency=args.gemini_latency, gemini_error_rate=args.gemini_error_rate,
+        firestore_read_latency=args.firestore_read_latency, firestore_write_latency=args.firestore_write_latency,
+        auth_latency=args.auth_latency, cache_backend=args.cache_backend, seed=args.seed,
+    )
+    report = run_benchmarks(config, args.scenario)
+    print(format_report(report))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one.")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("config") != report["config"]:
+        print("\nBaseline was recorded with a different configuration; skipping comparison.")
+        return 0
+    regressions = compare(report, baseline, tolerance=args.tolerance)
+    if regressions:
+        print("\nRegressions against baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
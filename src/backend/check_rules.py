@@ -0,0 +1,138 @@
+"""
+Lints and benchmarks the validation rules before they go out to every device.
+
+Checks that every blame pattern compiles for the server (Python re) and the
+app (Dart RegExp syntax; Node's RegExp too when `node` is installed), flags
+backtracking risks and word-list entries that \\b can't match the same way on
+both sides, then measures matching speed on a corpus and on pathological
+inputs and compares it with benchmarks/rules_baseline.json.
+
+Usage (from src/backend):
+    python check_rules.py                       # the shipped bundle (same as seed_data.py)
+    python check_rules.py --rules draft.json    # a validation_rules document being edited
+    python check_rules.py --source firestore    # what's live in config_metadata/validation_rules
+    python check_rules.py --source firestore --locale es   # ...or in validation_rules_es
+    python check_rules.py --lint-only
+    python check_rules.py --save                # record a new baseline after an intended change
+
+Exits 1 on lint errors (or warnings with --strict), a regression or an input over --budget-ms.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional
+
+from app.locales import DEFAULT_LOCALE, localized_document_id, normalize_locale
+from app.rulecheck import ERROR, lint_rules
+from app.vocabulary import load_bundle
+from benchmarks.rules import RULES_BASELINE_PATH, RuleBenchConfig, compare_rule_reports, format_rule_report, \
+    run_rule_benchmark
+
+BUNDLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "vocabulary_bundle.json")
+PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "peacekeeper-483320")
+
+
+def load_rules(args) -> Optional[Dict[str, Any]]:
+    if args.rules:
+        with open(args.rules, encoding="utf-8") as f:
+            return json.load(f)
+    if args.source == "firestore":
+        import firebase_admin
+        from firebase_admin import firestore
+
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(options={'projectId': PROJECT_ID})
+        document = localized_document_id('validation_rules', normalize_locale(args.locale))
+        doc = firestore.client().collection('config_metadata').document(document).get()
+        return doc.to_dict() if doc.exists else None
+    if normalize_locale(args.locale) != DEFAULT_LOCALE:
+        print("The bundle only holds the English rules; use --source firestore or --rules for other locales.")
+        return None
+    parts = load_bundle(args.bundle)
+    return parts["validation_rules"] if parts else None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    defaults = RuleBenchConfig()
+    parser = argparse.ArgumentParser(description="Lint and benchmark the validation rules")
+    parser.add_argument("--source", choices=("bundle", "firestore"), default="bundle",
+                        help="Where to read the rules from (default: the shipped bundle)")
+    parser.add_argument("--bundle", default=BUNDLE_PATH, help="Bundle to read with --source bundle")
+    parser.add_argument("--locale", default=DEFAULT_LOCALE,
+                        help="Locale whose rules to read with --source firestore (default en)")
+    parser.add_argument("--rules", help="Read a validation_rules document from this JSON file instead")
+    parser.add_argument("--lint-only", action="store_true", help="Skip the benchmark")
+    parser.add_argument("--strict", action="store_true", help="Fail on warnings too")
+    parser.add_argument("--no-node", action="store_true", help="Don't compile the patterns with Node's RegExp")
+    parser.add_argument("--corpus-texts", type=int, default=defaults.corpus_texts, help="Corpus size")
+    parser.add_argument("--rounds", type=int, default=defaults.rounds, help="Passes over the corpus")
+    parser.add_argument("--input-chars", type=int, default=defaults.input_chars,
+                        help="Length of each pathological input")
+    parser.add_argument("--repeat", type=int, default=defaults.repeat, help="Timed runs per pathological input")
+    parser.add_argument("--timeout-ms", type=float, default=defaults.timeout_ms,
+                        help="Give up on a pathological input after this long")
+    parser.add_argument("--budget-ms", type=float, default=100.0,
+                        help="Fail if any pathological input takes longer than this (default 100)")
+    parser.add_argument("--baseline", default=RULES_BASELINE_PATH, help="Baseline JSON to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="Overwrite the baseline with this run")
+    # Single matches take milliseconds, so timings are noisier than the load test's; real backtracking is 10x+
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative regression (default 0.5)")
+    args = parser.parse_args(argv)
+
+    rules = load_rules(args)
+    if not rules:
+        print("❌ No validation rules found.")
+        return 1
+    print(f"Validation rules: {len(rules.get('blame_patterns', []))} blame patterns, "
+          f"{len(rules.get('violent_words', []))} violent words, {len(rules.get('pseudo_feelings', []))} pseudo-feelings")
+
+    issues = lint_rules(rules, check_engine=not args.no_node)
+    for issue in issues:
+        print(f"  {issue}")
+    errors = sum(issue.severity == ERROR for issue in issues)
+    warnings = len(issues) - errors
+    print(f"{'❌' if errors else '✅'} {errors} errors, {warnings} warnings")
+    failed = errors > 0 or (args.strict and warnings > 0)
+    if args.lint_only:
+        return 1 if failed else 0
+
+    config = RuleBenchConfig(corpus_texts=args.corpus_texts, rounds=args.rounds, input_chars=args.input_chars,
+                             repeat=args.repeat, timeout_ms=args.timeout_ms)
+    report = run_rule_benchmark(rules, config)
+    print()
+    print(format_rule_report(report))
+
+    # With nothing to compare with, only timeouts and the budget count
+    baseline: Dict[str, Any] = {}
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline saved to {args.baseline}")
+    elif not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save to create one.")
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("\nBaseline was recorded with a different configuration; skipping comparison.")
+            baseline = {}
+
+    problems = compare_rule_reports(report, baseline, tolerance=args.tolerance)
+    worst = report["worst_case_ms"]
+    if worst is not None and worst > args.budget_ms:
+        problems.append(f"worst case {worst} ms is over the {args.budget_ms} ms budget")
+
+    if problems:
+        print("\nRegressions:")
+        for line in problems:
+            print(f"  - {line}")
+        return 1
+    if not args.save:
+        print("\nNo regressions.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
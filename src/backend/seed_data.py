@@ -1,6 +1,36 @@
+"""
+Seeds Firestore with the NVC vocabulary, validation rules and templates.
+
+Seeding is diff-aware: every document is hashed and only the ones whose
+content differs from Firestore are written, together in one batch, along
+with a `config_metadata/content_manifest` document that records the hashes
+and a `version` that increases with every change. Unchanged data writes
+nothing, so clients and server caches keep their copies.
+
+The vocabulary parts are also written to a prebuilt bundle
+(app/vocabulary_bundle.json) that the backend loads at startup instead of
+reading Firestore.
+
+Each entry of LOCALES is seeded as its own documents: English under the
+plain IDs (`nvc_vocabulary/feelings`), other languages with a suffix
+(`nvc_vocabulary/feelings_es`). The bundle only holds English; other
+locales are read from Firestore the first time they are requested.
+
+Usage (from src/backend):
+    python seed_data.py                 # seed and rewrite the bundle
+    python seed_data.py --dry-run       # report what would change, write nothing
+    python seed_data.py --no-bundle     # seed Firestore only
+"""
+import argparse
+import datetime
+import json
+import os
+
 import firebase_admin
 from firebase_admin import credentials, firestore
-import os
+
+from app.locales import localized_document_id
+from app.vocabulary import build_bundle, content_hash
 
 # Initialize Firebase (relies on GOOGLE_APPLICATION_CREDENTIALS or local login)
 PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "peacekeeper-483320")
@@ -10,198 +40,322 @@ if not firebase_admin._apps:
 
 db = firestore.client()
 
-def seed_database():
-    print("Seeding NVC Database with Expanded Vocabulary...")
+BUNDLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "vocabulary_bundle.json")
+MANIFEST = ('config_metadata', 'content_manifest')
 
-    # 1. NVC VOCABULARY (Feelings & Needs)
-    # Feelings (Source: Hoffman Institute)
-    feelings_data = {
-        "categories": [
-            {
-                "name": "Happy",
-                "icon": "sentiment_satisfied_alt",
-                "words": [
-                    "Amused", "Delighted", "Glad", "Joyful", "Pleased", "Satisfied", "Content", "Charmed", "Grateful", "Optimistic",
-                    "Ecstatic", "Thrilled", "Elated", "Jubilant", "Euphoric", "Enthusiastic", "Excited", "Overjoyed"
-                ]
-            },
-            {
-                "name": "Sad",
-                "icon": "sentiment_dissatisfied",
-                "words": [
-                    "Depressed", "Despair", "Dejected", "Heavy", "Crushed", "Disgusted", "Disappointed", "Dismayed", "Dampened",
-                    "Grief", "Weepy", "Miserable", "Melancholy", "Sorrowful", "Mournful", "Gloomy", "Hopeless", "Heartbroken"
-                ]
-            },
-            {
-                "name": "Angry",
-                "icon": "whatshot",
-                "words": [
-                    "Annoyed", "Agitated", "Fed up", "Irritated", "Mad", "Critical", "Resentful", "Disgusted", "Outraged", "Raging",
-                    "Furious", "Livid", "Bitter", "Indignant", "Irate", "Hostile", "Vengeful", "Wrathful"
-                ]
-            },
-            {
-                "name": "Afraid",
-                "icon": "error_outline",
-                "words": [
-                    "Anxious", "Apprehensive", "Cautious", "Concerned", "Dread", "Fearful", "Foreboding", "Frightened", "Mistrustful",
-                    "Panicked", "Petrified", "Scared", "Suspicious", "Terrified", "Wary", "Worried", "Insecure", "Nervous"
-                ]
-            },
-            {
-                "name": "Confused",
-                "icon": "question_mark",
-                "words": [
-                    "Baffled", "Bewildered", "Dazed", "Disoriented", "Distracted", "Doubtful", "Flustered", "Hesitant", "Lost",
-                    "Mystified", "Perplexed", "Puzzled", "Skeptical", "Torn", "Uncertain", "Undecided", "Unsure"
-                ]
-            },
-            {
-                "name": "Strong",
-                "icon": "fitness_center",
-                "words": [
-                    "Empowered", "Capable", "Confident", "Determined", "Energetic", "Forceful", "Invincible", "Mighty", "Powerful",
-                    "Resilient", "Robust", "Secure", "Steady", "Sure", "Tough", "Vigorous", "Bold", "Brave"
-                ]
-            },
-            {
-                "name": "Inspired",
-                "icon": "lightbulb",
-                "words": [
-                    "Amazed", "Awed", "Wonder", "Eager", "Keen", "Inspired", "Moved", "Touched", "Stimulated", "Motivated",
-                    "Creative", "Imaginative", "Insightful", "Visionary", "Awakened", "Enlightened"
-                ]
-            },
-            {
-                "name": "Relaxed",
-                "icon": "spa",
-                "words": [
-                    "Calm", "Comfortable", "Composed", "Content", "Cool", "Easy", "Mellow", "Peaceful", "Quiet", "Restful",
-                    "Serene", "Still", "Tranquil", "Unflappable", "Untroubled", "At ease", "Soothed", "Relieved"
-                ]
-            },
-            {
-                "name": "Loving",
-                "icon": "favorite",
-                "words": [
-                    "Affectionate", "Caring", "Compassionate", "Fond", "Friendly", "Loving", "Open", "Sympathetic", "Tender",
-                    "Warm", "Adoring", "Cherishing", "Devoted", "Doting", "Infatuated", "Passionate", "Yearning", "Sentimental"
-                ]
-            }
-        ]
-    }
-    db.collection('nvc_vocabulary').document('feelings').set(feelings_data)
-    print(" - Feelings seeded.")
-
-    # Needs (Source: Andrew Benjamin George / CNVC)
-    needs_data = {
-        "categories": [
-            {
-                "name": "Connection",
-                "icon": "group",
-                "words": [
-                    "Acceptance", "Affection", "Appreciation", "Belonging", "Cooperation", "Communication", "Closeness", "Community",
-                    "Companionship", "Compassion", "Consideration", "Consistency", "Empathy", "Inclusion", "Intimacy", "Love",
-                    "Mutuality", "Nurturing", "Respect", "Safety", "Security", "Stability", "Support", "To know and be known",
-                    "To see and be seen", "To understand and be understood", "Trust", "Warmth"
-                ]
-            },
-            {
-                "name": "Physical Well-Being",
-                "icon": "accessibility_new",
-                "words": [
-                    "Air", "Food", "Movement", "Exercise", "Rest", "Sleep", "Safety", "Shelter", "Touch", "Water", "Sexual Expression"
-                ]
-            },
-            {
-                "name": "Honesty",
-                "icon": "verified",
-                "words": [
-                    "Authenticity", "Integrity", "Presence", "Transparency", "Truth", "Clarity", "Congruence"
-                ]
-            },
-            {
-                "name": "Play",
-                "icon": "sports_esports",
-                "words": [
-                    "Joy", "Humor", "Fun", "Recreation", "Amusement", "Laughter", "Spontaneity", "Adventure"
-                ]
-            },
-            {
-                "name": "Peace",
-                "icon": "landscape",
-                "words": [
-                    "Beauty", "Communion", "Ease", "Equality", "Harmony", "Inspiration", "Order", "Serenity", "Tranquility", "Balance"
-                ]
-            },
-            {
-                "name": "Autonomy",
-                "icon": "flight",
-                "words": [
-                    "Choice", "Freedom", "Independence", "Space", "Spontaneity", "Empowerment", "Self-expression"
-                ]
-            },
-            {
-                "name": "Meaning",
-                "icon": "stars",
-                "words": [
-                    "Awareness", "Celebration of life", "Challenge", "Clarity", "Competence", "Consciousness", "Contribution",
-                    "Creativity", "Discovery", "Efficacy", "Effectiveness", "Growth", "Hope", "Learning", "Mourning", "Participation",
-                    "Purpose", "Self-expression", "Stimulation", "To matter", "Understanding"
-                ]
-            }
-        ]
-    }
-    db.collection('nvc_vocabulary').document('needs').set(needs_data)
-    print(" - Needs seeded.")
-
-    # 2. VALIDATION RULES (Blame & Pseudo-feelings & Violent Speech)
-    validation_rules = {
-        "blame_patterns": [
-            r"(?i)\byou\s+(always|never)",  # "You always", "You never"
-            r"(?i)\byou\s+made\s+me",      # "You made me"
-            r"(?i)\byou\s+should",         # "You should"
-            r"(?i)\byou\s+must",           # "You must"
-            r"(?i)\byou\s+are\s+(so|too|just)", # "You are so..."
-            r"(?i)\byour\s+fault",         # "Your fault"
-            r"(?i)\bblame\s+you",          # "Blame you"
-            r"(?i)\bif\s+you\s+loved\s+me", # "If you loved me"
-            r"(?i)\bwhy\s+can\'?t\s+you",  # "Why can't you"
-            r"(?i)\byou\s+don\'?t\s+care", # "You don't care"
-        ],
-        "violent_words": [
-            # Insults
-            "idiot", "stupid", "dumb", "crazy", "lazy", "useless", "worthless", "failure", "loser", "jerk", "asshole",
-            "bitch", "bastard", "dick", "cunt", "shit", "fuck", "damn", "hell", "piss", "crap", "suck",
-            "psycho", "insane", "narcissist", "toxic", "abusive", "trash", "garbage",
-            
-            # Threats/Violence
-            "kill", "punch", "hit", "slap", "beat", "hurt", "smack", "kick", "choke", "murder", "dead", "die",
-            "hate", "despise", "disgusting", "pathetic", "shut up"
-        ],
-        "pseudo_feelings": [
-            "ignored", "betrayed", "abandoned", "manipulated", "rejected", 
-            "unappreciated", "unheard", "unwanted", "used", "attacked", 
-            "blamed", "cheated", "cornered", "criticized", "distrusted",
-            "intimidated", "let down", "misunderstood", "neglected", "overworked",
-            "patronized", "pressured", "provoked", "put down", "threatened", "unloved", "unseen"
-        ]
-    }
-    db.collection('config_metadata').document('validation_rules').set(validation_rules)
-    print(" - Validation Rules seeded.")
-
-    # 3. TEMPLATES
-    templates = {
-        "default_nvc": {
-            "structure": "When {observation}, I feel {feeling} because I need {need}. Would you be willing to {request}?",
-            "fields": ["observation", "feeling", "need", "request"]
+# 1. NVC VOCABULARY (Feelings & Needs)
+# Feelings (Source: Hoffman Institute)
+FEELINGS = {
+    "categories": [
+        {
+            "name": "Happy",
+            "icon": "sentiment_satisfied_alt",
+            "words": [
+                "Amused", "Delighted", "Glad", "Joyful", "Pleased", "Satisfied", "Content", "Charmed", "Grateful", "Optimistic",
+                "Ecstatic", "Thrilled", "Elated", "Jubilant", "Euphoric", "Enthusiastic", "Excited", "Overjoyed"
+            ]
+        },
+        {
+            "name": "Sad",
+            "icon": "sentiment_dissatisfied",
+            "words": [
+                "Depressed", "Despair", "Dejected", "Heavy", "Crushed", "Disappointed", "Dismayed", "Dampened",
+                "Grief", "Weepy", "Miserable", "Melancholy", "Sorrowful", "Mournful", "Gloomy", "Hopeless", "Heartbroken"
+            ]
+        },
+        {
+            "name": "Angry",
+            "icon": "whatshot",
+            "words": [
+                "Annoyed", "Agitated", "Fed up", "Irritated", "Mad", "Critical", "Resentful", "Disgusted", "Outraged", "Raging",
+                "Furious", "Livid", "Bitter", "Indignant", "Irate", "Hostile", "Vengeful", "Wrathful"
+            ]
+        },
+        {
+            "name": "Afraid",
+            "icon": "error_outline",
+            "words": [
+                "Anxious", "Apprehensive", "Cautious", "Concerned", "Dread", "Fearful", "Foreboding", "Frightened", "Mistrustful",
+                "Panicked", "Petrified", "Scared", "Suspicious", "Terrified", "Wary", "Worried", "Insecure", "Nervous"
+            ]
+        },
+        {
+            "name": "Confused",
+            "icon": "question_mark",
+            "words": [
+                "Baffled", "Bewildered", "Dazed", "Disoriented", "Distracted", "Doubtful", "Flustered", "Hesitant", "Lost",
+                "Mystified", "Perplexed", "Puzzled", "Skeptical", "Torn", "Uncertain", "Undecided", "Unsure"
+            ]
+        },
+        {
+            "name": "Strong",
+            "icon": "fitness_center",
+            "words": [
+                "Empowered", "Capable", "Confident", "Determined", "Energetic", "Forceful", "Invincible", "Mighty", "Powerful",
+                "Resilient", "Robust", "Secure", "Steady", "Sure", "Tough", "Vigorous", "Bold", "Brave"
+            ]
+        },
+        {
+            "name": "Inspired",
+            "icon": "lightbulb",
+            "words": [
+                "Amazed", "Awed", "Wonder", "Eager", "Keen", "Inspired", "Moved", "Touched", "Stimulated", "Motivated",
+                "Creative", "Imaginative", "Insightful", "Visionary", "Awakened", "Enlightened"
+            ]
+        },
+        {
+            "name": "Relaxed",
+            "icon": "spa",
+            "words": [
+                "Calm", "Comfortable", "Composed", "Cool", "Easy", "Mellow", "Peaceful", "Quiet", "Restful",
+                "Serene", "Still", "Tranquil", "Unflappable", "Untroubled", "At ease", "Soothed", "Relieved"
+            ]
+        },
+        {
+            "name": "Loving",
+            "icon": "favorite",
+            "words": [
+                "Affectionate", "Caring", "Compassionate", "Fond", "Friendly", "Loving", "Open", "Sympathetic", "Tender",
+                "Warm", "Adoring", "Cherishing", "Devoted", "Doting", "Infatuated", "Passionate", "Yearning", "Sentimental"
+            ]
+        }
+    ]
+}
+
+# Needs (Source: Andrew Benjamin George / CNVC)
+NEEDS = {
+    "categories": [
+        {
+            "name": "Connection",
+            "icon": "group",
+            "words": [
+                "Acceptance", "Affection", "Appreciation", "Belonging", "Cooperation", "Communication", "Closeness", "Community",
+                "Companionship", "Compassion", "Consideration", "Consistency", "Empathy", "Inclusion", "Intimacy", "Love",
+                "Mutuality", "Nurturing", "Respect", "Safety", "Security", "Stability", "Support", "To know and be known",
+                "To see and be seen", "To understand and be understood", "Trust", "Warmth"
+            ]
+        },
+        {
+            "name": "Physical Well-Being",
+            "icon": "accessibility_new",
+            "words": [
+                "Air", "Food", "Movement", "Exercise", "Rest", "Sleep", "Shelter", "Touch", "Water", "Sexual Expression"
+            ]
+        },
+        {
+            "name": "Honesty",
+            "icon": "verified",
+            "words": [
+                "Authenticity", "Integrity", "Presence", "Transparency", "Truth", "Congruence"
+            ]
+        },
+        {
+            "name": "Play",
+            "icon": "sports_esports",
+            "words": [
+                "Joy", "Humor", "Fun", "Recreation", "Amusement", "Laughter", "Adventure"
+            ]
+        },
+        {
+            "name": "Peace",
+            "icon": "landscape",
+            "words": [
+                "Beauty", "Communion", "Ease", "Equality", "Harmony", "Inspiration", "Order", "Serenity", "Tranquility", "Balance"
+            ]
+        },
+        {
+            "name": "Autonomy",
+            "icon": "flight",
+            "words": [
+                "Choice", "Freedom", "Independence", "Space", "Spontaneity", "Empowerment"
+            ]
+        },
+        {
+            "name": "Meaning",
+            "icon": "stars",
+            "words": [
+                "Awareness", "Celebration of life", "Challenge", "Clarity", "Competence", "Consciousness", "Contribution",
+                "Creativity", "Discovery", "Efficacy", "Effectiveness", "Growth", "Hope", "Learning", "Mourning", "Participation",
+                "Purpose", "Self-expression", "Stimulation", "To matter", "Understanding"
+            ]
         }
+    ]
+}
+
+# 2. VALIDATION RULES (Blame & Pseudo-feelings & Violent Speech)
+VALIDATION_RULES = {
+    "blame_patterns": [
+        r"(?i)\byou\s+(always|never)",  # "You always", "You never"
+        r"(?i)\byou\s+made\s+me",      # "You made me"
+        r"(?i)\byou\s+should",         # "You should"
+        r"(?i)\byou\s+must",           # "You must"
+        r"(?i)\byou\s+are\s+(so|too|just)", # "You are so..."
+        r"(?i)\byour\s+fault",         # "Your fault"
+        r"(?i)\bblame\s+you",          # "Blame you"
+        r"(?i)\bif\s+you\s+loved\s+me", # "If you loved me"
+        r"(?i)\bwhy\s+can\'?t\s+you",  # "Why can't you"
+        r"(?i)\byou\s+don\'?t\s+care", # "You don't care"
+    ],
+    "violent_words": [
+        # Insults
+        "idiot", "stupid", "dumb", "crazy", "lazy", "useless", "worthless", "failure", "loser", "jerk", "asshole",
+        "bitch", "bastard", "dick", "cunt", "shit", "fuck", "damn", "hell", "piss", "crap", "suck",
+        "psycho", "insane", "narcissist", "toxic", "abusive", "trash", "garbage",
+
+        # Threats/Violence
+        "kill", "punch", "hit", "slap", "beat", "hurt", "smack", "kick", "choke", "murder", "dead", "die",
+        "hate", "despise", "disgusting", "pathetic", "shut up"
+    ],
+    "pseudo_feelings": [
+        "ignored", "betrayed", "abandoned", "manipulated", "rejected", 
+        "unappreciated", "unheard", "unwanted", "used", "attacked", 
+        "blamed", "cheated", "cornered", "criticized", "distrusted",
+        "intimidated", "let down", "misunderstood", "neglected", "overworked",
+        "patronized", "pressured", "provoked", "put down", "threatened", "unloved", "unseen"
+    ]
+}
+
+# 3. TEMPLATES
+TEMPLATES = {
+    "default_nvc": {
+        "structure": "When {observation}, I feel {feeling} because I need {need}. Would you be willing to {request}?",
+        "fields": ["observation", "feeling", "need", "request"]
     }
-    db.collection('config_metadata').document('templates').set(templates)
-    print(" - Templates seeded.")
+}
+
+# The vocabulary documents (see VOCABULARY_DOCUMENTS in app/main.py); the bundle holds their English copies
+BUNDLE_PARTS = {
+    "feelings": ('nvc_vocabulary', 'feelings'),
+    "needs": ('nvc_vocabulary', 'needs'),
+    "validation_rules": ('config_metadata', 'validation_rules'),
+}
+
+
+# Vocabulary and rules per locale. A locale may leave out documents that
+# aren't translated yet: the backend serves the English ones in their place.
+LOCALES = {
+    "en": {"feelings": FEELINGS, "needs": NEEDS, "validation_rules": VALIDATION_RULES},
+}
+
+
+def _unique(words, seen, where):
+    """Drops words (case-insensitively) already recorded in `seen`, reporting each one."""
+    kept = []
+    for word in words:
+        key = word.casefold()
+        if key in seen:
+            print(f"   ! Dropped duplicate '{word}' from {where} (already in {seen[key]})")
+            continue
+        seen[key] = where
+        kept.append(word)
+    return kept
+
+
+def normalize_vocabulary(data):
+    """Sorts each category's words; a word listed in several categories stays only in the first."""
+    seen = {}
+    return {**data, "categories": [
+        {**category, "words": sorted(_unique(category["words"], seen, category["name"]), key=str.casefold)}
+        for category in data["categories"]
+    ]}
+
+
+def normalize_rules(rules):
+    """Sorts and deduplicates the word lists; pattern order is kept."""
+    return {
+        "blame_patterns": _unique(rules["blame_patterns"], {}, "blame_patterns"),
+        "violent_words": sorted(_unique(rules["violent_words"], {}, "violent_words"), key=str.casefold),
+        "pseudo_feelings": sorted(_unique(rules["pseudo_feelings"], {}, "pseudo_feelings"), key=str.casefold),
+    }
+
+
+def build_documents():
+    """The documents exactly as they are stored, keyed by (collection, document)."""
+    documents = {}
+    for locale, parts in LOCALES.items():
+        for name, data in parts.items():
+            collection, document = BUNDLE_PARTS[name]
+            normalize = normalize_rules if name == "validation_rules" else normalize_vocabulary
+            documents[(collection, localized_document_id(document, locale))] = normalize(data)
+    documents[('config_metadata', 'templates')] = TEMPLATES
+    return documents
+
+
+def write_bundle(path, bundle):
+    """Writes the bundle compactly, replacing the file atomically; returns False if it was already current."""
+    body = json.dumps(bundle, sort_keys=True, separators=(",", ":"), ensure_ascii=False) + "\n"
+    try:
+        with open(path, encoding="utf-8") as f:
+            if f.read() == body:
+                return False
+    except FileNotFoundError:
+        pass
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        f.write(body)
+    os.replace(temporary, path)
+    return True
+
+
+def seed_database(client=None, bundle_path=BUNDLE_PATH, dry_run=False):
+    """
+    Writes the documents that differ from Firestore in one batch and returns
+    {"version", "written", "unchanged"} (document paths). A bundle_path of
+    None skips the bundle.
+    """
+    client = client or db
+    print("Seeding NVC Database with Expanded Vocabulary...")
+
+    documents = build_documents()
+    refs = {key: client.collection(key[0]).document(key[1]) for key in [*documents, MANIFEST]}
+    keys_by_path = {ref.path: key for key, ref in refs.items()}
+    # One round trip reads every document and the manifest
+    current = {keys_by_path[doc.reference.path]: doc.to_dict() if doc.exists else None
+               for doc in client.get_all(list(refs.values()))}
+    manifest = current.get(MANIFEST) or {}
+
+    hashes = {"/".join(key): content_hash(data) for key, data in documents.items()}
+    changed = [key for key in documents
+               if current.get(key) is None or content_hash(current[key]) != hashes["/".join(key)]]
+    version = manifest.get("version", 0)
+    for key in documents:
+        print(f" - {'/'.join(key)}: {'changed' if key in changed else 'unchanged'}")
+
+    if dry_run:
+        print(f"Dry run: {len(changed)} document(s) would be written.")
+        return {"version": version, "written": [], "unchanged": ["/".join(k) for k in documents if k not in changed]}
+
+    if changed or manifest.get("hashes") != hashes:
+        version += 1
+        batch = client.batch()
+        for key in changed:
+            batch.set(refs[key], documents[key])
+        batch.set(refs[MANIFEST], {
+            "version": version,
+            "hashes": hashes,
+            "updated_at": datetime.datetime.now(datetime.timezone.utc),
+        })
+        batch.commit()
+        print(f" - Wrote {len(changed)} document(s) as content version {version}.")
+    else:
+        print(f" - Nothing to write, content version {version} is current.")
+
+    if bundle_path:
+        bundle = build_bundle({name: documents[key] for name, key in BUNDLE_PARTS.items()}, version)
+        print(f" - Bundle {'written to' if write_bundle(bundle_path, bundle) else 'unchanged at'} {bundle_path}.")
 
     print("Database seeding complete!")
+    return {
+        "version": version,
+        "written": ["/".join(k) for k in changed],
+        "unchanged": ["/".join(k) for k in documents if k not in changed],
+    }
+
 
 if __name__ == "__main__":
-    seed_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Seed Firestore with the NVC vocabulary and rules.")
+    parser.add_argument("--dry-run", action="store_true", help="report which documents would change and write nothing")
+    parser.add_argument("--bundle", default=BUNDLE_PATH, help="where to write the vocabulary bundle")
+    parser.add_argument("--no-bundle", action="store_true", help="don't write the vocabulary bundle")
+    args = parser.parse_args()
+    seed_database(bundle_path=None if args.no_bundle else args.bundle, dry_run=args.dry_run)
@@ -0,0 +1,56 @@
+import argparse
+import logging
+import os
+
+import firebase_admin
+from firebase_admin import firestore
+
+from app.sweeper import Sweeper, FirestoreCheckpoints, default_targets
+
+# Deletes expired Firestore data: AI cache entries past their TTL and ended sessions.
+# Safe to run repeatedly (e.g. as a Cloud Run job on a Cloud Scheduler trigger);
+# an interrupted run resumes where it stopped.
+PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", "peacekeeper-483320")
+
+# Matches CACHE_TTL_SECONDS in app/main.py
+CACHE_TTL_SECONDS = 600
+SESSION_RETENTION_HOURS = float(os.getenv("SESSION_RETENTION_HOURS", "24"))
+
+if not firebase_admin._apps:
+    firebase_admin.initialize_app(options={'projectId': PROJECT_ID})
+
+db = firestore.client()
+
+def sweep_database(args):
+    targets = default_targets(CACHE_TTL_SECONDS, args.session_retention_hours * 3600)
+    if args.target:
+        targets = [t for t in targets if t.name in args.target]
+    checkpoints = FirestoreCheckpoints(db)
+    if args.reset:
+        for target in targets:
+            checkpoints.clear(target.name)
+
+    sweeper = Sweeper(db, checkpoints, batch_size=args.batch_size,
+                      max_deletes_per_second=args.rate, dry_run=args.dry_run)
+    print(f"Sweeping expired data in project {PROJECT_ID}{' (dry run)' if args.dry_run else ''}...")
+    for target in targets:
+        result = sweeper.sweep(target, max_documents=args.max_documents)
+        verb = "would delete" if args.dry_run else "deleted"
+        state = "done" if result.complete else "paused, run again to continue"
+        print(f" - {target.collection}: {verb} {result.scanned if args.dry_run else result.deleted} "
+              f"documents in {result.pages} pages ({state})")
+    print("Sweep complete!")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s", datefmt="%H:%M:%S")
+    parser = argparse.ArgumentParser(description="Delete expired AI cache entries and sessions from Firestore")
+    parser.add_argument("--target", action="append", choices=[t.name for t in default_targets(0, 0)],
+                        help="Only sweep this target (repeatable, default: all)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Documents per query page and write batch")
+    parser.add_argument("--rate", type=float, default=200.0, help="Maximum deletes per second")
+    parser.add_argument("--max-documents", type=int, help="Pause each target after about this many documents")
+    parser.add_argument("--session-retention-hours", type=float, default=SESSION_RETENTION_HOURS,
+                        help="Delete sessions (no expiresAt) this long after createdAt (default 24)")
+    parser.add_argument("--dry-run", action="store_true", help="Count expired documents without deleting")
+    parser.add_argument("--reset", action="store_true", help="Discard saved progress and start a fresh pass")
+    sweep_database(parser.parse_args())
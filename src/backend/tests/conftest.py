@@ -0,0 +1,23 @@
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+import pytest
+
+@pytest.fixture(autouse=True)
+def offline_clients():
+    """
+    Firestore and Vertex AI are mocks in every test, so the suite needs no
+    Google Cloud credentials. Patching `app.main.db.collection` and the like
+    patches the mock; tests that need other behavior patch `app.main.db` itself.
+    """
+    clients = {"firestore": main.db, "vertex_ai": main.model}
+    for name, client in clients.items():
+        client.override(MagicMock(name=name))
+    yield
+    for client in clients.values():
+        client.reset()
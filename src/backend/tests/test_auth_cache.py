@@ -0,0 +1,106 @@
+from unittest.mock import patch, MagicMock
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+import asyncio
+import time
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+import pytest
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    main.token_cache.clear()
+    main.tokens_revoked_at.clear()
+    user = MagicMock(disabled=False, tokens_valid_after_timestamp=0)
+    with patch("app.main.auth.get_user", return_value=user) as get_user:
+        yield get_user
+    main.token_cache.clear()
+    main.tokens_revoked_at.clear()
+
+def verify(token):
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    return asyncio.run(main.verify_firebase_token(creds))
+
+def decoded(uid, iat=None, exp_in=3600):
+    now = time.time()
+    return {"uid": uid, "iat": iat if iat is not None else now - 10, "exp": now + exp_in}
+
+@patch("app.main.auth.verify_id_token")
+def test_repeated_token_is_verified_once(mock_verify):
+    mock_verify.return_value = decoded("alice")
+    assert verify("token-a") == "alice"
+    assert verify("token-a") == "alice"
+    assert mock_verify.call_count == 1
+    assert main.token_cache.stats()["hits"] == 1
+
+@patch("app.main.auth.verify_id_token")
+def test_token_without_exp_is_not_cached(mock_verify):
+    mock_verify.return_value = {"uid": "alice"}
+    verify("token-a")
+    verify("token-a")
+    assert mock_verify.call_count == 2
+
+@patch("app.main.auth.verify_id_token")
+def test_revocation_rejects_cached_and_fresh_tokens(mock_verify):
+    mock_verify.return_value = decoded("alice")
+    verify("token-a")
+    main.revoke_cached_tokens("alice")
+
+    with pytest.raises(HTTPException) as exc:
+        verify("token-a")
+    assert exc.value.status_code == 401
+
+    # Re-verifying the same old token must not put it back in the cache
+    with pytest.raises(HTTPException):
+        verify("token-a")
+
+    # A token issued after the revocation is accepted again
+    mock_verify.return_value = decoded("alice", iat=time.time() + 1)
+    assert verify("token-b") == "alice"
+
+@patch("app.main.auth.verify_id_token")
+def test_failed_verification_is_not_cached(mock_verify):
+    mock_verify.side_effect = Exception("Invalid token")
+    with pytest.raises(HTTPException):
+        verify("bad")
+    with pytest.raises(HTTPException):
+        verify("bad")
+    assert mock_verify.call_count == 2
+
+@patch("app.main.auth.verify_id_token")
+def test_revoked_token_rejects_the_users_cached_tokens(mock_verify, clear_caches):
+    issued = time.time() - 60
+    mock_verify.return_value = decoded("alice", iat=issued)
+    assert verify("phone-token") == "alice"
+
+    # Refresh tokens revoked (sign-out everywhere, password change): a token seen for the first time is checked
+    clear_caches.return_value = MagicMock(disabled=False, tokens_valid_after_timestamp=(issued + 30) * 1000)
+    with pytest.raises(HTTPException):
+        verify("tablet-token")
+    # ...and the cached token issued before the revocation stops working without a lookup
+    with pytest.raises(HTTPException):
+        verify("phone-token")
+    assert clear_caches.call_count == 2
+
+@patch("app.main.auth.verify_id_token")
+def test_disabled_account_is_rejected(mock_verify, clear_caches):
+    mock_verify.return_value = decoded("mallory")
+    clear_caches.return_value = MagicMock(disabled=True, tokens_valid_after_timestamp=0)
+    with pytest.raises(HTTPException) as exc:
+        verify("token-a")
+    assert exc.value.status_code == 401
+    assert len(main.token_cache) == 0
+
+@patch("app.main.auth.verify_id_token")
+def test_cache_hits_are_timed_as_hits_only(mock_verify):
+    mock_verify.return_value = decoded("alice")
+    hits, misses = (main.AUTH_DURATION.count(cached=label) for label in ("true", "false"))
+    verify("token-a")
+    verify("token-a")
+    assert main.AUTH_DURATION.count(cached="true") == hits + 1
+    assert main.AUTH_DURATION.count(cached="false") == misses + 1
@@ -0,0 +1,78 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app, verify_firebase_token
+import pytest
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def setup():
+    main.ai_cache.clear()
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+    main.ai_cache.clear()
+
+def gemini_reply(prompt):
+    reply = MagicMock()
+    if "core emotions" in prompt:
+        reply.text = "Hurt, Tired, Lonely"
+    elif "universal human needs" in prompt:
+        raise RuntimeError("quota exceeded")
+    else:
+        reply.text = "Judgment: Yes\nAlternatives: When the dishes stayed in the sink"
+    return reply
+
+@patch("app.main.save_cached_response")
+@patch("app.main.db.get_all", return_value=[])
+def test_expression_step_runs_tasks_with_per_task_errors(mock_get_all, mock_save):
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = gemini_reply
+        response = client.post("/ai/expression-step", json={
+            "user_id": "test_user",
+            "tasks": [
+                {"task": "neutralize", "text": "You never clean"},
+                {"task": "feelings", "text": "You never clean"},
+                {"task": "needs", "text": "You never clean", "context": {"feelings": "hurt"}},
+            ],
+        })
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["task"] for r in results] == ["neutralize", "feelings", "needs"]
+    assert results[0]["response"]["is_offensive"] is True
+    assert results[1]["response"]["result"] == ["hurt", "tired", "lonely"]
+    assert results[2]["status_code"] == 502
+    # Upstream error details are logged, not returned
+    assert "quota exceeded" not in results[2]["error"]
+    # One bulk lookup instead of one read per task
+    assert mock_get_all.call_count == 1
+    # Only the non-offensive success is cached
+    assert mock_save.call_count == 1
+
+def test_expression_step_serves_l1_hits_without_firestore():
+    key = main.AI_TASKS["feelings"].cache_key("test_user", "You never clean", {})
+    main.ai_cache.set(main._cache_key(key), ["sad"])
+    with patch("app.main.db.get_all") as mock_get_all:
+        response = client.post("/ai/expression-step", json={
+            "user_id": "test_user",
+            "tasks": [{"task": "feelings", "text": "You never clean"}],
+        })
+    result = response.json()["results"][0]["response"]
+    assert result == {"result": ["sad"], "alternatives": None, "is_offensive": False, "from_cache": True,
+                      "engine": "gemini"}
+    mock_get_all.assert_not_called()
+
+def test_expression_step_rejects_unknown_task():
+    response = client.post("/ai/expression-step", json={
+        "user_id": "test_user",
+        "tasks": [{"task": "summarize", "text": "x"}],
+    })
+    assert response.status_code == 422
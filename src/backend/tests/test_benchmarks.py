@@ -0,0 +1,83 @@
+import asyncio
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import app.main as main
+from benchmarks.fakes import FakeFirestore, FakeGemini, Latency
+from benchmarks.run import BenchConfig, SCENARIOS, run_benchmarks, compare, percentile
+
+def test_latency_distributions_are_seeded_and_bounded():
+    a = Latency.parse("lognormal:100:0.5", seed=7)
+    b = Latency.parse("lognormal:100:0.5", seed=7)
+    assert [a.sample_ms() for _ in range(5)] == [b.sample_ms() for _ in range(5)]
+    assert Latency.parse("fixed:12").sample_ms() == 12
+    assert all(10 <= Latency.parse("uniform:10:20", seed=1).sample_ms() <= 20 for _ in range(20))
+    assert Latency.parse("normal:0:50", seed=1).sample_ms() >= 0
+    with pytest.raises(ValueError):
+        Latency.parse("pareto:1")
+
+def test_fake_firestore_batches_and_get_all():
+    db = FakeFirestore()
+    batch = db.batch()
+    batch.set(db.collection("c").document("a"), {"x": 1})
+    batch.set(db.collection("c").document("b"), {"x": 2})
+    batch.commit()
+    docs = db.get_all([db.collection("c").document(k) for k in ("a", "b", "z")])
+    assert [(d.id, d.exists) for d in docs] == [("a", True), ("b", True), ("z", False)]
+    assert [d.id for d in db.collection("c").stream()] == ["a", "b"]
+    db.clear_collection("c")
+    assert not db.collection("c").document("a").get().exists
+
+def test_fake_gemini_streams_the_full_reply():
+    gemini = FakeGemini()
+
+    async def collect():
+        stream = await gemini.generate_content_async("reflection for the LISTENER", stream=True)
+        return "".join([chunk.text async for chunk in stream])
+
+    assert asyncio.run(collect()) == FakeGemini.REPLIES["reflection for the LISTENER"]
+
+def test_every_scenario_runs_without_errors_and_restores_the_app():
+    before = {name: getattr(main, name) for name in main.process_state.names}
+    config = BenchConfig(requests=12, concurrency=4, distinct=6, users=3, gemini_latency="fixed:0",
+                         firestore_read_latency="fixed:0", firestore_write_latency="fixed:0", auth_latency="fixed:0")
+    report = run_benchmarks(config)
+
+    assert set(report["scenarios"]) == {s.name for s in SCENARIOS}
+    for name, result in report["scenarios"].items():
+        assert result["requests"] == 12, name
+        assert result["errors"] == 0, (name, result["statuses"])
+    assert report["scenarios"]["vocabulary_revalidate"]["statuses"] == {"304": 12}
+    # One call per distinct input: repeats come from the cache or join the call in flight
+    assert report["scenarios"]["feelings"]["gemini_calls"] <= 6
+    assert all(getattr(main, name) is value for name, value in before.items())
+
+def test_compare_flags_throughput_and_tail_regressions():
+    baseline = {"scenarios": {"feelings": {"requests_per_second": 100.0, "p99_ms": 50.0, "errors": 0}}}
+    ok = {"scenarios": {"feelings": {"requests_per_second": 90.0, "p99_ms": 55.0, "errors": 0}}}
+    slow = {"scenarios": {"feelings": {"requests_per_second": 60.0, "p99_ms": 90.0, "errors": 0}}}
+    assert compare(ok, baseline) == []
+    assert len(compare(slow, baseline)) == 2
+    assert percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 0.5) == 5
+    assert percentile([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], 0.99) == 10
+
+def test_rule_benchmark_reports_throughput_and_times_out_backtracking():
+    from benchmarks.rules import RuleBenchConfig, compare_rule_reports, run_rule_benchmark
+    rules = {"blame_patterns": [r"(?i)\byou\s+should"], "violent_words": ["idiot", "shut up"], "pseudo_feelings": []}
+    config = RuleBenchConfig(corpus_texts=50, rounds=1, input_chars=2000, repeat=1, timeout_ms=500, corpus_timeout_s=5)
+    report = run_rule_benchmark(rules, config)
+    assert report["corpus"]["matches"] > 0 and report["corpus"]["matches_per_second"] > 0
+    assert report["timed_out"] == [] and report["worst_case_ms"] == max(report["pathological_ms"].values())
+    assert compare_rule_reports(report, report) == []
+
+    slower = {**report, "pathological_ms": {**report["pathological_ms"], "repeated_you": 1000.0}}
+    assert compare_rule_reports(slower, report) == [f"repeated_you: 1000.0 ms (baseline {report['pathological_ms']['repeated_you']} ms)"]
+
+    # Exponential on a long run of "a", which only one pathological input has
+    stuck = run_rule_benchmark({**rules, "blame_patterns": [r"(a+a+)+b"]}, config._replace(timeout_ms=200))
+    assert stuck["timed_out"] == ["no_word_boundaries"] and stuck["worst_case_ms"] is None
+    assert compare_rule_reports(stuck, {}) == ["no_word_boundaries: timed out"]
@@ -0,0 +1,80 @@
+from unittest.mock import patch, MagicMock
+import asyncio
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.cache import TTLCache, WriteBehindWriter
+import app.main as main
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# --- TTLCache ---
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=600, clock=clock)
+    cache.set("k", "v")
+    assert cache.get("k") == "v"
+    clock.now = 601
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=600)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+# --- WriteBehindWriter ---
+
+def test_write_behind_coalesces_and_flushes():
+    written = []
+    writer = WriteBehindWriter(lambda docs: written.append(dict(docs)), linger=0.05)
+    writer.submit("k1", {"response": "a"})
+    writer.submit("k1", {"response": "b"})
+    writer.submit("k2", {"response": "c"})
+    assert writer.flush(timeout=2)
+    merged = {}
+    for batch in written:
+        merged.update(batch)
+    assert merged == {"k1": {"response": "b"}, "k2": {"response": "c"}}
+    assert writer.stats()["failed"] == 0
+
+# --- get/save_cached_response ---
+
+def test_saved_response_is_served_from_l1_without_firestore():
+    main.ai_cache.clear()
+    with patch("app.main.cache_writer") as mock_writer, patch("app.main.db.collection") as mock_db:
+        asyncio.run(main.save_cached_response(["u", "feelings", "text"], ["sad"]))
+        cached = asyncio.run(main.get_cached_response(["u", "feelings", "text"]))
+    assert cached == ["sad"]
+    mock_writer.submit.assert_called_once()
+    mock_db.assert_not_called()
+
+def test_firestore_hit_populates_l1():
+    main.ai_cache.clear()
+    doc = MagicMock()
+    doc.exists = True
+    doc.to_dict.return_value = {"response": "cached", "timestamp": main.time.time()}
+    with patch("app.main.db.collection") as mock_db:
+        mock_db.return_value.document.return_value.get.return_value = doc
+        first = asyncio.run(main.get_cached_response(["u", "neutralize", "x"]))
+        second = asyncio.run(main.get_cached_response(["u", "neutralize", "x"]))
+    assert first == second == "cached"
+    assert mock_db.call_count == 1
@@ -0,0 +1,87 @@
+from unittest.mock import MagicMock
+import sys
+import os
+import time
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app.cache_backends import (
+    FirestoreCacheBackend, SQLiteCacheBackend, MemoryCacheBackend, build_cache_backend,
+)
+
+def doc(response, age=0.0):
+    return {"response": response, "timestamp": time.time() - age}
+
+# --- SQLite ---
+
+def test_sqlite_round_trip_and_ttl(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))
+    backend.set_many({"fresh": doc(["sad", "tired"], age=10), "stale": doc("old", age=700)})
+    hits = backend.get_many(["fresh", "stale", "missing"], ttl=600)
+    assert list(hits) == ["fresh"]
+    response, remaining = hits["fresh"]
+    assert response == ["sad", "tired"]
+    assert 589 < remaining <= 590
+    assert backend.purge_expired(ttl=600) == 1
+    assert backend.stats()["rows"] == 1
+
+def test_sqlite_file_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer, reader = SQLiteCacheBackend(path), SQLiteCacheBackend(path)
+    writer.set_many({"k": doc({"result": "x"})})
+    assert reader.get_many(["k"], ttl=600)["k"][0] == {"result": "x"}
+    journal_mode = reader._connection().execute("PRAGMA journal_mode").fetchone()[0]
+    assert journal_mode == "wal"
+    writer.close()
+    reader.close()
+
+def test_sqlite_bulk_lookup_beyond_parameter_limit(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))
+    backend.set_many({f"k{i}": doc(i) for i in range(1200)})
+    hits = backend.get_many([f"k{i}" for i in range(1300)], ttl=600)
+    assert len(hits) == 1200
+    assert hits["k1199"][0] == 1199
+
+def test_sqlite_purges_periodically_on_write(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), purge_every=2, ttl=600)
+    backend.set_many({"old": doc("x", age=1000)})
+    backend.set_many({"new": doc("y")})
+    assert backend.purged == 1
+    assert backend.stats()["rows"] == 1
+
+# --- Memory ---
+
+def test_memory_backend_expires_by_timestamp():
+    now = [1000.0]
+    backend = MemoryCacheBackend(clock=lambda: now[0])
+    backend.set_many({"k": {"response": "v", "timestamp": 1000.0}})
+    assert backend.get_many(["k"], ttl=600) == {"k": ("v", 600.0)}
+    now[0] = 1601.0
+    assert backend.get_many(["k"], ttl=600) == {}
+
+# --- Firestore ---
+
+def test_firestore_backend_uses_single_get_and_bulk_get_all():
+    client = MagicMock()
+    hit = MagicMock(exists=True, id="b")
+    hit.to_dict.return_value = doc("cached")
+    miss = MagicMock(exists=False, id="c")
+    client.get_all.return_value = [miss, hit]
+    client.collection.return_value.document.return_value.get.return_value = hit
+
+    backend = FirestoreCacheBackend(lambda: client)
+    assert backend.get_many(["a"], ttl=600)["a"][0] == "cached"
+    assert list(backend.get_many(["b", "c"], ttl=600)) == ["b"]
+    assert client.get_all.call_count == 1
+
+    backend.set_many({"x": doc(1), "y": doc(2)})
+    assert client.batch.return_value.set.call_count == 2
+    client.batch.return_value.commit.assert_called_once()
+
+def test_build_cache_backend_rejects_unknown_names(tmp_path):
+    assert build_cache_backend("memory", lambda: None, "").name == "memory"
+    assert build_cache_backend("SQLite", lambda: None, str(tmp_path / "c.sqlite3")).name == "sqlite"
+    with pytest.raises(ValueError):
+        build_cache_backend("lmdb", lambda: None, "")
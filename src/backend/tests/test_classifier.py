@@ -0,0 +1,124 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, AsyncMock
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app, verify_firebase_token
+from app.classifier import NeutralityClassifier, KIND_OBSERVATION, KIND_REQUEST
+from app.safety import SafetyMatcher
+import pytest
+
+client = TestClient(app)
+
+MATCHER = SafetyMatcher.from_rules({
+    "blame_patterns": [r"(?i)\byou\s+made\s+me"],
+    "violent_words": ["lazy", "idiot"],
+    "pseudo_feelings": ["ignored"],
+})
+
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+
+# --- Unit Tests ---
+
+@pytest.mark.parametrize("text", [
+    "I saw the dishes in the sink at 9pm",
+    "I came home at 7 and the lights were off",
+])
+def test_neutral_observations_skip(text):
+    classifier = NeutralityClassifier(threshold=0.85)
+    assert classifier.is_confidently_neutral(text, KIND_OBSERVATION, MATCHER)
+
+@pytest.mark.parametrize("text", [
+    "You are lazy",                          # violent word
+    "You made me late",                      # blame pattern
+    "You never listen to me",                # absolute
+    "You were so rude at dinner",            # evaluative
+    "You did that on purpose",               # intent
+    "The dishes were in the sink AGAIN!",    # shouting + exclamation
+    "Dishes",                                # too short to judge
+])
+def test_flagged_or_uncertain_observations_go_to_model(text):
+    classifier = NeutralityClassifier(threshold=0.85)
+    assert not classifier.is_confidently_neutral(text, KIND_OBSERVATION, MATCHER)
+
+@pytest.mark.parametrize("text,kind", [
+    # Judgments no lexicon lists: nothing positive makes them neutral
+    ("My partner is a liar", KIND_OBSERVATION),
+    ("You humiliated me at the party", KIND_OBSERVATION),
+    ("The way you talked to my mother", KIND_OBSERVATION),
+    ("Would you shut your mouth tonight", KIND_OBSERVATION),
+    ("Would you shut your mouth tonight", KIND_REQUEST),
+    ("Could you grow up before dinner", KIND_REQUEST),
+])
+def test_evaluative_text_without_lexicon_words_goes_to_model(text, kind):
+    classifier = NeutralityClassifier(threshold=0.85)
+    assert not classifier.is_confidently_neutral(text, kind, MATCHER)
+
+@pytest.mark.parametrize("text,kind", [
+    ("We talked for 5 minutes and you walked away like a coward", KIND_OBSERVATION),
+    ("I found out you lied to me on Monday", KIND_OBSERVATION),
+    ("I feel like you don't love me anymore since Tuesday", KIND_OBSERVATION),
+    ("I saw you come home drunk at 2am", KIND_OBSERVATION),
+    ("Would you be willing to shut your mouth tonight", KIND_REQUEST),
+    ("I saw you leave the house at 8", KIND_OBSERVATION),
+    ("Would you be willing to call me when you leave work today?", KIND_REQUEST),
+])
+def test_judgments_with_concrete_details_go_to_model(text, kind):
+    classifier = NeutralityClassifier(threshold=0.85)
+    assert classifier.assess(text, kind, MATCHER).confidence == 0.0
+    assert not classifier.is_confidently_neutral(text, kind, MATCHER)
+
+def test_no_single_signal_clears_the_threshold():
+    classifier = NeutralityClassifier(threshold=0.85)
+    # A number or weekday alone isn't evidence of neutrality
+    assert not classifier.is_confidently_neutral("The dishes were in the sink at 9pm", KIND_OBSERVATION, MATCHER)
+    assert not classifier.is_confidently_neutral("The party was on Monday", KIND_OBSERVATION, MATCHER)
+    # Starting with "I" doesn't cancel the sentence being about "you"
+    assessment = classifier.assess("I saw you at the store at 5pm", KIND_OBSERVATION, MATCHER)
+    assert "first_person" not in assessment.reasons
+    assert assessment.confidence < 0.85
+
+def test_requests_need_a_willing_concrete_ask():
+    classifier = NeutralityClassifier(threshold=0.85)
+    assert classifier.is_confidently_neutral("Would you be willing to wash the dishes tonight?", KIND_REQUEST, MATCHER)
+    assert not classifier.is_confidently_neutral("Would you be willing to be nicer", KIND_REQUEST, MATCHER)
+    assert not classifier.is_confidently_neutral("Wash the dishes", KIND_REQUEST, MATCHER)
+    stats = classifier.stats()
+    assert stats["checked"][KIND_REQUEST] == 3
+    assert stats["skip_rate"][KIND_REQUEST] == round(1 / 3, 4)
+
+# --- Integration Tests (Mocked) ---
+
+@patch("app.main._safety_matcher", MATCHER)
+@patch("app.main.get_cached_response", return_value=None)
+def test_fast_path_skips_gemini(mock_get_cache):
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        response = client.post(
+            "/ai/neutralize-observation",
+            json={"user_id": "test_user", "text": "I saw the dishes in the sink at 9pm"}
+        )
+    assert response.status_code == 200
+    assert response.json()["result"] == "I saw the dishes in the sink at 9pm"
+    assert response.json()["is_offensive"] is False
+    mock_generate.assert_not_called()
+    mock_get_cache.assert_not_called()
+
+@patch("app.main.FAST_PATH_ENABLED", False)
+@patch("app.main._safety_matcher", MATCHER)
+@patch("app.main.get_cached_response", return_value=None)
+@patch("app.main.save_cached_response")
+def test_fast_path_can_be_disabled(mock_save, mock_get_cache):
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value.text = "Judgment: No"
+        client.post(
+            "/ai/neutralize-observation",
+            json={"user_id": "test_user", "text": "I saw the dishes in the sink at 9pm"}
+        )
+    mock_generate.assert_called_once()
@@ -0,0 +1,162 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app, verify_firebase_token
+from app.concurrency import GenerationPool, PoolSaturatedError, SingleFlight
+import pytest
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+
+# --- Unit Tests ---
+
+def test_pool_limits_concurrency():
+    async def scenario():
+        pool = GenerationPool(max_concurrency=2, max_queue=10)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            peak = max(peak, pool.in_flight)
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        results = await asyncio.gather(*(pool.run(call) for _ in range(6)))
+        return pool, peak, results
+
+    pool, peak, results = asyncio.run(scenario())
+    assert results == ["ok"] * 6
+    assert peak == 2
+    assert pool.stats()["completed"] == 6
+    assert pool.stats()["in_flight"] == 0
+
+def test_pool_rejects_when_queue_full():
+    async def scenario():
+        pool = GenerationPool(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return "ok"
+
+        first = asyncio.create_task(pool.run(call))
+        second = asyncio.create_task(pool.run(call))
+        await asyncio.sleep(0)
+        with pytest.raises(PoolSaturatedError):
+            await pool.run(call)
+        release.set()
+        return pool, await asyncio.gather(first, second)
+
+    pool, results = asyncio.run(scenario())
+    assert results == ["ok", "ok"]
+    assert pool.rejected == 1
+
+# --- Integration Tests (Mocked) ---
+
+@patch("app.main.get_cached_response", return_value=None)
+@patch("app.main.save_cached_response")
+def test_saturated_pool_returns_503(mock_save, mock_get_cache):
+    with patch("app.main.generation_pool.run", side_effect=PoolSaturatedError("full")):
+        response = client.post(
+            "/ai/suggest-feelings",
+            json={"user_id": "test_user", "text": "I shouted"}
+        )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_single_flight_coalesces_identical_calls():
+    async def scenario():
+        flight = SingleFlight()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "shared"
+
+        results = await asyncio.gather(*(flight.do("key", call) for _ in range(5)))
+        other = await flight.do("other", call)
+        return flight, calls, results, other
+
+    flight, calls, results, other = asyncio.run(scenario())
+    assert results == ["shared"] * 5
+    assert other == "shared"
+    assert calls == 2
+    assert flight.stats() == {"in_flight": 0, "calls": 2, "coalesced": 4}
+
+def test_single_flight_shares_exceptions():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def call():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("boom")
+
+        return await asyncio.gather(*(flight.do("key", call) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+@patch("app.main.get_cached_response", return_value=None)
+@patch("app.main.save_cached_response")
+def test_duplicate_batch_tasks_share_one_gemini_call(mock_save, mock_get_cache):
+    async def slow_reply(prompt):
+        await asyncio.sleep(0.01)
+        reply = MagicMock()
+        reply.text = "hurt, tired, lonely"
+        return reply
+
+    with patch("app.main.get_cached_responses", new_callable=AsyncMock, return_value=[None, None]), \
+         patch("app.main.model.generate_content_async", side_effect=slow_reply) as mock_generate:
+        response = client.post("/ai/expression-step", json={
+            "user_id": "test_user",
+            "tasks": [{"task": "feelings", "text": "I shouted"}, {"task": "feelings", "text": "I shouted"}],
+        })
+
+    results = response.json()["results"]
+    assert results[0]["response"] == results[1]["response"]
+    assert mock_generate.call_count == 1
+
+@patch("app.main.SHARED_CACHE_ENABLED", False)
+@patch("app.main.cache_writer")
+def test_lookup_outlasting_an_identical_call_reuses_its_result(mock_writer):
+    async def scenario():
+        release = asyncio.Event()
+        lookups = []
+
+        async def lookup(keys):
+            lookups.append(keys)
+            # The second request's backend lookup is still running when the first finishes
+            if len(lookups) == 2:
+                await release.wait()
+            return {}
+
+        with patch("app.main._lookup_cache_backend", side_effect=lookup), \
+             patch("app.main.generation_pool", GenerationPool(2, 2)), \
+             patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+            mock_generate.return_value = MagicMock(text="hurt, tired, lonely")
+            first = asyncio.create_task(main.run_ai_task("feelings", "test_user", "I waited an hour", {}))
+            second = asyncio.create_task(main.run_ai_task("feelings", "test_user", "I waited an hour", {}))
+            await first
+            release.set()
+            return (await first), (await second), mock_generate.call_count
+
+    try:
+        first, second, calls = asyncio.run(scenario())
+    finally:
+        main.ai_cache.clear()
+    assert calls == 1
+    assert second.result == first.result and second.from_cache
@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock
+import asyncio
+import datetime
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app, verify_firebase_token
+import pytest
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def setup():
+    main.entitlement_cache.clear()
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+    main.entitlement_cache.clear()
+
+def user_doc(premium_until=None):
+    doc = MagicMock()
+    doc.exists = True
+    doc.to_dict.return_value = {"premium_until": premium_until} if premium_until else {}
+    return doc
+
+@patch("app.main.db.collection")
+def test_entitlement_read_once_per_ttl(mock_db):
+    future = datetime.datetime.now() + datetime.timedelta(days=30)
+    mock_db.return_value.document.return_value.get.return_value = user_doc(future)
+    assert asyncio.run(main.verify_premium_for_ai("test_user")) == "test_user"
+    assert asyncio.run(main.verify_premium_for_ai("test_user")) == "test_user"
+    assert mock_db.return_value.document.return_value.get.call_count == 1
+
+@patch("app.main.db.collection")
+def test_missing_entitlement_is_cached(mock_db):
+    mock_db.return_value.document.return_value.get.return_value = user_doc()
+    assert asyncio.run(main.get_premium_until("test_user")) is None
+    assert asyncio.run(main.get_premium_until("test_user")) is None
+    assert mock_db.return_value.document.return_value.get.call_count == 1
+
+@patch("app.main.db.collection")
+def test_refresh_endpoint_busts_cache(mock_db):
+    get = mock_db.return_value.document.return_value.get
+    get.return_value = user_doc()
+    asyncio.run(main.get_premium_until("test_user"))
+
+    future = datetime.datetime(2030, 1, 1)
+    get.return_value = user_doc(future)
+    response = client.post("/entitlements/refresh")
+    assert response.status_code == 200
+    assert response.json()["premium_until"].startswith("2030-01-01")
+    assert asyncio.run(main.get_premium_until("test_user")) == future
+    assert get.call_count == 2
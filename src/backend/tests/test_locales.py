@@ -0,0 +1,151 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app, verify_firebase_token
+from app.locales import LocaleRegistry, localize_prompt, localized_document_id, normalize_locale
+from app.safety import SafetyMatcher
+from app.vocabulary import VocabularyStore
+from benchmarks.fakes import FakeFirestore
+import pytest
+
+client = TestClient(app)
+
+ENGLISH = {
+    "feelings": {"categories": [{"name": "Happy", "words": ["Glad"]}]},
+    "needs": {"categories": [{"name": "Peace", "words": ["Ease"]}]},
+    "validation_rules": {"violent_words": ["idiot"]},
+}
+SPANISH = {
+    "feelings": {"categories": [{"name": "Feliz", "words": ["Contento"]}]},
+    "needs": {"categories": [{"name": "Paz", "words": ["Calma"]}]},
+    "validation_rules": {"violent_words": ["idiota"]},
+}
+
+# Seeded in these tests; the shipped default is English only
+LOCALES = ("en", "es", "fr")
+
+def compile_rules(snapshot):
+    return SafetyMatcher.from_rules(snapshot.data["validation_rules"])
+
+@pytest.fixture
+def stores():
+    """English in the pinned store, Spanish and French through a registry that keeps one compiled matcher."""
+    made = []
+
+    def make_store(locale):
+        made.append(locale)
+        return VocabularyStore(MagicMock(return_value=SPANISH))
+
+    registry = LocaleRegistry(make_store, compile_rules, max_compiled=1)
+    with patch("app.main.SUPPORTED_LOCALES", LOCALES), \
+         patch("app.main.vocabulary_store", VocabularyStore(MagicMock(return_value=ENGLISH))), \
+         patch("app.main.locale_registry", registry), \
+         patch("app.main._safety_matcher", None):
+        yield registry, made
+
+@pytest.fixture
+def override_auth():
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+
+# --- Unit Tests ---
+
+def test_locale_names_and_documents():
+    assert [normalize_locale(l) for l in ("es-MX", "es_MX", " ES ", "fr")] == ["es", "es", "es", "fr"]
+    assert localized_document_id("feelings", "en") == "feelings"
+    assert localized_document_id("validation_rules", "fr") == "validation_rules_fr"
+    assert localize_prompt("Suggest needs.", "en") == "Suggest needs."
+    assert "in Spanish" in localize_prompt("Suggest needs.", "es")
+
+def test_registry_compiles_lazily_and_keeps_a_bounded_number():
+    compile = MagicMock(side_effect=compile_rules)
+    make_store = MagicMock(side_effect=lambda locale: VocabularyStore(MagicMock(return_value=SPANISH)))
+    registry = LocaleRegistry(make_store, compile, max_compiled=2)
+    make_store.assert_not_called()
+
+    spanish = registry.compiled("es")
+    assert registry.compiled("es") is spanish
+    registry.compiled("fr")
+    registry.compiled("es")
+    # "fr" is the least recently used, so it goes when a third locale compiles
+    registry.compiled("de")
+    assert registry.stats()["compiled"] == ["es", "de"]
+    assert (compile.call_count, registry.evictions, make_store.call_count) == (3, 1, 3)
+    # Evicting a matcher keeps the store: recompiling doesn't read Firestore again
+    registry.compiled("fr")
+    assert make_store.call_count == 3
+
+def test_registry_recompiles_when_the_locale_changes():
+    registry = LocaleRegistry(lambda locale: VocabularyStore(MagicMock(return_value=SPANISH)), compile_rules)
+    before = registry.compiled("es")
+    registry.store("es").update_part("validation_rules", {"violent_words": ["tonto"]})
+    after = registry.compiled("es")
+    assert after is not before
+    assert after.find("eres tonto") and not after.find("eres idiota")
+
+def test_untranslated_documents_fall_back_to_english():
+    db = FakeFirestore()
+    db.collection("nvc_vocabulary").document("feelings").set(ENGLISH["feelings"])
+    db.collection("nvc_vocabulary").document("needs").set(ENGLISH["needs"])
+    db.collection("config_metadata").document("validation_rules").set(ENGLISH["validation_rules"])
+    db.collection("nvc_vocabulary").document("feelings_es").set(SPANISH["feelings"])
+    with patch("app.main.db", db):
+        parts = main.fetch_vocabulary_parts("es")
+        assert parts == {**ENGLISH, "feelings": SPANISH["feelings"]}
+        assert main.fetch_vocabulary_parts() == ENGLISH
+
+        english = VocabularyStore(lambda: ENGLISH)
+        english.get()
+        spanish = VocabularyStore(MagicMock())
+        with patch("app.main.vocabulary_store", english):
+            main.watch_vocabulary(spanish, "es")
+        assert spanish.peek().data == parts
+
+# --- Integration Tests (Mocked) ---
+
+def test_vocabulary_is_served_per_locale(stores):
+    registry, made = stores
+    assert client.get("/content/vocabulary", headers={"Accept-Encoding": "identity"}).json() == ENGLISH
+    assert made == []
+
+    response = client.get("/content/vocabulary?locale=es-MX", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.json() == SPANISH
+    assert made == ["es"]
+    assert client.get("/content/vocabulary?locale=de").status_code == 422
+
+def test_safety_uses_the_locale_rules(stores):
+    registry, _ = stores
+    english = client.post("/analyze/safety", json={"text": "eres idiota, you idiot"}).json()
+    assert [m["text"] for m in english["matches"]] == ["idiot"]
+    spanish = client.post("/analyze/safety", json={"text": "eres idiota, you idiot", "locale": "es"}).json()
+    assert [m["text"] for m in spanish["matches"]] == ["idiota"]
+    client.post("/analyze/safety/batch", json={"texts": ["idiota"], "locale": "fr"})
+    assert registry.stats()["compiled"] == ["fr"]
+
+@patch("app.main.SUPPORTED_LOCALES", LOCALES)
+@patch("app.main.model.generate_content_async", new_callable=AsyncMock)
+@patch("app.main.get_cached_response", return_value=None)
+@patch("app.main.save_cached_response")
+def test_ai_answers_in_the_requested_language(mock_save, mock_get_cache, mock_generate, override_auth):
+    mock_generate.return_value = MagicMock(text="Judgment: No\nAlternatives: Cuando vi los platos")
+    with patch("app.main.FAST_PATH_ENABLED", True), \
+         patch.object(main.neutrality_classifier, "is_confidently_neutral", return_value=True):
+        response = client.post("/ai/neutralize-observation",
+                               json={"user_id": "test_user", "text": "Vi los platos", "locale": "es"})
+
+    assert response.status_code == 200
+    # The English fast path doesn't judge Spanish text
+    assert response.json()["engine"] == "gemini"
+    assert "Write your answer in Spanish" in mock_generate.call_args.args[0]
+    assert mock_save.call_args.args[0] == ["test_user", "neutralize", "Vi los platos", "locale=es"]
+
+    rejected = client.post("/ai/suggest-feelings", json={"user_id": "test_user", "text": "x", "locale": "klingon"})
+    assert rejected.status_code == 422
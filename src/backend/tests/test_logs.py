@@ -0,0 +1,123 @@
+from fastapi.testclient import TestClient
+import io
+import json
+import logging
+import queue
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app
+from app.logs import (DroppingQueueHandler, JsonFormatter, RequestContextFilter, SamplingFilter,
+                      request_id_var, setup_logging)
+import pytest
+
+client = TestClient(app)
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+def record(message="hello", level=logging.INFO, request_id=None, **extra):
+    rec = logging.LogRecord("peacekeeper", level, __file__, 1, message, None, None)
+    rec.request_id = request_id
+    rec.__dict__.update(extra)
+    return rec
+
+@pytest.fixture
+def restore_logging():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+def test_json_formatter_includes_request_and_extra_fields():
+    rec = record("Gemini Error", logging.ERROR, request_id="abc", elapsed_ms=12.5, task="refine")
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        rec.exc_info = sys.exc_info()
+
+    entry = json.loads(JsonFormatter().format(rec))
+    assert entry["severity"] == "ERROR"
+    assert entry["message"] == "Gemini Error"
+    assert (entry["request_id"], entry["elapsed_ms"], entry["task"]) == ("abc", 12.5, "refine")
+    assert "RuntimeError: boom" in entry["exception"]
+
+def test_context_filter_stamps_the_current_request():
+    token = request_id_var.set("req-1")
+    try:
+        rec = record()
+        RequestContextFilter().filter(rec)
+    finally:
+        request_id_var.reset(token)
+    assert rec.request_id == "req-1" and rec.elapsed_ms is None
+
+    outside = record()
+    RequestContextFilter().filter(outside)
+    assert outside.request_id is None
+
+def test_sampling_keeps_or_drops_whole_requests():
+    sampler = SamplingFilter(rate=0.5)
+    kept = {rid: sampler.filter(record(request_id=rid)) for rid in (f"req-{i}" for i in range(400))}
+    assert 150 < sum(kept.values()) < 250
+    # Every record of a request gets the same decision
+    assert all(sampler.filter(record(request_id=rid)) == keep for rid, keep in kept.items())
+    # Warnings and records outside requests are never sampled
+    assert sampler.filter(record(level=logging.WARNING, request_id="req-0"))
+    assert sampler.filter(record())
+
+def test_sampling_caps_records_per_second():
+    clock = FakeClock()
+    sampler = SamplingFilter(rate=1.0, max_per_second=3, clock=clock)
+    assert [sampler.filter(record(request_id=f"r{i}")) for i in range(5)] == [True, True, True, False, False]
+    clock.now += 1
+    assert sampler.filter(record(request_id="r5"))
+    assert sampler.dropped == 2
+
+def test_queue_handler_drops_when_full():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(record("first"))
+    handler.handle(record("second"))
+    assert handler.dropped == 1
+    assert handler.queue.get_nowait().getMessage() == "first"
+
+def test_pipeline_writes_json_lines_from_a_background_thread(restore_logging):
+    stream = io.StringIO()
+    pipeline = setup_logging(logging.INFO, json_output=True, stream=stream)
+    token = request_id_var.set("req-7")
+    try:
+        logging.getLogger("peacekeeper").info("Endpoint: %s", "refine-request", extra={"user": "alice"})
+    finally:
+        request_id_var.reset(token)
+    pipeline.stop()
+
+    entry = json.loads(stream.getvalue().strip())
+    assert entry["message"] == "Endpoint: refine-request"
+    assert (entry["request_id"], entry["user"]) == ("req-7", "alice")
+
+def test_requests_get_a_correlation_id():
+    response = client.get("/cache/stats")
+    assert len(response.headers["X-Request-ID"]) == 16
+    assert client.get("/cache/stats", headers={"X-Request-ID": "from-client"}).headers["X-Request-ID"] == "from-client"
+
+    trace = {"X-Cloud-Trace-Context": "105445aa7843bc8bf206b12000100000/1;o=1"}
+    assert client.get("/cache/stats", headers=trace).headers["X-Request-ID"] == "105445aa7843bc8bf206b12000100000"
+    assert "logging" in response.json()
+
+def test_request_finished_record_has_timing_fields(caplog):
+    with caplog.at_level(logging.INFO, logger="peacekeeper"):
+        client.get("/cache/stats", headers={"X-Request-ID": "timed"})
+    finished = [r for r in caplog.records if r.getMessage() == "request finished"][-1]
+    assert (finished.route, finished.status, finished.method) == ("/cache/stats", 200, "GET")
+    assert finished.duration_ms >= 0
@@ -1,7 +1,8 @@
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
+import json
 
 # Add the app directory to sys.path to allow importing main
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -37,7 +38,7 @@ def test_parse_ai_alternatives_newline():
 
 # --- Integration Tests (Mocked) ---
 
-@patch("app.main.model.generate_content")
+@patch("app.main.model.generate_content_async", new_callable=AsyncMock)
 @patch("app.main.get_cached_response", return_value=None)
 @patch("app.main.save_cached_response")
 def test_neutralize_observation_offensive(mock_save, mock_get_cache, mock_generate):
@@ -57,7 +58,7 @@ def test_neutralize_observation_offensive(mock_save, mock_get_cache, mock_genera
     assert len(data["alternatives"]) == 2
     assert data["result"] == "When I saw the dishes"
 
-@patch("app.main.model.generate_content")
+@patch("app.main.model.generate_content_async", new_callable=AsyncMock)
 @patch("app.main.get_cached_response", return_value=None)
 @patch("app.main.save_cached_response")
 def test_neutralize_observation_clean(mock_save, mock_get_cache, mock_generate):
@@ -79,7 +80,7 @@ def test_neutralize_observation_clean(mock_save, mock_get_cache, mock_generate):
 @patch("app.main.get_cached_response", return_value=None)
 @patch("app.main.save_cached_response")
 def test_suggest_feelings_mock(mock_save, mock_get_cache):
-    with patch("app.main.model.generate_content") as mock_generate:
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
         mock_response = MagicMock()
         mock_response.text = "angry, frustrated, tired"
         mock_generate.return_value = mock_response
@@ -92,3 +93,42 @@ def test_suggest_feelings_mock(mock_save, mock_get_cache):
         assert response.status_code == 200
         data = response.json()
         assert "angry" in data["result"]
+
+def _sse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+@patch("app.main.get_cached_response", return_value=None)
+@patch("app.main.save_cached_response")
+def test_generate_reflection_stream(mock_save, mock_get_cache):
+    async def chunks():
+        for text in ["I hear ", "that you feel ", "tired."]:
+            chunk = MagicMock()
+            chunk.text = text
+            yield chunk
+
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = chunks()
+        response = client.post(
+            "/ai/generate-reflection/stream",
+            json={"user_id": "test_user", "context": {"feelings": "tired"}}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(response.text)
+    assert [e for e, _ in events] == ["token", "token", "token", "done"]
+    assert events[-1][1] == {"result": "I hear that you feel tired.", "from_cache": False}
+    mock_save.assert_called_once()
+    assert mock_save.call_args[0][1] == "I hear that you feel tired."
+
+@patch("app.main.get_cached_response", return_value="I hear you.")
+def test_generate_reflection_stream_cached(mock_get_cache):
+    response = client.post(
+        "/ai/generate-reflection/stream",
+        json={"user_id": "test_user", "context": {"feelings": "tired"}}
+    )
+    assert _sse_events(response.text) == [("done", {"result": "I hear you.", "from_cache": True})]
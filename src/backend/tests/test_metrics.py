@@ -0,0 +1,88 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.metrics import Registry, Histogram
+import app.main as main
+from app.main import app, verify_firebase_token
+import pytest
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def setup():
+    main.ai_cache.clear()
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+    main.ai_cache.clear()
+
+# --- Primitives ---
+
+def test_histogram_quantiles_interpolate_within_buckets():
+    histogram = Histogram("latency_seconds", "test", buckets=(0.1, 0.2, 0.4))
+    for _ in range(50):
+        histogram.observe(0.05)
+    for _ in range(50):
+        histogram.observe(0.3)
+    assert histogram.count() == 100
+    assert histogram.quantile(0.5) == pytest.approx(0.1)
+    assert histogram.quantile(0.99) == pytest.approx(0.396)
+    assert Histogram("empty", "test").quantile(0.5) is None
+
+def test_registry_renders_prometheus_text():
+    registry = Registry(prefix="pk_")
+    hits = registry.counter("hits_total", "Hits", ["tier"])
+    latency = registry.histogram("op_seconds", "Latency", buckets=(0.1, 1.0))
+    registry.gauge("queue_depth", "Depth", collect=lambda: [({}, 3)])
+    hits.inc(tier="l1")
+    hits.inc(2, tier="l1")
+    latency.observe(0.5)
+
+    text = registry.render()
+    assert "# TYPE pk_hits_total counter" in text
+    assert 'pk_hits_total{tier="l1"} 3' in text
+    assert 'pk_op_seconds_bucket{le="0.1"} 0' in text
+    assert 'pk_op_seconds_bucket{le="+Inf"} 1' in text
+    assert "pk_op_seconds_count 1" in text
+    assert 'pk_op_seconds_quantile{quantile="0.5"}' in text
+    assert "pk_queue_depth 3" in text
+
+# --- Endpoint ---
+
+@patch("app.main.save_cached_response")
+@patch("app.main.get_cached_response", return_value=None)
+def test_metrics_endpoint_reports_routes_and_gemini_calls(mock_get, mock_save):
+    before = main.AI_RESPONSES.value(task="neutralize", engine="gemini", from_cache="false")
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = MagicMock(text="Judgment: Yes\nAlternatives: The dishes are in the sink")
+        response = client.post("/ai/neutralize-observation", json={"user_id": "test_user", "text": "You never clean"})
+    assert response.status_code == 200
+
+    assert main.AI_RESPONSES.value(task="neutralize", engine="gemini", from_cache="false") == before + 1
+    assert main.REQUEST_DURATION.count(route="/ai/neutralize-observation", method="POST", status="200") >= 1
+    assert main.GEMINI_DURATION.count(task="neutralize", outcome="ok") >= 1
+
+    scrape = client.get("/metrics")
+    assert scrape.status_code == 200
+    assert scrape.headers["content-type"].startswith("text/plain")
+    body = scrape.text
+    assert 'peacekeeper_http_request_duration_seconds_count{route="/ai/neutralize-observation",method="POST",status="200"}' in body
+    assert "peacekeeper_http_requests_in_flight 0" in body
+    assert "peacekeeper_generation_pool_in_flight 0" in body
+    # Scrapes themselves are not recorded
+    assert 'route="/metrics"' not in body
+
+@patch("app.main.get_cached_response", return_value=None)
+def test_metrics_count_ai_errors(mock_get):
+    before = main.AI_ERRORS.value(task="feelings", status="502")
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate, \
+         patch("app.main.get_loaded_suggester", return_value=None):
+        mock_generate.side_effect = RuntimeError("boom")
+        response = client.post("/ai/suggest-feelings", json={"user_id": "test_user", "text": "They left"})
+    assert response.status_code == 502
+    assert main.AI_ERRORS.value(task="feelings", status="502") == before + 1
@@ -0,0 +1,199 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app, verify_firebase_token
+from app.prefetch import Prefetcher, PrefetchJob, COMPUTED, SKIPPED
+from app.sessions import MemorySessionStore
+import pytest
+
+client = TestClient(app)
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(autouse=True)
+def setup():
+    main.ai_cache.clear()
+    previous = main.prefetcher
+    main.prefetcher = Prefetcher(main.run_prefetch, workers=2, max_queue=10, ttl=600)
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+    main.prefetcher = previous
+    main.ai_cache.clear()
+
+def job(key, task="feelings"):
+    return PrefetchJob(task, "alice", key, {}, key)
+
+# --- Unit Tests ---
+
+def test_prefetcher_dedupes_and_drops_the_oldest_job():
+    ran = []
+
+    async def run(j):
+        ran.append(j.key)
+        return COMPUTED
+
+    prefetcher = Prefetcher(run, workers=1, max_queue=2, clock=FakeClock())
+    assert prefetcher.submit(job("a"))
+    assert not prefetcher.submit(job("a"))
+    assert prefetcher.submit(job("b"))
+    assert prefetcher.submit(job("c"))
+    asyncio.run(prefetcher.drain())
+
+    assert ran == ["b", "c"]
+    # Already computed, so not queued again
+    assert not prefetcher.submit(job("b"))
+    assert prefetcher.stats()["dropped"] == 1
+
+def test_prefetcher_counts_used_and_wasted_results():
+    clock = FakeClock()
+
+    async def run(j):
+        return COMPUTED if j.key != "skip" else SKIPPED
+
+    prefetcher = Prefetcher(run, ttl=600, clock=clock)
+    for key in ("a", "b", "skip"):
+        prefetcher.submit(job(key))
+    asyncio.run(prefetcher.drain())
+
+    assert prefetcher.claim("a")
+    assert not prefetcher.claim("a")
+    assert not prefetcher.claim("skip")
+    clock.now += 600
+    stats = prefetcher.stats()
+    assert (stats["used"], stats["wasted"], stats["skipped"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+def test_prefetcher_claim_joins_a_running_job():
+    async def scenario():
+        started = asyncio.Event()
+
+        async def run(j):
+            started.set()
+            await asyncio.sleep(0.01)
+            return COMPUTED
+
+        prefetcher = Prefetcher(run)
+        prefetcher.submit(job("a"))
+        drain = asyncio.ensure_future(prefetcher.drain())
+        await started.wait()
+        assert prefetcher.claim("a")
+        await drain
+        # The result was used while running, so it isn't waiting to be used (or wasted) later
+        assert prefetcher.stats()["pending_use"] == 0
+        return prefetcher.counts
+
+    assert asyncio.run(scenario())["used"] == 1
+
+def test_prefetcher_limits_concurrent_workers():
+    running = []
+    peak = []
+
+    async def run(j):
+        running.append(j.key)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(j.key)
+        return COMPUTED
+
+    async def scenario(prefetcher):
+        for key in "abcdef":
+            prefetcher.submit(job(key))
+        await asyncio.gather(prefetcher.drain(), prefetcher.drain())
+
+    prefetcher = Prefetcher(run, workers=2)
+    asyncio.run(scenario(prefetcher))
+    assert max(peak) == 2
+    assert prefetcher.counts["computed"] == 6
+
+# --- Integration Tests (Mocked) ---
+
+def feelings_and_needs(prompt):
+    reply = MagicMock()
+    reply.text = "Hurt, Tired, Lonely" if "core emotions" in prompt else "Rest, Support, Order"
+    return reply
+
+@patch("app.main.cache_writer")
+@patch("app.main._lookup_cache_backend", new_callable=AsyncMock, return_value={})
+def test_prefetched_results_are_served_from_cache(mock_lookup, mock_writer):
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = feelings_and_needs
+        response = client.post("/ai/prefetch", json={
+            "user_id": "test_user", "observation": "When the dishes stayed in the sink", "feelings": "hurt, tired",
+        })
+        assert response.status_code == 202
+        assert response.json() == {"queued": ["feelings", "needs"]}
+        assert mock_generate.call_count == 2
+
+        feelings = client.post("/ai/suggest-feelings", json={
+            "user_id": "test_user", "text": "When the dishes stayed in the sink",
+        })
+        needs = client.post("/ai/suggest-needs", json={
+            "user_id": "test_user", "text": "When the dishes stayed in the sink", "context": {"feelings": "hurt, tired"},
+        })
+
+    assert feelings.json()["from_cache"] and needs.json()["from_cache"]
+    assert mock_generate.call_count == 2
+    assert main.prefetcher.counts["used"] == 2
+
+@patch("app.main.get_cached_response", return_value=None)
+def test_prefetch_skips_when_the_circuit_is_open(mock_cache):
+    previous = main.gemini_breaker
+    main.gemini_breaker = MagicMock(state=main.OPEN)
+    try:
+        with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+            response = client.post("/ai/prefetch", json={"user_id": "test_user", "observation": "When you left"})
+    finally:
+        main.gemini_breaker = previous
+
+    assert response.json() == {"queued": ["feelings"]}
+    mock_generate.assert_not_called()
+    assert main.prefetcher.counts["skipped"] == 1
+
+def session_store(participants):
+    store = MemorySessionStore()
+    store.create("s1", {"participants": participants})
+    return store
+
+MESSAGE = {
+    "user_id": "test_user", "observation": "When you left", "feelings": "hurt", "needs": "connection",
+    "request": "Would you call me next time?", "session_id": "s1",
+}
+
+@patch("app.main.save_cached_response")
+@patch("app.main.get_cached_response", return_value=None)
+def test_reflection_is_prefetched_for_the_other_participant(mock_cache, mock_save):
+    with patch("app.main.session_store", session_store(["test_user", "partner"])), \
+         patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = MagicMock(text="I hear that you felt hurt when I left.")
+        response = client.post("/ai/prefetch", json=MESSAGE)
+
+    assert response.json()["queued"] == ["feelings", "needs", "reflection"]
+    prompts = [call.args[0] for call in mock_generate.call_args_list]
+    assert sum(1 for prompt in prompts if "reflect" in prompt.lower()) == 1
+    # Cached under the listener's key, with the context the listener's app will send
+    context = {"observation": "When you left", "feelings": "hurt", "needs": "connection",
+               "request": "Would you call me next time?", "is_calm": True}
+    assert mock_save.call_args_list[-1][0][0] == main.AI_TASKS["reflection"].cache_key("partner", None, context)
+
+@patch("app.main.get_cached_response", return_value=None)
+def test_reflection_prefetch_requires_session_membership(mock_cache):
+    with patch("app.main.session_store", session_store(["someone", "partner"])), \
+         patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        client.post("/ai/prefetch", json=MESSAGE)
+
+    # Feelings and needs are the speaker's own; only the reflection needs the session
+    assert mock_generate.call_count == 2
+    assert main.prefetcher.counts["queued"] == 2
@@ -0,0 +1,183 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app, verify_firebase_token
+from app.ratelimit import (TokenBucket, RateLimiter, SharedWindowLimit, SQLiteWindowCounter, WindowCounter,
+                           parse_limits, build_global_limit)
+import pytest
+
+client = TestClient(app)
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(autouse=True)
+def setup():
+    main.ai_cache.clear()
+    previous = main.rate_limiter, main.gemini_limit
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+    main.rate_limiter, main.gemini_limit = previous
+    main.ai_cache.clear()
+
+def test_token_bucket_allows_burst_then_refills():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.acquire() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.acquire() == 0.0
+    clock.now += 100
+    assert bucket.stats()["tokens"] == 3
+
+def test_rate_limiter_buckets_per_user_and_endpoint():
+    clock = FakeClock()
+    limiter = RateLimiter((60, 2), {"reflection": (6, 1)}, clock=clock)
+    assert limiter.check("alice", "neutralize") == 0.0
+    assert limiter.check("alice", "neutralize") == 0.0
+    assert limiter.check("alice", "neutralize") == pytest.approx(1.0)
+    # Other users and other endpoints have their own buckets
+    assert limiter.check("bob", "neutralize") == 0.0
+    assert limiter.check("alice", "refine") == 0.0
+    assert limiter.check("alice", "reflection") == 0.0
+    assert limiter.check("alice", "reflection") == pytest.approx(10.0)
+    stats = limiter.stats()
+    assert stats["rejected"] == {"neutralize": 1, "reflection": 1}
+    assert stats["endpoints"] == {"reflection": {"per_minute": 6, "burst": 1}}
+
+def test_rate_limiter_evicts_least_recently_used_buckets():
+    limiter = RateLimiter((60, 1), max_keys=2, clock=FakeClock())
+    limiter.check("alice", "neutralize")
+    limiter.check("bob", "neutralize")
+    limiter.check("carol", "neutralize")
+    assert limiter.stats()["buckets"] == 2
+    # alice's bucket was dropped, so she starts over with a full one
+    assert limiter.check("alice", "neutralize") == 0.0
+
+def test_rate_limiter_without_default_only_limits_listed_endpoints():
+    limiter = RateLimiter(None, {"neutralize": (60, 1)}, clock=FakeClock())
+    assert all(limiter.check("alice", "refine") == 0.0 for _ in range(100))
+    assert limiter.check("alice", "neutralize") == 0.0
+    assert limiter.check("alice", "neutralize") > 0
+
+def test_rate_limiter_check_all_takes_all_or_nothing():
+    limiter = RateLimiter((60, 2), {"reflection": (60, 1)}, clock=FakeClock())
+    assert limiter.check_all("alice", {"feelings": 2, "reflection": 1}) == (None, 0.0)
+    endpoint, retry_after = limiter.check_all("alice", {"needs": 2, "reflection": 1})
+    assert endpoint == "reflection" and retry_after > 0
+    # The refused batch gave its needs tokens back
+    assert limiter.check("alice", "needs", cost=2) == 0.0
+
+def test_parse_limits():
+    assert parse_limits(" neutralize=120/30, reflection=20 ") == {"neutralize": (120.0, 30.0), "reflection": (20.0, 20.0)}
+    assert parse_limits("") == {}
+    with pytest.raises(ValueError):
+        parse_limits("neutralize")
+
+def test_shared_window_limit_is_shared_between_instances(tmp_path):
+    clock = FakeClock(now=600.0)
+    path = str(tmp_path / "limits.sqlite3")
+    first = SharedWindowLimit(SQLiteWindowCounter(path, clock), "gemini", limit=25, lease=10, clock=clock)
+    second = SharedWindowLimit(SQLiteWindowCounter(path, clock), "gemini", limit=25, lease=10, clock=clock)
+
+    granted = sum(1 for limit in (first, second) * 20 if limit.acquire() == 0.0)
+    assert granted == 25
+    assert first.acquire() == pytest.approx(60.0)
+
+    # A new window starts with a fresh allowance
+    clock.now += 60
+    assert first.acquire() == 0.0
+    assert second.acquire() == 0.0
+
+def test_shared_window_limit_fails_open_when_the_counter_fails():
+    class BrokenCounter(WindowCounter):
+        name = "broken"
+
+        def add(self, key, amount, expires_at):
+            raise RuntimeError("unavailable")
+
+    limit = SharedWindowLimit(BrokenCounter(), "gemini", limit=100, lease=10, clock=FakeClock())
+    assert all(limit.acquire() == 0.0 for _ in range(30))
+    assert limit.stats()["counter_errors"] == 3
+
+def test_build_global_limit():
+    assert build_global_limit(0, 10, "none", lambda: None, "") is None
+    assert isinstance(build_global_limit(600, 30, "none", lambda: None, ""), TokenBucket)
+    with pytest.raises(ValueError):
+        build_global_limit(600, 30, "redis", lambda: None, "")
+
+@patch("app.main.get_cached_response", return_value="Cached observation")
+def test_endpoint_returns_429_with_retry_after(mock_cache):
+    main.rate_limiter = RateLimiter((6, 2))
+    body = {"user_id": "test_user", "text": "You never listen"}
+
+    assert client.post("/ai/neutralize-observation", json=body).status_code == 200
+    assert client.post("/ai/neutralize-observation", json=body).status_code == 200
+    response = client.post("/ai/neutralize-observation", json=body)
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "10"
+    assert response.json()["detail"] == {"message": "Too many requests, please slow down", "retry_after": 10}
+    # Other endpoints keep their own allowance
+    assert client.post("/ai/refine-request", json=body).status_code == 200
+    assert 'peacekeeper_rate_limited_total{scope="user",endpoint="neutralize"}' in client.get("/metrics").text
+
+@patch("app.main.get_cached_responses", side_effect=lambda keys: ["Cached"] * len(keys))
+@patch("app.main.get_cached_response", return_value="Cached")
+def test_batch_spends_the_same_allowance_as_single_calls(mock_cache, mock_bulk):
+    main.rate_limiter = RateLimiter((6, 3))
+    body = {"user_id": "test_user", "text": "The dishes"}
+    batch = {"user_id": "test_user", "tasks": [{"task": "feelings", "text": "a"}, {"task": "feelings", "text": "b"},
+                                               {"task": "needs", "text": "a"}]}
+
+    assert client.post("/ai/expression-step", json=batch).status_code == 200
+    # Two of three feelings calls are used up, one of three needs calls
+    assert client.post("/ai/suggest-feelings", json=body).status_code == 200
+    assert client.post("/ai/suggest-feelings", json=body).status_code == 429
+    assert client.post("/ai/expression-step", json=batch).status_code == 429
+    assert [client.post("/ai/suggest-needs", json=body).status_code for _ in range(3)] == [200, 200, 429]
+
+def test_prefetch_spends_one_request_per_result():
+    main.rate_limiter = RateLimiter((6, 3))
+    body = {"user_id": "test_user", "observation": "The dishes", "feelings": "tired"}
+    with patch("app.main.queue_prefetch", return_value=["feelings", "needs"]):
+        assert client.post("/ai/prefetch", json=body).status_code == 202
+        assert client.post("/ai/prefetch", json=body).status_code == 429
+        assert client.post("/ai/prefetch", json={"user_id": "test_user"}).status_code == 202
+
+@patch("app.main.save_cached_response")
+@patch("app.main.get_cached_response", return_value=None)
+def test_global_gemini_limit_returns_429(mock_cache, mock_save):
+    main.rate_limiter = RateLimiter(None)
+    main.gemini_limit = TokenBucket(rate=1 / 60, burst=1)
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = MagicMock(text="Judgment: No\nAlternatives: none")
+        assert client.post("/ai/refine-request", json={"user_id": "test_user", "text": "Dishes?"}).status_code == 200
+        response = client.post("/ai/refine-request", json={"user_id": "test_user", "text": "Trash?"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) == 60
+    assert mock_generate.call_count == 1
+
+@patch("app.main.get_cached_response", return_value=None)
+def test_reflection_stream_reports_global_limit(mock_cache):
+    main.rate_limiter = RateLimiter(None)
+    main.gemini_limit = TokenBucket(rate=1 / 60, burst=1)
+    main.gemini_limit.acquire()
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        response = client.post("/ai/generate-reflection/stream", json={"user_id": "test_user", "context": {}})
+
+    assert "event: error" in response.text
+    assert '"retry_after": 60' in response.text
+    mock_generate.assert_not_called()
@@ -0,0 +1,251 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app, verify_firebase_token
+from app.concurrency import GenerationPool
+from app.resilience import CircuitBreaker, CircuitOpenError, CLOSED, OPEN, HALF_OPEN, hedge, parse_durations
+import pytest
+
+client = TestClient(app)
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture(autouse=True)
+def setup():
+    main.ai_cache.clear()
+    previous = main.gemini_breaker
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+    main.gemini_breaker = previous
+    main.ai_cache.clear()
+
+def breaker(clock, **kwargs):
+    options = dict(window=10, min_calls=4, failure_rate=0.5, slow_call_seconds=2.0, slow_call_rate=0.75,
+                   open_seconds=30.0, half_open_calls=2, clock=clock)
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+# --- Unit Tests ---
+
+def test_breaker_opens_on_failure_rate_after_min_calls():
+    b = breaker(FakeClock())
+    for ok in (False, False, True):
+        b.record(ok, 0.1)
+    assert b.state == CLOSED
+    b.record(True, 0.1)
+    assert b.state == OPEN
+    assert not b.allow()
+    with pytest.raises(CircuitOpenError) as error:
+        b.check()
+    assert error.value.retry_after == pytest.approx(30.0)
+    assert b.stats()["rejected"] == 2
+
+def test_breaker_opens_on_slow_calls():
+    b = breaker(FakeClock())
+    for seconds in (3.0, 3.0, 3.0, 0.1):
+        b.record(True, seconds)
+    assert b.state == OPEN
+
+def test_breaker_half_open_probes_close_or_reopen():
+    clock = FakeClock()
+    b = breaker(clock)
+    for _ in range(4):
+        b.record(False, 0.1)
+    clock.now += 30
+    assert b.state == HALF_OPEN
+    assert b.allow() and b.allow()
+    # Only half_open_calls probes at a time
+    assert not b.allow()
+    b.record(True, 0.1)
+    b.record(True, 0.1)
+    assert b.state == CLOSED
+
+    for _ in range(4):
+        b.record(False, 0.1)
+    clock.now += 30
+    assert b.allow()
+    b.record(False, 0.1)
+    assert b.state == OPEN
+    assert b.stats()["opened"] == 3
+
+def test_breaker_writes_off_probes_that_never_report():
+    clock = FakeClock()
+    b = breaker(clock)
+    for _ in range(4):
+        b.record(False, 0.1)
+    clock.now += 30
+    assert b.allow() and b.allow()
+    assert not b.allow()
+    clock.now += 30
+    assert b.allow()
+
+def test_hedge_returns_the_faster_attempt_and_cancels_the_other():
+    calls = []
+    cancelled = []
+
+    async def call():
+        index = len(calls)
+        calls.append(index)
+        try:
+            await asyncio.sleep(1.0 if index == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return f"attempt {index}"
+
+    async def scenario():
+        result = await hedge(call, delay=0.05)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == ("attempt 1", 1)
+    assert cancelled == [0]
+
+def test_hedge_skips_second_attempt_for_fast_calls():
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return "fast"
+
+    assert asyncio.run(hedge(call, delay=0.05)) == ("fast", 0)
+    assert asyncio.run(hedge(call, delay=None)) == ("fast", 0)
+    assert len(calls) == 2
+
+def test_hedge_raises_the_first_error_when_both_attempts_fail():
+    calls = []
+
+    async def call():
+        index = len(calls)
+        calls.append(index)
+        await asyncio.sleep(0.1 if index == 0 else 0.0)
+        raise RuntimeError(f"attempt {index} failed")
+
+    with pytest.raises(RuntimeError, match="attempt 0 failed"):
+        asyncio.run(hedge(call, delay=0.01))
+
+def test_hedge_skips_cancelled_attempts():
+    calls = []
+
+    async def call():
+        index = len(calls)
+        calls.append(index)
+        if index == 0:
+            # Cancelled from outside hedge, after the second attempt started
+            await asyncio.sleep(0.05)
+            raise asyncio.CancelledError()
+        raise RuntimeError(f"attempt {index} failed")
+
+    with pytest.raises(RuntimeError, match="attempt 1 failed"):
+        asyncio.run(hedge(call, delay=0.01))
+
+def test_parse_durations():
+    assert parse_durations("reflection=15, neutralize=2.5") == {"reflection": 15.0, "neutralize": 2.5}
+    with pytest.raises(ValueError):
+        parse_durations("reflection")
+
+# --- Integration Tests (Mocked) ---
+
+@patch("app.main.get_cached_response", return_value=None)
+def test_open_circuit_returns_503_without_calling_gemini(mock_get_cache):
+    main.gemini_breaker = breaker(FakeClock())
+    for _ in range(4):
+        main.gemini_breaker.record(False, 0.1)
+
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        response = client.post("/ai/refine-request", json={"user_id": "test_user", "text": "Do the dishes?"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "30"
+    mock_generate.assert_not_called()
+
+@patch("app.main.get_cached_response", return_value=None)
+def test_open_circuit_serves_the_vocabulary_fallback(mock_get_cache):
+    main.gemini_breaker = breaker(FakeClock())
+    for _ in range(4):
+        main.gemini_breaker.record(False, 0.1)
+    suggester = MagicMock()
+    suggester.suggest_feelings.return_value = ["hurt", "tired", "sad"]
+
+    with patch("app.main.get_loaded_suggester", return_value=suggester), \
+         patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        response = client.post("/ai/suggest-feelings", json={"user_id": "test_user", "text": "You left"})
+
+    assert response.status_code == 200
+    assert response.json() == {"result": ["hurt", "tired", "sad"], "alternatives": None, "is_offensive": False,
+                               "from_cache": False, "engine": "vocabulary"}
+    mock_generate.assert_not_called()
+
+@patch("app.main.get_cached_response", return_value=None)
+def test_deadline_returns_504_and_counts_against_the_breaker(mock_get_cache):
+    main.gemini_breaker = breaker(FakeClock())
+
+    async def slow(prompt):
+        await asyncio.sleep(1)
+
+    with patch.dict(main.AI_DEADLINES, {"refine": 0.05}), \
+         patch("app.main.model.generate_content_async", side_effect=slow):
+        response = client.post("/ai/refine-request", json={"user_id": "test_user", "text": "Do the dishes?"})
+
+    assert response.status_code == 504
+    assert response.json()["detail"] == "AI service timed out, please retry"
+    assert main.gemini_breaker.stats()["failures"] == 1
+
+def test_deadline_spent_waiting_for_a_slot_spares_the_breaker():
+    main.gemini_breaker = breaker(FakeClock())
+
+    async def scenario():
+        pool = GenerationPool(1, 5)
+        with patch("app.main.generation_pool", pool):
+            # Every slot is taken by other work for longer than the deadline
+            async with pool.slot():
+                with pytest.raises(asyncio.TimeoutError):
+                    await main.generate_content("prompt", timeout=0.05, task="refine")
+
+    before = main.GEMINI_DURATION.count(task="refine", outcome="queue_timeout")
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        asyncio.run(scenario())
+
+    mock_generate.assert_not_called()
+    assert main.gemini_breaker.stats()["failures"] == 0
+    assert main.GEMINI_DURATION.count(task="refine", outcome="queue_timeout") == before + 1
+
+@patch("app.main.save_cached_response")
+@patch("app.main.get_cached_response", return_value=None)
+def test_slow_call_is_hedged(mock_get_cache, mock_save):
+    main.gemini_breaker = breaker(FakeClock())
+    replies = iter([1.0, 0.0])
+
+    async def generate(prompt):
+        await asyncio.sleep(next(replies))
+        return MagicMock(text="Judgment: No\nAlternatives: none")
+
+    before = main.AI_HEDGES.value(task="refine", winner="hedge")
+    with patch("app.main.hedge_delay", return_value=0.05), \
+         patch("app.main.model.generate_content_async", side_effect=generate) as mock_generate:
+        response = client.post("/ai/refine-request", json={"user_id": "test_user", "text": "Do the dishes?"})
+
+    assert response.status_code == 200
+    assert mock_generate.call_count == 2
+    assert main.AI_HEDGES.value(task="refine", winner="hedge") == before + 1
+
+def test_hedge_delay_follows_p95_latency():
+    with patch("app.main.AI_HEDGE_ENABLED", True), patch("app.main.AI_HEDGE_MIN_SAMPLES", 5):
+        assert main.hedge_delay("hedge_test") is None
+        for _ in range(10):
+            main.GEMINI_DURATION.observe(0.8, task="hedge_test", outcome="ok")
+        assert 0.5 <= main.hedge_delay("hedge_test") <= 1.0
+    assert main.hedge_delay("hedge_test") is None
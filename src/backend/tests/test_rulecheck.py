@@ -0,0 +1,87 @@
+import json
+import sys
+import os
+from unittest.mock import patch
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.rulecheck import (ERROR, WARNING, backtracking_risks, dart_incompatibilities, lint_rules,
+                           node_regexp_errors, word_entry_issues)
+from app.vocabulary import load_bundle
+import pytest
+
+BUNDLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app", "vocabulary_bundle.json")
+
+def severities(issues):
+    return sorted(issue.severity for issue in issues)
+
+# --- Unit Tests ---
+
+def test_shipped_rules_have_no_errors():
+    rules = load_bundle(BUNDLE)["validation_rules"]
+    assert [i for i in lint_rules(rules) if i.severity == ERROR] == []
+
+@pytest.mark.parametrize("pattern", [r"(?P<who>you)", r"\Ayou", r"you\Z", r"(?>you)", r"(?#note)you", r"you{,3}",
+                                     r"(?s)you", r"x(?i)you", r"you++", r"[[:alpha:]]", r"[]x]"])
+def test_python_only_syntax_is_flagged_for_dart(pattern):
+    assert dart_incompatibilities(pattern)
+
+@pytest.mark.parametrize("pattern", [r"(?i)\byou\s+(always|never)", r"(?i)\bwhy\s+can\'?t\s+you", r"(?<=I )feel",
+                                     r"\(\?P<literal", r"[+*]+", r"a{0,3}"])
+def test_portable_patterns_pass_the_dart_check(pattern):
+    assert dart_incompatibilities(pattern) == []
+
+def test_backtracking_red_flags():
+    assert backtracking_risks(r"(a+)+b")
+    assert backtracking_risks(r"(?i)\byou(\s*\w*)*!")
+    assert backtracking_risks(r"\s+\s*x")
+    assert backtracking_risks(r".*.*=")
+    # Adjacent repeats over disjoint characters are linear
+    assert backtracking_risks(r"(?i)\byou\s+\w+\s+\w+") == []
+    assert backtracking_risks(r"(?i)\byou\s+(always|never)") == []
+    # Group syntax the reader has to step over: named groups, backreferences, lookarounds, comments
+    assert backtracking_risks(r"(?P<who>you)(?:\s*\w+)+!")
+    assert backtracking_risks(r"(?P<w>\w)(?P=w)+\s+(?=!)(?#end)") == []
+    assert backtracking_risks(r"\w+(?=\s)\w+") == []
+
+def test_word_entries_that_word_boundaries_cant_match():
+    assert severities(word_entry_issues("violent_words", "a$$")) == [ERROR]
+    assert severities(word_entry_issues("violent_words", "café")) == [WARNING]
+    assert severities(word_entry_issues("violent_words", "shut up")) == [WARNING]
+    # The app doesn't check pseudo-feelings, so multi-word entries only matter for violent words
+    assert word_entry_issues("pseudo_feelings", "let down") == []
+    assert severities(word_entry_issues("violent_words", " ")) == [ERROR]
+
+def test_lint_reports_each_kind_of_problem():
+    rules = {
+        "blame_patterns": [r"(?i)\byou\s+should", r"(?i)\byou\s+should", r"(unclosed", r"(?i)x*", r"(?P<n>you)"],
+        "violent_words": ["idiot", "Idiot"],
+        "pseudo_feelings": ["idiot"],
+    }
+    issues = lint_rules(rules, check_engine=False)
+    messages = {(i.rule, i.message.split(" ")[0]) for i in issues}
+    assert ("(unclosed", "doesn't") in messages
+    assert (r"(?i)x*", "matches") in messages
+    assert (r"(?i)\byou\s+should", "duplicate") in messages
+    assert ("Idiot", "duplicate") in messages
+    assert ("idiot", "also") in messages
+    assert any(i.rule == "(?P<n>you)" and i.severity == ERROR for i in issues)
+
+def test_engine_check_uses_node_when_available():
+    with patch("app.rulecheck.shutil.which", return_value=None):
+        assert node_regexp_errors([r"(?P<x>a)"]) is None
+    if node_regexp_errors([]) is None:
+        pytest.skip("node is not installed")
+    errors = node_regexp_errors([r"(?i)\byou\s+should", r"(?P<x>a)", "a++"])
+    assert set(errors) == {r"(?P<x>a)", "a++"}
+
+# --- Integration Tests ---
+
+def test_cli_fails_on_lint_errors(tmp_path, capsys):
+    from check_rules import main
+    assert main(["--lint-only", "--no-node"]) == 0
+    draft = tmp_path / "rules.json"
+    draft.write_text(json.dumps({"blame_patterns": [r"(?P<who>you)\s+should"], "violent_words": ["idiot"]}))
+    assert main(["--lint-only", "--no-node", "--rules", str(draft)]) == 1
+    assert "(?P...)" in capsys.readouterr().out
@@ -0,0 +1,86 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app
+from app.safety import SafetyMatcher, mask_spans
+import pytest
+
+client = TestClient(app)
+
+RULES = {
+    "blame_patterns": [
+        r"(?i)\byou\s+(always|never)",
+        r"(?i)\bwhy\s+can\'?t\s+you",
+        r"(unclosed",
+    ],
+    "violent_words": ["idiot", "lazy", "shut up", "hell"],
+    "pseudo_feelings": ["ignored", "let down"],
+}
+
+@pytest.fixture
+def matcher():
+    return SafetyMatcher.from_rules(RULES)
+
+# --- Unit Tests ---
+
+def test_matcher_reports_spans_and_categories(matcher):
+    text = "You NEVER listen, you idiot. I felt let  down."
+    matches = matcher.find(text)
+    assert [(m.category, m.text) for m in matches] == [
+        ("blame", "You NEVER"),
+        ("violent", "idiot"),
+        ("pseudo_feeling", "let  down"),
+    ]
+    assert text[matches[1].start:matches[1].end] == "idiot"
+
+def test_violent_word_inside_a_blame_phrase_is_reported_and_masked():
+    matcher = SafetyMatcher.from_rules({**RULES, "blame_patterns": [r"(?i)\byou\s+are\s+a\s+\w+"]})
+    text = "You are a idiot"
+    matches = matcher.find(text)
+    assert [(m.category, m.text) for m in matches] == [("blame", "You are a idiot"), ("violent", "idiot")]
+    assert mask_spans(text, matches) == "You are a *****"
+
+def test_matcher_respects_word_boundaries(matcher):
+    assert matcher.find("Hello, the shell is blazy") == []
+
+def test_matcher_skips_invalid_patterns(matcher):
+    # "(unclosed" is dropped instead of breaking the whole matcher
+    assert matcher.rule_count == 2 + 4 + 2
+
+def test_mask_spans_only_masks_violent(matcher):
+    text = "You always shut up"
+    assert mask_spans(text, matcher.find(text)) == "You always **** **"
+
+# --- Integration Tests (Mocked) ---
+
+@patch("app.main._safety_matcher", SafetyMatcher.from_rules(RULES))
+def test_analyze_safety_endpoint():
+    response = client.post("/analyze/safety", json={"text": "You are so lazy"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["is_safe"] is False
+    assert data["flagged"] is True
+    assert data["categories"] == ["violent"]
+    assert data["censored_text"] == "You are so ****"
+
+@patch("app.main._safety_matcher", SafetyMatcher.from_rules(RULES))
+def test_analyze_safety_batch_endpoint():
+    response = client.post(
+        "/analyze/safety/batch",
+        json={"texts": ["The dishes are in the sink", "I felt ignored", "Why can't you help"]}
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["is_safe"] for r in results] == [True, True, False]
+    assert results[1]["categories"] == ["pseudo_feeling"]
+    assert results[2]["categories"] == ["blame"]
+
+@patch("app.main._safety_matcher", SafetyMatcher.from_rules(RULES))
+def test_analyze_safety_batch_limit():
+    response = client.post("/analyze/safety/batch", json={"texts": ["ok"] * 101})
+    assert response.status_code == 422
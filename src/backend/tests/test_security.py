@@ -1,5 +1,5 @@
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
 import pytest
@@ -38,9 +38,10 @@ def test_attack_invalid_token(mock_verify):
     assert response.status_code == 401
     assert "Invalid or expired authentication token" in response.json()["detail"]
 
+@patch("app.main.AUTH_CHECK_REVOKED", False)
 @patch("app.main.auth.verify_id_token")
 @patch("app.main.db.collection")
-@patch("app.main.model.generate_content")
+@patch("app.main.model.generate_content_async", new_callable=AsyncMock)
 def test_attack_spoofing_user_id(mock_generate, mock_db, mock_verify):
     """Attempting to spoof another user_id in the body should be ignored/corrected."""
     # Setup Auth Mock (User is 'valid_user')
@@ -71,9 +72,11 @@ def test_attack_spoofing_user_id(mock_generate, mock_db, mock_verify):
     # but here we verify the attack didn't crash or reject unnecessarily, 
     # ensuring the middleware overwrote the ID safely.
 
+@patch("app.main.AUTH_CHECK_REVOKED", False)
 @patch("app.main.auth.verify_id_token")
 @patch("app.main.db.collection")
-def test_attack_non_premium_access(mock_db, mock_verify):
+@patch("app.main.model.generate_content_async", new_callable=AsyncMock)
+def test_attack_non_premium_access(mock_generate, mock_db, mock_verify):
     """Attempting to access AI features without premium should fail (if enforcement is on)."""
     # Setup Auth Mock
     mock_verify.return_value = {"uid": "freeloader"}
@@ -84,6 +87,9 @@ def test_attack_non_premium_access(mock_db, mock_verify):
     mock_user_doc.to_dict.return_value = {} # No premium field
     mock_db.return_value.document.return_value.get.return_value = mock_user_doc
 
+    # Setup Gemini Mock
+    mock_generate.return_value.text = "Judgment: No"
+
     # Note: In the current code, I left the final check permissive for v0.1:
     # "return uid" is reached even if checks fail, with a TODO to uncomment raise.
     # To test the PROTECTION, we technically need that raise uncommented.
@@ -0,0 +1,90 @@
+import json
+from unittest.mock import patch
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.locales import localized_document_id
+from app.vocabulary import build_bundle
+from benchmarks.fakes import FakeFirestore
+from benchmarks.run import _quiet_import
+import pytest
+
+@pytest.fixture
+def seed():
+    db = FakeFirestore()
+    seed_data = _quiet_import("seed_data", db)
+    yield seed_data, db
+
+# --- Unit Tests ---
+
+def test_word_lists_are_sorted_and_unique_across_categories(seed):
+    seed_data, _ = seed
+    feelings = seed_data.normalize_vocabulary({"categories": [
+        {"name": "Happy", "words": ["Glad", "Content"]},
+        {"name": "Relaxed", "words": ["content", "Calm"]},
+    ]})
+    assert [c["words"] for c in feelings["categories"]] == [["Content", "Glad"], ["Calm"]]
+
+    for name in ("feelings", "needs"):
+        words = [w.casefold() for c in seed_data.build_documents()[("nvc_vocabulary", name)]["categories"]
+                 for w in c["words"]]
+        assert len(words) == len(set(words)), name
+
+def test_shipped_bundle_matches_the_seed_data(seed):
+    seed_data, _ = seed
+    with open(seed_data.BUNDLE_PATH, encoding="utf-8") as f:
+        shipped = json.load(f)
+    documents = seed_data.build_documents()
+    expected = build_bundle({name: documents[key] for name, key in seed_data.BUNDLE_PARTS.items()}, shipped["version"])
+    assert shipped == expected, "app/vocabulary_bundle.json is stale, run seed_data.py"
+
+def test_other_locales_are_seeded_under_suffixed_ids(seed):
+    seed_data, _ = seed
+    spanish = {"validation_rules": {"blame_patterns": [], "violent_words": ["idiota"], "pseudo_feelings": []}}
+    with patch.dict(seed_data.LOCALES, {"es": spanish}):
+        documents = seed_data.build_documents()
+    assert documents[("config_metadata", "validation_rules_es")]["violent_words"] == ["idiota"]
+    assert ("nvc_vocabulary", "feelings_es") not in documents
+    # English keeps the IDs the bundle and older app versions read
+    assert ("config_metadata", "validation_rules") in documents
+
+def test_every_supported_locale_has_its_own_documents(seed):
+    import app.main as main
+    seed_data, _ = seed
+    documents = seed_data.build_documents()
+    for locale in main.SUPPORTED_LOCALES:
+        for name, (collection, document) in seed_data.BUNDLE_PARTS.items():
+            assert (collection, localized_document_id(document, locale)) in documents, \
+                f"{locale} is in SUPPORTED_LOCALES but seed_data.py has no {name} for it"
+
+# --- Integration Tests (Mocked) ---
+
+def test_seeding_writes_only_changed_documents(seed, tmp_path):
+    seed_data, db = seed
+    bundle = tmp_path / "bundle.json"
+    first = seed_data.seed_database(db, bundle_path=str(bundle))
+    assert first["version"] == 1 and len(first["written"]) == 4
+    assert json.loads(bundle.read_text())["version"] == 1
+
+    writes = db.writes
+    again = seed_data.seed_database(db, bundle_path=str(bundle))
+    assert (again["version"], again["written"]) == (1, [])
+    assert db.writes == writes
+
+    # A hand edit in the console is noticed and only that document is restored
+    db.collection("config_metadata").document("templates").set({})
+    batches = db.batches
+    third = seed_data.seed_database(db, bundle_path=None)
+    assert (third["version"], third["written"]) == (2, ["config_metadata/templates"])
+    assert db.batches == batches + 1
+    assert db.collection("config_metadata").document("content_manifest").get().to_dict()["version"] == 2
+
+def test_dry_run_writes_nothing(seed, tmp_path):
+    seed_data, db = seed
+    result = seed_data.seed_database(db, bundle_path=str(tmp_path / "bundle.json"), dry_run=True)
+    assert result["version"] == 0
+    assert db.writes == 0
+    assert not (tmp_path / "bundle.json").exists()
@@ -0,0 +1,176 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+import asyncio
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app, verify_firebase_token
+from app.sessions import (ACTIVE, EXPRESSION_PHASE, FINISHED, MESSAGE_SENT, NOOP, SHARED_CLOSING, TURN_COMPLETE,
+                          WAITING_FOR_PARTNER, KeyedLocks, MemorySessionStore, TransitionError, check_settled,
+                          new_session, plan_transition)
+import pytest
+
+client = TestClient(app)
+
+MESSAGE = {"observation": "When the dishes stayed in the sink", "emotions": ["hurt"], "need": "support",
+           "request": "Would you be willing to do them tonight?"}
+
+@pytest.fixture(autouse=True)
+def setup():
+    previous = main.session_store
+    main.session_store = MemorySessionStore()
+    main.session_cache.clear()
+    caller = {"uid": "alice"}
+    app.dependency_overrides[verify_firebase_token] = lambda: caller["uid"]
+    yield caller
+    app.dependency_overrides = {}
+    main.session_store = previous
+    main.session_cache.clear()
+
+def event(caller, uid, session_id, name, **body):
+    caller["uid"] = uid
+    return client.post(f"/sessions/{session_id}/events", json={"event": name, **body})
+
+def shared_session(caller):
+    caller["uid"] = "alice"
+    session_id = client.post("/sessions", json={"mode": "shared"}).json()["session_id"]
+    assert event(caller, "bob", session_id, "join").json()["status"] == ACTIVE
+    return session_id
+
+# --- Unit Tests ---
+
+def test_join_fills_the_session_once():
+    session = new_session("alice", "shared")
+    assert session["status"] == WAITING_FOR_PARTNER
+    joined = plan_transition(session, {}, "bob", "join")
+    assert joined.session == {"participants": ["alice", "bob"], "status": ACTIVE}
+    assert plan_transition({**session, **joined.session}, {}, "bob", "join") is NOOP
+    with pytest.raises(TransitionError) as error:
+        plan_transition({**session, **joined.session}, {}, "carol", "join")
+    assert error.value.status_code == 409
+
+def test_regulation_starts_expression_when_both_are_ready():
+    session = {**new_session("alice", "shared"), "participants": ["alice", "bob"], "status": ACTIVE}
+    first = plan_transition(session, {}, "alice", "regulation_complete")
+    # Only the participant's own state is written until both are ready
+    assert first.session == {} and list(first.participants) == ["alice"]
+    second = plan_transition(session, first.participants, "bob", "regulation_complete", choose=lambda ids: ids[-1])
+    assert second.session["status"] == EXPRESSION_PHASE
+    assert second.session["current_speaker"] == "bob"
+
+def test_only_the_right_participant_may_act():
+    session = {**new_session("alice", "shared"), "participants": ["alice", "bob"], "status": EXPRESSION_PHASE,
+               "current_speaker": "alice"}
+    for uid, name in (("alice", "listener_ready"), ("bob", "send_message"), ("bob", "next_turn")):
+        with pytest.raises(TransitionError) as error:
+            plan_transition(session, {}, uid, name, MESSAGE)
+        assert error.value.status_code == 409
+    with pytest.raises(TransitionError) as error:
+        plan_transition(session, {}, "mallory", "finish")
+    assert error.value.status_code == 403
+
+def test_check_settled_only_decides_permanent_outcomes():
+    view = {"version": 4, "status": EXPRESSION_PHASE, "mode": "shared", "participants": ["alice", "bob"]}
+    assert check_settled(view, "alice", "listener_ready") is False
+    with pytest.raises(TransitionError):
+        check_settled(view, "alice", "listener_ready", version=3)
+    with pytest.raises(TransitionError) as error:
+        check_settled(view, "mallory", "listener_ready")
+    assert error.value.status_code == 403
+    assert check_settled({**view, "status": FINISHED}, "bob", "finish") is True
+
+def test_keyed_locks_serialize_per_key_and_clean_up():
+    locks = KeyedLocks()
+    order = []
+
+    async def hold(key, name):
+        async with locks.hold(key):
+            order.append(f"{name} in")
+            await asyncio.sleep(0.01)
+            order.append(f"{name} out")
+
+    async def scenario():
+        await asyncio.gather(hold("s1", "a"), hold("s1", "b"), hold("s2", "c"))
+
+    asyncio.run(scenario())
+    assert order.index("a out") < order.index("b in")
+    assert order.index("c in") < order.index("a out")
+    assert len(locks) == 0 and locks.contended == 1
+
+# --- Integration Tests ---
+
+def test_full_shared_session(setup):
+    caller = setup
+    session_id = shared_session(caller)
+    assert event(caller, "alice", session_id, "regulation_complete").json()["ready"] == ["alice"]
+    with patch("app.main.choose_first_speaker", lambda ids: "alice"):
+        state = event(caller, "bob", session_id, "regulation_complete").json()
+    assert (state["status"], state["current_speaker"]) == (EXPRESSION_PHASE, "alice")
+
+    assert event(caller, "bob", session_id, "listener_ready").json()["listener_status"] == "ready"
+    assert event(caller, "alice", session_id, "send_message", message=MESSAGE).json()["status"] == MESSAGE_SENT
+    assert event(caller, "bob", session_id, "confirm_reflection").json()["status"] == TURN_COMPLETE
+    state = event(caller, "alice", session_id, "next_turn").json()
+    assert (state["status"], state["current_speaker"], state["turns_completed"]) == (EXPRESSION_PHASE, "bob", 1)
+
+    event(caller, "alice", session_id, "listener_ready")
+    event(caller, "bob", session_id, "send_message", message=MESSAGE)
+    event(caller, "alice", session_id, "confirm_reflection")
+    assert event(caller, "bob", session_id, "next_turn").json()["status"] == SHARED_CLOSING
+
+    session, states = main.session_store.get(session_id)
+    assert session["current_message"]["senderId"] == "bob"
+    assert states["alice"]["emotions"] == ["hurt"]
+
+def test_repeated_events_write_nothing(setup):
+    caller = setup
+    session_id = shared_session(caller)
+    first = event(caller, "alice", session_id, "finish").json()
+    assert first["status"] == FINISHED
+    with patch.object(main.session_store, "transact", wraps=main.session_store.transact) as transact:
+        again = event(caller, "bob", session_id, "finish").json()
+    # Answered from the instance's cached state
+    transact.assert_not_called()
+    assert again["version"] == first["version"]
+    assert event(caller, "alice", session_id, "listener_ready").status_code == 409
+
+def test_concurrent_next_turn_applies_once(setup):
+    caller = setup
+    session_id = shared_session(caller)
+    event(caller, "alice", session_id, "regulation_complete")
+    event(caller, "bob", session_id, "regulation_complete")
+    speaker = main.session_cache.get(session_id)["current_speaker"]
+    listener = "bob" if speaker == "alice" else "alice"
+    event(caller, listener, session_id, "listener_ready")
+    event(caller, speaker, session_id, "send_message", message=MESSAGE)
+    version = event(caller, listener, session_id, "confirm_reflection").json()["version"]
+
+    # Both phones tap "Start Next Turn" on the same screen
+    first = event(caller, "alice", session_id, "next_turn", version=version)
+    second = event(caller, "bob", session_id, "next_turn", version=version)
+    assert first.status_code == 200 and first.json()["turns_completed"] == 1
+    assert second.status_code == 409
+    assert second.json()["detail"] == {"message": "Session has changed, refresh and try again",
+                                       "version": first.json()["version"]}
+
+def test_strangers_cannot_act_or_read(setup):
+    caller = setup
+    session_id = shared_session(caller)
+    assert event(caller, "mallory", session_id, "finish").status_code == 403
+    assert event(caller, "mallory", session_id, "join").status_code == 409
+    caller["uid"] = "mallory"
+    assert client.get(f"/sessions/{session_id}").status_code == 403
+    assert event(caller, "alice", "missing", "finish").status_code == 404
+
+def test_solo_session_closes_after_the_message(setup):
+    caller = setup
+    created = client.post("/sessions", json={"mode": "solo"}).json()
+    assert created["session_id"].startswith("solo_alice_")
+    session_id = created["session_id"]
+    assert event(caller, "alice", session_id, "regulation_complete").json()["status"] == EXPRESSION_PHASE
+    assert event(caller, "alice", session_id, "send_message", message=MESSAGE).json()["status"] == SHARED_CLOSING
+    assert main.SESSION_TRANSITIONS.value(event="send_message", outcome="applied") >= 1
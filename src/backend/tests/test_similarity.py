@@ -0,0 +1,82 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from app.main import app, verify_firebase_token
+from app.similarity import SimilarityCache, hashed_ngram_embedding, negation_signature
+import pytest
+
+client = TestClient(app)
+
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+
+# --- Unit Tests ---
+
+def test_embedding_is_normalized_and_tolerates_rephrasing():
+    a = hashed_ngram_embedding("You never do the dishes!")
+    b = hashed_ngram_embedding("you never do the  dishes")
+    c = hashed_ngram_embedding("I waited an hour at the station")
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    assert float(a @ b) > 0.99
+    assert float(a @ c) < 0.5
+
+def test_similarity_cache_threshold_and_scope():
+    cache = SimilarityCache(threshold=0.9, capacity=10)
+    cache.add("needs", "You never do the dishes", ["support"], scope="tired")
+    assert cache.lookup("needs", "you never do the dishes!", scope="tired")[0] == ["support"]
+    # Same text but generated for different feelings must not match
+    assert cache.lookup("needs", "you never do the dishes", scope="angry") is None
+    assert cache.lookup("needs", "I waited an hour at the station", scope="tired") is None
+    stats = cache.stats()
+    assert stats["lookups"] == 3
+    assert stats["hits"] == 1
+
+@pytest.mark.parametrize("text,negated", [
+    ("My partner did not come home last night", "My partner did come home last night"),
+    ("You didn't call me yesterday after work", "You did call me yesterday after work"),
+    ("You never said goodbye this morning", "You said goodbye this morning"),
+])
+def test_negated_texts_never_share_an_entry(text, negated):
+    cache = SimilarityCache(threshold=0.5, capacity=10)
+    cache.add("feelings", text, ["hurt"])
+    assert cache.lookup("feelings", negated) is None
+    # The same negation, spelled differently, still matches
+    assert cache.lookup("feelings", text.replace("didn't", "did not")) is not None
+    assert negation_signature("You didn't call") == negation_signature("You didnt call") == "not"
+
+def test_similarity_cache_ttl_and_capacity():
+    now = [1000.0]
+    cache = SimilarityCache(threshold=0.9, capacity=2, ttl=60, clock=lambda: now[0])
+    cache.add("feelings", "first text here", ["a"])
+    cache.add("feelings", "second text here", ["b"])
+    cache.add("feelings", "third text here", ["c"])
+    assert cache.stats()["entries"] == {"feelings": 2}
+    assert cache.lookup("feelings", "first text here") is None
+    now[0] += 61
+    assert cache.lookup("feelings", "third text here") is None
+
+# --- Integration Tests (Mocked) ---
+
+@patch("app.main.SHARED_CACHE_ENABLED", True)
+@patch("app.main.shared_cache", SimilarityCache(threshold=0.9))
+@patch("app.main.get_cached_response", return_value=None)
+@patch("app.main.save_cached_response")
+def test_shared_cache_serves_other_users(mock_save, mock_get_cache):
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = MagicMock(text="hurt, tired, lonely")
+        first = client.post("/ai/suggest-feelings", json={"user_id": "test_user", "text": "You never do the dishes"})
+        app.dependency_overrides[verify_firebase_token] = lambda: "other_user"
+        second = client.post("/ai/suggest-feelings", json={"user_id": "other_user", "text": "you never do the dishes!"})
+
+    assert first.json()["from_cache"] is False
+    assert second.json() == {**first.json(), "from_cache": True}
+    assert mock_generate.call_count == 1
@@ -0,0 +1,115 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock
+import subprocess
+import sys
+import os
+import threading
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app.startup import Lazy, ProcessState, StartupTimer
+import app.main as main
+from app.main import app
+
+client = TestClient(app)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --- Lazy / StartupTimer ---
+
+def test_lazy_creates_once_on_first_use_and_records_the_phase():
+    timer = StartupTimer()
+    created = []
+
+    def factory():
+        created.append(1)
+        return MagicMock(name="client")
+
+    lazy = Lazy("client", factory, timer)
+    assert not lazy.initialized and created == []
+
+    threads = [threading.Thread(target=lambda: lazy.collection("x")) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert created == [1]
+    assert lazy.initialized
+    assert [p["name"] for p in timer.report()["phases"]] == ["client"]
+
+def test_lazy_does_not_create_for_private_attributes():
+    lazy = Lazy("client", lambda: pytest.fail("should not be created"))
+    assert not hasattr(lazy, "_private")
+    assert "pending" in repr(lazy)
+
+def test_lazy_override_skips_the_factory_until_reset():
+    created = []
+    lazy = Lazy("client", lambda: created.append(1) or MagicMock(name="real"))
+    fake = MagicMock(name="fake")
+    lazy.override(fake)
+    assert lazy.get() is fake and lazy.initialized and created == []
+    lazy.reset()
+    assert not lazy.initialized
+    assert lazy.get() is not fake and created == [1]
+
+def test_importing_main_creates_no_clients():
+    code = (
+        "import sys, app.main as m; "
+        "print('vertexai' in sys.modules, m.db.initialized, m.model.initialized, m.profanity_filter.initialized)"
+    )
+    result = subprocess.run([sys.executable, "-W", "ignore", "-c", code], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["False", "False", "False", "False"]
+
+def test_process_state_replaces_and_restores_every_registered_global():
+    namespace = {}
+    state = ProcessState(namespace)
+    closed = []
+    namespace["cache"] = state.register("cache", dict)
+    namespace["backend"] = state.register("backend", lambda: MagicMock(name="backend"), close=closed.append)
+    original = dict(namespace)
+
+    fake = MagicMock(name="fake")
+    with state.replaced(backend=fake):
+        assert namespace["backend"] is fake
+        assert namespace["cache"] == {} and namespace["cache"] is not original["cache"]
+        replacement = MagicMock(name="replacement")
+        state.reset("cache", backend=replacement)
+        # Swapped-out values are closed, and so is what's in place on the way out
+        assert closed == [fake]
+    assert closed == [fake, replacement]
+    assert namespace == original
+    with pytest.raises(KeyError):
+        state.reset("unknown")
+
+# --- /warmup ---
+
+def test_warmup_initializes_clients_once_and_reports_phases():
+    main._warmup_report = None
+    with patch("app.main.vocabulary_store") as mock_store, \
+         patch("app.main.get_safety_matcher") as mock_matcher, \
+         patch("app.main.model") as mock_model:
+        first = client.get("/warmup")
+        second = client.get("/warmup")
+    assert first.status_code == 200
+    body = first.json()
+    assert body["steps"] == {"profanity": "ok", "firestore": "ok", "vocabulary": "ok", "vertex_ai": "ok"}
+    assert {"imports", "app_setup", "warmup_vertex_ai"} <= {p["name"] for p in body["phases"]}
+    assert second.json() == body
+    mock_model.count_tokens.assert_called_once()
+    mock_store.get.assert_called_once()
+    main._warmup_report = None
+
+def test_warmup_reports_failed_steps_without_failing():
+    main._warmup_report = None
+    with patch("app.main.vocabulary_store") as mock_store, \
+         patch("app.main.get_safety_matcher"), \
+         patch("app.main.model") as mock_model:
+        mock_model.count_tokens.side_effect = RuntimeError("no credentials")
+        response = client.get("/warmup")
+    assert response.status_code == 200
+    assert response.json()["steps"]["vertex_ai"] == "error: no credentials"
+    main._warmup_report = None
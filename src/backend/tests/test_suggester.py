@@ -0,0 +1,100 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import time
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.main import app, verify_firebase_token
+from app.suggester import VocabularySuggester, build_suggester
+import pytest
+
+client = TestClient(app)
+
+FEELINGS = {"categories": [
+    {"name": "Sad", "words": ["Depressed", "Disappointed", "Heavy", "Dejected"]},
+    {"name": "Angry", "words": ["Annoyed", "Irritated", "Fed up", "Furious"]},
+    {"name": "Afraid", "words": ["Anxious", "Worried", "Insecure"]},
+]}
+NEEDS = {"categories": [
+    {"name": "Connection", "words": ["Consideration", "Cooperation", "Respect", "Empathy", "Support", "Trust",
+                                     "Understanding", "Inclusion", "Safety"]},
+    {"name": "Meaning", "words": ["To matter", "Clarity"]},
+]}
+
+@pytest.fixture
+def suggester():
+    return VocabularySuggester(FEELINGS, NEEDS)
+
+@pytest.fixture(autouse=True)
+def override_auth():
+    app.dependency_overrides[verify_firebase_token] = lambda: "test_user"
+    yield
+    app.dependency_overrides = {}
+
+# --- Unit Tests ---
+
+def test_feelings_follow_situation_keywords(suggester):
+    # "dishes" and "again" point to Angry, "left" to Sad; Afraid pads as a default
+    assert suggester.suggest_feelings("You left the dishes in the sink again") == ["irritated", "disappointed", "worried"]
+
+def test_feelings_default_without_keywords(suggester):
+    assert suggester.suggest_feelings("Hmm") == ["disappointed", "irritated", "worried"]
+
+def test_needs_rank_pseudo_feelings_and_feelings(suggester):
+    result = suggester.suggest_needs("I felt ignored at dinner", feelings="hurt, annoyed")
+    assert result[0] == "consideration"
+    assert "inclusion" in result
+    # Only vocabulary words are ever suggested
+    assert set(result) <= {w.lower() for c in NEEDS["categories"] for w in c["words"]}
+
+def test_suggester_is_fast(suggester):
+    started = time.perf_counter()
+    for _ in range(1000):
+        suggester.suggest_needs("You never call when you're late and I felt ignored", feelings=["worried"])
+    assert (time.perf_counter() - started) / 1000 < 0.001
+
+def test_build_suggester_needs_vocabulary():
+    assert build_suggester({}) is None
+    assert build_suggester({"feelings": FEELINGS, "needs": NEEDS}) is not None
+
+# --- Integration Tests (Mocked) ---
+
+@patch("app.main._suggester", VocabularySuggester(FEELINGS, NEEDS))
+@patch("app.main.get_cached_response", return_value=None)
+@patch("app.main.save_cached_response")
+def test_gemini_failure_falls_back_to_vocabulary(mock_save, mock_get_cache):
+    with patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = RuntimeError("429 quota exceeded")
+        response = client.post("/ai/suggest-needs", json={
+            "user_id": "test_user", "text": "I felt ignored", "context": {"feelings": "hurt"}
+        })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["engine"] == "vocabulary"
+    assert len(data["result"]) == 3
+    mock_save.assert_not_called()
+
+@patch("app.main.AI_FALLBACK_TIMEOUT_SECONDS", 0.01)
+@patch("app.main._suggester", VocabularySuggester(FEELINGS, NEEDS))
+@patch("app.main.get_cached_response", return_value=None)
+@patch("app.main.save_cached_response")
+def test_slow_gemini_falls_back_to_vocabulary(mock_save, mock_get_cache):
+    async def slow(prompt):
+        await asyncio.sleep(1)
+
+    with patch("app.main.model.generate_content_async", side_effect=slow):
+        response = client.post("/ai/suggest-feelings", json={"user_id": "test_user", "text": "You were late"})
+    assert response.json()["engine"] == "vocabulary"
+
+@patch("app.main._suggester", None)
+@patch("app.main.get_cached_response", return_value=None)
+def test_without_vocabulary_errors_still_surface(mock_get_cache):
+    with patch("app.main.vocabulary_store.peek", return_value=None), \
+         patch("app.main.model.generate_content_async", new_callable=AsyncMock) as mock_generate:
+        mock_generate.side_effect = RuntimeError("boom")
+        response = client.post("/ai/suggest-feelings", json={"user_id": "test_user", "text": "You were late"})
+    assert response.status_code == 502
@@ -0,0 +1,96 @@
+import datetime
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from app.sweeper import Sweeper, SweepTarget, FirestoreCheckpoints, default_targets
+from benchmarks.fakes import FakeFirestore
+
+NOW = 1_700_000_000.0
+
+def utc(offset_seconds):
+    return datetime.datetime.fromtimestamp(NOW + offset_seconds, tz=datetime.timezone.utc)
+
+class FakeClock:
+    def __init__(self):
+        self.now = NOW
+        self.slept = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        self.now += seconds
+
+def targets():
+    return {t.name: t for t in default_targets(cache_ttl_seconds=600, session_retention_seconds=86400)}
+
+def seed_cache(db, expired, fresh):
+    for i in range(expired):
+        db.collection("cached_ai_responses").document(f"old{i:03}").set({"response": "x", "timestamp": NOW - 700 - i})
+    for i in range(fresh):
+        db.collection("cached_ai_responses").document(f"new{i:03}").set({"response": "y", "timestamp": NOW - 10})
+
+def test_sweeps_expired_cache_entries_in_pages():
+    db, clock = FakeFirestore(), FakeClock()
+    seed_cache(db, expired=25, fresh=3)
+    result = Sweeper(db, batch_size=10, max_deletes_per_second=0, clock=clock).sweep(targets()["ai_cache"])
+    assert (result.deleted, result.pages, result.complete) == (25, 3, True)
+    assert sorted(d.id for d in db.collection("cached_ai_responses").stream()) == ["new000", "new001", "new002"]
+
+def test_expired_conflict_sessions_use_nested_expires_at():
+    db = FakeFirestore()
+    db.collection("conflict_sessions").document("old").set({"config": {"expiresAt": utc(-60)}})
+    db.collection("conflict_sessions").document("live").set({"config": {"expiresAt": utc(3600)}})
+    result = Sweeper(db, clock=FakeClock()).sweep(targets()["conflict_sessions"])
+    assert result.deleted == 1
+    assert [d.id for d in db.collection("conflict_sessions").stream()] == ["live"]
+
+def test_sessions_are_deleted_with_their_participant_states():
+    db = FakeFirestore()
+    old = db.collection("sessions").document("123456")
+    old.set({"createdAt": utc(-2 * 86400)})
+    old.collection("participant_states").document("uid-a").set({"isReady": True})
+    db.collection("sessions").document("654321").set({"createdAt": utc(-60)})
+    Sweeper(db, clock=FakeClock()).sweep(targets()["sessions"])
+    assert [d.id for d in db.collection("sessions").stream()] == ["654321"]
+    assert list(old.collection("participant_states").stream()) == []
+
+def test_paused_sweep_resumes_from_checkpoint():
+    db, clock = FakeFirestore(), FakeClock()
+    seed_cache(db, expired=30, fresh=0)
+    checkpoints = FirestoreCheckpoints(db)
+    sweeper = Sweeper(db, checkpoints, batch_size=10, max_deletes_per_second=0, clock=clock)
+
+    first = sweeper.sweep(targets()["ai_cache"], max_documents=10)
+    assert (first.deleted, first.complete) == (10, False)
+    state = checkpoints.load("ai_cache")
+    assert state["deleted"] == 10 and state["cutoff"] == NOW - 600
+
+    # Entries that expire after the pass started wait for the next pass
+    clock.now += 1000
+    second = sweeper.sweep(targets()["ai_cache"])
+    assert (second.deleted, second.complete) == (20, True)
+    assert checkpoints.load("ai_cache") is None
+
+def test_deletes_are_rate_limited():
+    db, clock = FakeFirestore(), FakeClock()
+    seed_cache(db, expired=40, fresh=0)
+    Sweeper(db, batch_size=10, max_deletes_per_second=10, clock=clock, sleep=clock.sleep).sweep(targets()["ai_cache"])
+    # Four full pages of 10 at 10 deletes/s
+    assert clock.slept == pytest.approx(4.0)
+
+def test_dry_run_deletes_nothing():
+    db = FakeFirestore()
+    seed_cache(db, expired=15, fresh=1)
+    result = Sweeper(db, batch_size=10, dry_run=True, clock=FakeClock()).sweep(targets()["ai_cache"])
+    assert (result.scanned, result.deleted) == (15, 0)
+    assert len(list(db.collection("cached_ai_responses").stream())) == 16
+
+def test_rejects_batches_over_firestore_limit():
+    with pytest.raises(ValueError):
+        Sweeper(FakeFirestore(), batch_size=501)
@@ -0,0 +1,120 @@
+from fastapi.testclient import TestClient
+from unittest.mock import patch, MagicMock
+import gzip
+import json
+import sys
+import os
+
+# Add the app directory to sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.main as main
+from app.main import app
+from app.vocabulary import VocabularyStore, build_bundle, load_bundle
+import pytest
+
+client = TestClient(app)
+
+PARTS = {
+    "feelings": {"categories": [{"name": "Happy", "words": ["Glad"]}]},
+    "needs": {"categories": [{"name": "Peace", "words": ["Ease"]}]},
+    "validation_rules": {"violent_words": ["idiot"]},
+}
+
+@pytest.fixture
+def store():
+    fetch = MagicMock(return_value=PARTS)
+    store = VocabularyStore(fetch)
+    with patch("app.main.vocabulary_store", store):
+        yield store
+
+# --- Unit Tests ---
+
+def test_store_loads_once_and_versions_changes():
+    fetch = MagicMock(return_value=PARTS)
+    store = VocabularyStore(fetch)
+    first = store.get()
+    assert store.get() is first
+    assert fetch.call_count == 1
+
+    unchanged = store.update_part("needs", PARTS["needs"])
+    assert unchanged is first
+
+    changed = store.update_part("needs", {"categories": []})
+    assert changed.version == first.version + 1
+    assert changed.etag != first.etag
+
+def test_store_notifies_change_listeners():
+    store = VocabularyStore(MagicMock(return_value=PARTS))
+    seen = []
+    store.on_change(lambda snapshot: seen.append(snapshot.version))
+    store.get()
+    store.update_part("feelings", {})
+    assert seen == [1, 2]
+
+def test_bundle_loads_without_fetching_and_matches_the_firestore_snapshot(tmp_path):
+    path = tmp_path / "bundle.json"
+    path.write_text(json.dumps(build_bundle(PARTS, version=3)))
+    fetch = MagicMock(return_value=PARTS)
+    store = VocabularyStore(fetch)
+    store.load(load_bundle(str(path)))
+    fetch.assert_not_called()
+    # Same content, same ETag: clients holding a Firestore-built copy don't refetch
+    assert store.get().etag == VocabularyStore(MagicMock(return_value=PARTS)).get().etag
+
+def test_unusable_bundles_are_ignored(tmp_path):
+    assert load_bundle(str(tmp_path / "missing.json")) is None
+    tampered = build_bundle(PARTS, version=1)
+    tampered["parts"]["validation_rules"] = {}
+    path = tmp_path / "bundle.json"
+    path.write_text(json.dumps(tampered))
+    assert load_bundle(str(path)) is None
+    path.write_text(json.dumps({**build_bundle(PARTS, version=1), "format": 99}))
+    assert load_bundle(str(path)) is None
+    path.write_text("[]")
+    assert load_bundle(str(path)) is None
+
+def test_startup_uses_the_bundle_when_present(store, tmp_path):
+    path = tmp_path / "bundle.json"
+    path.write_text(json.dumps(build_bundle(PARTS, version=1)))
+    with patch("app.main.VOCABULARY_BUNDLE", str(path)):
+        assert main.load_vocabulary_bundle() is True
+    assert store.peek().data == PARTS
+    with patch("app.main.VOCABULARY_BUNDLE", ""):
+        assert main.load_vocabulary_bundle() is False
+
+# --- Integration Tests (Mocked) ---
+
+def test_vocabulary_served_from_snapshot(store):
+    with patch("app.main.db.collection") as mock_db:
+        response = client.get("/content/vocabulary", headers={"Accept-Encoding": "identity"})
+        client.get("/content/vocabulary", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.json() == PARTS
+    assert response.headers["ETag"] == store.get().etag
+    mock_db.assert_not_called()
+
+def test_vocabulary_gzip_body(store):
+    response = client.get("/content/vocabulary", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == store.get().gzip_etag
+    assert response.json() == PARTS
+
+def test_vocabulary_not_modified(store):
+    etag = store.get().etag
+    response = client.get("/content/vocabulary", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+@patch("app.main._safety_matcher", None)
+def test_vocabulary_change_recompiles_safety_matcher(store):
+    store.on_change(main._reset_compiled_vocabulary)
+    store.get()
+    before = main.get_safety_matcher()
+    assert before.find("you idiot")
+    store.update_part("validation_rules", {"violent_words": ["jerk"]})
+    after = main.get_safety_matcher()
+    assert after is not before
+    assert after.find("you idiot") == []
+    assert after.find("you jerk")
@@ -8,6 +8,7 @@ import 'start_screen.dart';
 import '../services/content_service.dart';
 import '../services/subscription_service.dart';
 import '../services/debug_service.dart';
+import '../services/session_service.dart';
 import 'paywall_screen.dart';
 import '../widgets/peacekeeper_logo.dart';
 
@@ -22,6 +23,9 @@ class GuidedExpressionScreen extends StatefulWidget {
 class _GuidedExpressionScreenState extends State<GuidedExpressionScreen> {
   final String _uid = FirebaseAuth.instance.currentUser!.uid;
   final ContentService _contentService = ContentService();
+  final SessionService _sessionService = SessionService();
+  // Session version this screen is showing, sent with turn changes so a stale tap is rejected
+  int? _sessionVersion;
   bool _isPremium = false;
   
   String? _aiReflection;
@@ -62,7 +66,7 @@ class _GuidedExpressionScreenState extends State<GuidedExpressionScreen> {
         // Time ran out! End session for both.
         DebugService.info("Speaker Timer expired. Ending session.");
         if (mounted) {
-          FirebaseFirestore.instance.collection('sessions').doc(widget.sessionId).update({'status': 'finished'});
+          _sessionService.event(widget.sessionId, 'finish');
         }
       }
     });
@@ -70,10 +74,7 @@ class _GuidedExpressionScreenState extends State<GuidedExpressionScreen> {
 
   Future<void> _setListenerReady() async {
     DebugService.info("Listener confirmed readiness.");
-    await FirebaseFirestore.instance
-        .collection('sessions')
-        .doc(widget.sessionId)
-        .update({'listener_status': 'ready'});
+    await _sessionService.event(widget.sessionId, 'listener_ready');
   }
 
   Future<void> _quitSession() async {
@@ -90,35 +91,21 @@ class _GuidedExpressionScreenState extends State<GuidedExpressionScreen> {
     );
     if (confirmed == true) {
       DebugService.info("User quit the session manually.");
-      await FirebaseFirestore.instance.collection('sessions').doc(widget.sessionId).update({'status': 'finished'});
+      await _sessionService.event(widget.sessionId, 'finish');
     }
   }
 
   Future<void> _startNextTurn(String currentSpeakerId, List<dynamic> participants, int turnsCompleted) async {
     DebugService.info("Turn completed. Total turns: $turnsCompleted");
-    if (turnsCompleted >= 1) {
-      DebugService.info("Session limit reached. Proceeding to Shared Closing.");
-      await FirebaseFirestore.instance
-          .collection('sessions')
-          .doc(widget.sessionId)
-          .update({'status': 'shared_closing'});
-      return;
+    // The backend swaps speakers, or moves to Shared Closing after the last turn. If the
+    // partner tapped first, this tap is rejected as stale and the session listener catches up.
+    final result = await _sessionService.event(widget.sessionId, 'next_turn', version: _sessionVersion);
+    if (result.hasError) {
+      DebugService.info("Next turn not applied: ${result.error}");
     }
 
-    final nextSpeaker = participants.firstWhere((id) => id != currentSpeakerId, orElse: () => '');
-
-    if (nextSpeaker.isNotEmpty) {
-      DebugService.info("Switching turns. Next speaker: $nextSpeaker");
-      await FirebaseFirestore.instance
-          .collection('sessions')
-          .doc(widget.sessionId)
-          .update({
-        'status': 'expression_phase',
-        'current_speaker': nextSpeaker,
-        'listener_status': 'waiting',
-        'current_message': FieldValue.delete(),
-        'turns_completed': FieldValue.increment(1),
-      });
+    if (turnsCompleted < 1 && mounted) {
+      DebugService.info("Switching turns.");
       setState(() {
         _aiReflection = null;
         _secondsRemaining = 120; // Reset timer for next turn
@@ -184,6 +171,7 @@ class _GuidedExpressionScreenState extends State<GuidedExpressionScreen> {
 
         final data = snapshot.data!.data() as Map<String, dynamic>;
         final sessionStatus = data['status'];
+        _sessionVersion = data['version'] as int?;
 
         // Navigation triggers
         if (sessionStatus == 'shared_closing') {
@@ -268,8 +256,7 @@ class _GuidedExpressionScreenState extends State<GuidedExpressionScreen> {
     // 1. SOLO MODE OVERRIDE
     if (data['mode'] == 'solo') {
       if (sessionStatus == 'message_sent') {
-         DebugService.info("Solo mode message sent. Transitioning to shared_closing.");
-         FirebaseFirestore.instance.collection('sessions').doc(widget.sessionId).update({'status': 'shared_closing'});
+         // The backend moves solo sessions to shared_closing with the message; wait for the snapshot
          return const Center(child: CircularProgressIndicator());
       }
       return SpeakerFlowScreen(sessionId: widget.sessionId);
@@ -348,7 +335,7 @@ class _GuidedExpressionScreenState extends State<GuidedExpressionScreen> {
   Widget _buildReflectionOption(String text) {
     return OutlinedButton(
       onPressed: () {
-        FirebaseFirestore.instance.collection('sessions').doc(widget.sessionId).update({'status': 'turn_complete'});
+        _sessionService.event(widget.sessionId, 'confirm_reflection');
       },
       style: OutlinedButton.styleFrom(
         padding: const EdgeInsets.all(20), 
@@ -1,9 +1,9 @@
 import 'package:flutter/material.dart';
 import 'package:firebase_auth/firebase_auth.dart';
-import 'package:cloud_firestore/cloud_firestore.dart';
 import 'regulation_screen.dart';
 import '../services/subscription_service.dart';
 import '../services/debug_service.dart';
+import '../services/session_service.dart';
 import 'paywall_screen.dart';
 import '../widgets/peacekeeper_logo.dart';
 
@@ -69,34 +69,26 @@ class _JoinSessionScreenState extends State<JoinSessionScreen> {
       
       if (user == null) throw Exception("Authentication failed");
 
-      // 2. Check Session
-      final sessionRef = FirebaseFirestore.instance.collection('sessions').doc(code);
-      final sessionDoc = await sessionRef.get();
+      // 2. Join Session (this triggers the listener on the Host's side)
+      DebugService.info("Joining session $code...");
+      final joined = await SessionService().event(code, 'join');
 
-      if (!sessionDoc.exists) {
+      if (joined.statusCode == 404) {
         Navigator.pop(context); // Close loading dialog
         DebugService.info("Join Failed: Invalid code.");
         _showError("Invalid code. Please check and try again.");
         setState(() { _isButtonEnabled = true; });
         return;
       }
-      
-      final data = sessionDoc.data();
-      if (data != null && data['status'] == 'active') {
+
+      if (joined.hasError) {
          Navigator.pop(context);
-         DebugService.info("Join Failed: Session full.");
-         _showError("This session is already full.");
+         DebugService.info("Join Failed: ${joined.error}");
+         _showError(joined.statusCode == 409 ? "This session is already full." : "Error joining: ${joined.error}");
          setState(() { _isButtonEnabled = true; });
          return;
       }
 
-      // 3. Join Session
-      DebugService.info("Joining session $code...");
-      await sessionRef.update({
-        'participants': FieldValue.arrayUnion([user.uid]),
-        'status': 'active', // This triggers the listener on the Host's side
-      });
-
       if (mounted) {
         Navigator.pop(context); // Close loading dialog
         Navigator.pushReplacement(
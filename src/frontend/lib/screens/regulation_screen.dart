@@ -1,12 +1,11 @@
 import 'dart:async';
-import 'dart:math';
 import 'package:flutter/material.dart';
-import 'package:cloud_firestore/cloud_firestore.dart';
 import 'package:firebase_auth/firebase_auth.dart';
 import 'waiting_screen.dart';
 import 'guided_expression_screen.dart';
 import '../services/subscription_service.dart';
 import '../services/debug_service.dart';
+import '../services/session_service.dart';
 import 'paywall_screen.dart';
 import '../widgets/peacekeeper_logo.dart';
 
@@ -72,36 +71,16 @@ class _RegulationScreenState extends State<RegulationScreen> with SingleTickerPr
       final user = FirebaseAuth.instance.currentUser;
       if (user == null) return;
 
-      final sessionRef = FirebaseFirestore.instance.collection('sessions').doc(widget.sessionId);
-      final sessionDoc = await sessionRef.get();
-      final isSolo = sessionDoc.data()?['mode'] == 'solo';
-      DebugService.info("Session Mode: ${isSolo ? 'Solo' : 'Shared'}");
-
-      // 1. Mark myself as ready
+      // Mark myself as ready. The backend starts the Expression Phase (and picks the
+      // first speaker) once everyone is, in the same transaction, so simultaneous taps can't race.
       DebugService.info("Marking user ${user.uid} as ready (regulation_complete)");
-      await sessionRef.collection('participant_states').doc(user.uid).set({
-        'status': 'regulation_complete',
-        'updatedAt': FieldValue.serverTimestamp(),
-      }, SetOptions(merge: true));
-
-      // 2. Check if everyone is ready
-      final statesSnapshot = await sessionRef.collection('participant_states').get();
-      final participants = statesSnapshot.docs;
-      
-      // We expect 2 participants (or 1 if solo). Check if all are 'regulation_complete'
-      final expectedCount = isSolo ? 1 : 2;
-      final allReady = participants.length >= expectedCount && 
-          participants.every((doc) => doc.data()['status'] == 'regulation_complete');
+      final result = await SessionService().event(widget.sessionId, 'regulation_complete');
+      if (result.hasError) throw Exception(result.error);
+      final isSolo = result.state!['mode'] == 'solo';
+      DebugService.info("Session Mode: ${isSolo ? 'Solo' : 'Shared'}");
 
-      if (allReady) {
-        DebugService.info("All participants ready. Starting Expression Phase.");
-        // Pick random speaker (or just me if solo) and start expression phase
-        final speakerId = participants[Random().nextInt(participants.length)].id;
-        await sessionRef.update({
-          'status': 'expression_phase',
-          'current_speaker': speakerId,
-          'phase_start_time': FieldValue.serverTimestamp(),
-        });
+      if (result.state!['status'] == 'expression_phase') {
+        DebugService.info("All participants ready. Expression Phase started.");
       } else {
         DebugService.info("Waiting for other participant to finish regulation.");
       }
@@ -165,7 +144,7 @@ class _RegulationScreenState extends State<RegulationScreen> with SingleTickerPr
                 ),
               );
               if (confirmed == true) {
-                await FirebaseFirestore.instance.collection('sessions').doc(widget.sessionId).update({'status': 'finished'});
+                await SessionService().event(widget.sessionId, 'finish');
               }
             },
             icon: const Icon(Icons.exit_to_app, color: Colors.red, size: 18),
@@ -1,10 +1,10 @@
 import 'package:flutter/material.dart';
 import 'package:firebase_auth/firebase_auth.dart';
 import 'package:cloud_firestore/cloud_firestore.dart';
-import 'dart:math';
 import 'regulation_screen.dart';
 import '../services/subscription_service.dart';
 import '../services/debug_service.dart';
+import '../services/session_service.dart';
 import 'paywall_screen.dart';
 import '../widgets/peacekeeper_logo.dart';
 
@@ -46,19 +46,13 @@ class _SessionCreationScreenState extends State<SessionCreationScreen> {
 
       if (user == null) throw Exception("Authentication failed");
 
-      // 2. Generate Code
-      final code = _generateConflictCode();
+      // 2. Create Session
+      // The backend picks a free 6-digit code and uses it as the document ID for easy lookup by the joiner
+      final created = await SessionService().create('shared');
+      if (created.hasError) throw Exception(created.error);
+      final code = created.sessionId!;
       DebugService.info("Conflict Code generated: $code");
 
-      // 3. Create Session in Firestore
-      // We use the code as the document ID for easy lookup by the joiner
-      await FirebaseFirestore.instance.collection('sessions').doc(code).set({
-        'hostId': user.uid,
-        'createdAt': FieldValue.serverTimestamp(),
-        'status': 'waiting_for_partner', // initial state
-        'participants': [user.uid],
-      });
-
       if (mounted) {
         setState(() {
           conflictCode = code;
@@ -98,11 +92,6 @@ class _SessionCreationScreenState extends State<SessionCreationScreen> {
     }
   }
 
-  String _generateConflictCode() {
-    var rng = Random();
-    return (100000 + rng.nextInt(900000)).toString();
-  }
-
   @override
   Widget build(BuildContext context) {
     return Scaffold(
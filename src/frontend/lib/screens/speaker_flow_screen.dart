@@ -5,6 +5,7 @@ import '../services/content_service.dart';
 import '../services/subscription_service.dart';
 import '../services/safety_service.dart';
 import '../services/debug_service.dart';
+import '../services/session_service.dart';
 import 'paywall_screen.dart';
 
 class SpeakerFlowScreen extends StatefulWidget {
@@ -18,6 +19,7 @@ class SpeakerFlowScreen extends StatefulWidget {
 class _SpeakerFlowScreenState extends State<SpeakerFlowScreen> {
   final PageController _pageController = PageController();
   final ContentService _contentService = ContentService();
+  final SessionService _sessionService = SessionService();
   final SafetyService _safetyService = SafetyService();
   int _currentStep = 0;
   bool _isLoading = true;
@@ -346,13 +348,23 @@ class _SpeakerFlowScreenState extends State<SpeakerFlowScreen> {
       'emotions': _selectedFeelings,
       'need': _selectedNeeds.join(", "),
       'request': "Would you be willing to ${_requestController.text}?",
-      'timestamp': FieldValue.serverTimestamp(),
     };
-    final batch = FirebaseFirestore.instance.batch();
-    final sessionRef = FirebaseFirestore.instance.collection('sessions').doc(widget.sessionId);
-    batch.update(sessionRef, {'current_message': fullMessage, 'status': 'message_sent'});
-    batch.set(sessionRef.collection('participant_states').doc(uid), {'emotions': _selectedFeelings}, SetOptions(merge: true));
-    await batch.commit();
+    // The backend stores the message and my emotions and moves the session on in one write
+    final result = await _sessionService.event(widget.sessionId, 'send_message', message: fullMessage);
+    if (result.hasError) {
+      DebugService.error("Sending message failed: ${result.error}");
+      return;
+    }
+    if (_isPremium) {
+      // Same fields the listener's screen sends, so its reflection request hits the cache
+      _contentService.prefetch(
+        sessionId: widget.sessionId,
+        observation: fullMessage['observation'] as String,
+        feelings: _selectedFeelings.join(", "),
+        needs: fullMessage['need'] as String,
+        request: fullMessage['request'] as String,
+      );
+    }
   }
 
   @override
@@ -1,6 +1,5 @@
 import 'package:flutter/material.dart';
 import 'package:firebase_auth/firebase_auth.dart';
-import 'package:cloud_firestore/cloud_firestore.dart';
 import 'session_creation_screen.dart';
 import 'join_session_screen.dart';
 import 'feedback_screen.dart';
@@ -8,6 +7,7 @@ import 'paywall_screen.dart';
 import 'regulation_screen.dart';
 import '../services/subscription_service.dart';
 import '../services/debug_service.dart';
+import '../services/session_service.dart';
 import '../widgets/peacekeeper_logo.dart';
 
 class StartScreen extends StatefulWidget {
@@ -63,25 +63,12 @@ class _StartScreenState extends State<StartScreen> {
       }
       if (user == null) throw Exception("Authentication failed");
 
-      // Generate a unique ID for solo session (doesn't need to be 6-digit readable)
-      final sessionId = "solo_${user.uid}_${DateTime.now().millisecondsSinceEpoch}";
+      // The backend creates the session and the participant state in one write
+      final created = await SessionService().create('solo');
+      if (created.hasError) throw Exception(created.error);
+      final sessionId = created.sessionId!;
       DebugService.info("Session ID generated: $sessionId");
 
-      await FirebaseFirestore.instance.collection('sessions').doc(sessionId).set({
-        'hostId': user.uid,
-        'createdAt': FieldValue.serverTimestamp(),
-        'status': 'active', 
-        'mode': 'solo',
-        'participants': [user.uid],
-        'current_speaker': user.uid,
-      });
-
-      // Initialize participant state
-      await FirebaseFirestore.instance.collection('sessions').doc(sessionId)
-          .collection('participant_states').doc(user.uid).set({
-        'status': 'joined',
-      });
-
       if (mounted) {
         DebugService.info("Solo Session created successfully. Navigating...");
         Navigator.pop(context); // Close loading
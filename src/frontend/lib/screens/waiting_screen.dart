@@ -4,6 +4,7 @@ import 'guided_expression_screen.dart';
 import 'start_screen.dart';
 import '../services/subscription_service.dart';
 import '../services/debug_service.dart';
+import '../services/session_service.dart';
 import 'paywall_screen.dart';
 import '../widgets/peacekeeper_logo.dart';
 
@@ -102,7 +103,7 @@ class _WaitingScreenState extends State<WaitingScreen> {
                 ),
               );
               if (confirmed == true) {
-                await FirebaseFirestore.instance.collection('sessions').doc(widget.sessionId).update({'status': 'finished'});
+                await SessionService().event(widget.sessionId, 'finish');
               }
             },
             icon: const Icon(Icons.exit_to_app, color: Colors.red, size: 18),
@@ -6,7 +6,7 @@ import 'package:firebase_auth/firebase_auth.dart';
 import 'debug_service.dart';
 
 class ContentService {
-  String get _baseUrl {
+  String get baseUrl {
     // 1. PRODUCTION (Release Build)
     if (kReleaseMode) {
       return 'https://peacekeeper-backend-c7fnii4s3a-uc.a.run.app'; // Update this after deployment if needed
@@ -21,7 +21,7 @@ class ContentService {
 
   Future<Map<String, dynamic>> fetchVocabulary() async {
     try {
-      final response = await http.get(Uri.parse('$_baseUrl/content/vocabulary?t=${DateTime.now().millisecondsSinceEpoch}'));
+      final response = await http.get(Uri.parse('$baseUrl/content/vocabulary?t=${DateTime.now().millisecondsSinceEpoch}'));
       if (response.statusCode == 200) {
         return jsonDecode(response.body);
       }
@@ -54,6 +54,39 @@ class ContentService {
     return _callAI('/ai/generate-reflection', "", context: context);
   }
 
+  /// Asks the backend to compute the partner's reflection of a sent message
+  /// ahead of time. Fire-and-forget: failures only cost the speedup.
+  Future<void> prefetch({
+    required String sessionId,
+    required String observation,
+    required String feelings,
+    required String needs,
+    required String request,
+  }) async {
+    final user = FirebaseAuth.instance.currentUser;
+    if (user == null) return;
+    try {
+      final token = await user.getIdToken();
+      await http.post(
+        Uri.parse('$baseUrl/ai/prefetch'),
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': 'Bearer $token',
+        },
+        body: jsonEncode({
+          'user_id': user.uid,
+          'session_id': sessionId,
+          'observation': observation,
+          'feelings': feelings,
+          'needs': needs,
+          'request': request,
+        }),
+      );
+    } catch (e) {
+      DebugService.error("Prefetch failed", e);
+    }
+  }
+
   Future<AIResult> _callAI(String path, String text, {Map<String, dynamic>? context}) async {
     final user = FirebaseAuth.instance.currentUser;
     if (user == null) return AIResult(error: "User not authenticated");
@@ -64,7 +97,7 @@ class ContentService {
       DebugService.log(">>> TEXT: $text");
       
       final response = await http.post(
-        Uri.parse('$_baseUrl$path'),
+        Uri.parse('$baseUrl$path'),
         headers: {
           'Content-Type': 'application/json',
           'Authorization': 'Bearer $token',
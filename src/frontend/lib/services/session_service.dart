@@ -0,0 +1,69 @@
+import 'dart:convert';
+import 'package:http/http.dart' as http;
+import 'package:firebase_auth/firebase_auth.dart';
+import 'content_service.dart';
+import 'debug_service.dart';
+
+/// Drives the session state machine through the backend, which validates each
+/// step and applies it in one transaction. Screens keep listening to the
+/// session document for the resulting state.
+class SessionService {
+  final ContentService _contentService = ContentService();
+
+  /// Creates a session hosted by the current user ('shared' or 'solo').
+  Future<SessionResult> create(String mode) async {
+    return _post('/sessions', {'mode': mode});
+  }
+
+  /// Sends one event: join, regulation_complete, listener_ready,
+  /// send_message, confirm_reflection, next_turn or finish. Pass the
+  /// session `version` the screen shows so a tap on an outdated screen is
+  /// rejected instead of applied.
+  Future<SessionResult> event(String sessionId, String event, {int? version, Map<String, dynamic>? message}) async {
+    return _post('/sessions/$sessionId/events', {
+      'event': event,
+      if (version != null) 'version': version,
+      if (message != null) 'message': message,
+    });
+  }
+
+  Future<SessionResult> _post(String path, Map<String, dynamic> body) async {
+    final user = FirebaseAuth.instance.currentUser;
+    if (user == null) return SessionResult(statusCode: 401, error: "User not authenticated");
+
+    try {
+      final token = await user.getIdToken();
+      DebugService.info(">>> SESSION REQUEST: $path ${body['event'] ?? ''}");
+      final response = await http.post(
+        Uri.parse('${_contentService.baseUrl}$path'),
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': 'Bearer $token',
+        },
+        body: jsonEncode(body),
+      );
+      DebugService.info("<<< SESSION RESPONSE ($path): ${response.statusCode}");
+
+      final data = jsonDecode(response.body);
+      if (response.statusCode == 200 || response.statusCode == 201) {
+        return SessionResult(statusCode: response.statusCode, state: data);
+      }
+      final detail = data['detail'];
+      return SessionResult(statusCode: response.statusCode, error: detail is Map ? detail['message'] : detail.toString());
+    } catch (e) {
+      DebugService.error("!!! SESSION EXCEPTION", e);
+      return SessionResult(statusCode: 0, error: e.toString());
+    }
+  }
+}
+
+class SessionResult {
+  final int statusCode;
+  final Map<String, dynamic>? state;
+  final String? error;
+
+  SessionResult({required this.statusCode, this.state, this.error});
+
+  bool get hasError => error != null;
+  String? get sessionId => state?['session_id'];
+}